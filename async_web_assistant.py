@@ -0,0 +1,253 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+
+from itsdangerous import BadSignature
+
+from metrics import METRICS
+from session_store import ConversationStore
+from web_ai_assistant import ai_assistant, app, conversation_steps, conversation_store, db_pool, location_store
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+class BadRequest(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class Request:
+    __slots__ = ('method', 'path', 'headers', 'body', 'keep_alive')
+
+    def __init__(self, method, path, headers, body, keep_alive):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+        self.keep_alive = keep_alive
+
+async def read_request(reader):
+    """One HTTP/1.1 request off a keep-alive connection; None when the client closed it"""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise BadRequest(400, "Request header too large")
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ', 2)
+    except ValueError:
+        raise BadRequest(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    length = headers.get('content-length', '0')
+    if not length.isdigit():
+        raise BadRequest(400, "Invalid Content-Length")
+    if int(length) > MAX_BODY_BYTES:
+        raise BadRequest(413, "Request body too large")
+    body = await reader.readexactly(int(length)) if int(length) else b''
+    connection = headers.get('connection', '').lower()
+    keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+    return Request(method, target.split('?', 1)[0], headers, body, keep_alive)
+
+def encode_response(status, body, content_type='application/json', keep_alive=True, headers=()):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+             f"Content-Type: {content_type}",
+             f"Content-Length: {len(body)}",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    lines.extend(f"{name}: {value}" for name, value in headers)
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+def json_body(payload):
+    return json.dumps(payload).encode()
+
+class AsyncChatServer:
+    """The /chat endpoint on an asyncio event loop
+
+    An idle keep-alive connection is a socket, a stream reader and a
+    suspended coroutine: no thread. Conversation logic is the generator shared
+    with the Flask route (conversation_steps); its store calls, the only
+    blocking part, run on `db_threads` worker threads so the loop never waits
+    on the database. cx_Oracle has no async API, so threads are bounded by
+    database sessions rather than by connected operators. The session cookie
+    is Flask's, so clients can move between the two servers.
+    """
+    def __init__(self, db_threads=None, idle_timeout=300):
+        if db_threads is None:
+            db_threads = db_pool.max if db_pool is not None else 10
+        self.db_executor = ThreadPoolExecutor(max_workers=db_threads, thread_name_prefix='chat-db')
+        self.db_threads = db_threads
+        self.idle_timeout = idle_timeout
+        # A shared store behind a manager is a blocking round trip; the in-process one is a dict lookup
+        self.local_sessions = isinstance(conversation_store, ConversationStore)
+        self.serializer = app.session_interface.get_signing_serializer(app)
+        self.cookie_name = app.config['SESSION_COOKIE_NAME']
+        self.cookie_max_age = int(app.permanent_session_lifetime.total_seconds())
+        self.connections = 0
+        self.peak_connections = 0
+        self.requests = 0
+        self.db_calls_waiting = 0
+        self.routes = {
+            ('POST', '/chat'): self.chat,
+            ('GET', '/metrics'): self.metrics,
+            ('GET', '/sessions/stats'): self.session_status,
+            ('GET', '/async/stats'): self.async_status
+        }
+
+    async def run_blocking(self, function, *args):
+        self.db_calls_waiting += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.db_executor, function, *args)
+        finally:
+            self.db_calls_waiting -= 1
+
+    async def sessions(self, method, *args):
+        function = getattr(conversation_store, method)
+        return function(*args) if self.local_sessions else await self.run_blocking(function, *args)
+
+    def session_sid(self, request):
+        cookie = SimpleCookie()
+        try:
+            cookie.load(request.headers.get('cookie', ''))
+        except Exception:
+            return None
+        morsel = cookie.get(self.cookie_name)
+        if morsel is None:
+            return None
+        try:
+            return self.serializer.loads(morsel.value, max_age=self.cookie_max_age).get('sid')
+        except BadSignature:
+            return None
+
+    async def advance(self, conversation, user_message):
+        """Drive conversation_steps, awaiting each store call on the database threads"""
+        steps = conversation_steps(conversation, user_message)
+        try:
+            method, argument = next(steps)
+            while True:
+                result = await self.run_blocking(getattr(ai_assistant, method), location_store, argument)
+                method, argument = steps.send(result)
+        except StopIteration as done:
+            return done.value
+
+    async def chat(self, request):
+        try:
+            user_message = (json.loads(request.body or b'{}').get('message') or '').strip()
+        except (ValueError, AttributeError):
+            raise BadRequest(400, "Body must be a JSON object with a 'message'")
+        sid = self.session_sid(request)
+        conversation = await self.sessions('load', sid) if sid else None
+        headers = []
+        if conversation is None:
+            sid, conversation = await self.sessions('create')
+            cookie = self.serializer.dumps({'sid': sid})
+            headers.append(('Set-Cookie', f"{self.cookie_name}={cookie}; HttpOnly; Path=/"))
+        with METRICS.timer(f"state.{conversation.state}"):
+            reply = await self.advance(conversation, user_message)
+        await self.sessions('save', sid, conversation)
+        return 200, json_body(reply), 'application/json', headers
+
+    async def metrics(self, request):
+        return 200, METRICS.render_prometheus().encode(), 'text/plain; version=0.0.4', ()
+
+    async def session_status(self, request):
+        return 200, json_body(await self.sessions('stats')), 'application/json', ()
+
+    async def async_status(self, request):
+        return 200, json_body({
+            'connections': self.connections,
+            'peak_connections': self.peak_connections,
+            'requests': self.requests,
+            'db_threads': self.db_threads,
+            'db_calls_waiting': self.db_calls_waiting
+        }), 'application/json', ()
+
+    async def dispatch(self, request):
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            known = any(path == request.path for _, path in self.routes)
+            status = 405 if known else 404
+            return status, json_body({'error': REASONS[status]}), 'application/json', ()
+        return await handler(request)
+
+    async def handle_connection(self, reader, writer):
+        self.connections += 1
+        self.peak_connections = max(self.peak_connections, self.connections)
+        try:
+            while True:
+                try:
+                    async with asyncio.timeout(self.idle_timeout):
+                        request = await read_request(reader)
+                except BadRequest as e:
+                    writer.write(encode_response(e.status, json_body({'error': str(e)}), keep_alive=False))
+                    await writer.drain()
+                    break
+                except TimeoutError:
+                    break
+                if request is None:
+                    break
+                self.requests += 1
+                try:
+                    status, body, content_type, headers = await self.dispatch(request)
+                except BadRequest as e:
+                    status, body, content_type, headers = e.status, json_body({'error': str(e)}), 'application/json', ()
+                except Exception as e:
+                    status, body, content_type, headers = 500, json_body({'error': str(e)}), 'application/json', ()
+                writer.write(encode_response(status, body, content_type, request.keep_alive, headers))
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def serve(self, host, port, backlog=1024):
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES,
+                                            backlog=backlog)
+        addresses = ', '.join(f"{address[0]}:{address[1]}" for address in
+                              (sock.getsockname() for sock in server.sockets))
+        print(f"Async chat server on {addresses} ({self.db_threads} database threads)", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.db_executor.shutdown(wait=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve /chat on an asyncio event loop (same stores and "
+                                                 "environment variables as web_ai_assistant.py)")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--db-threads', type=int, default=None,
+                        help="Threads running store calls (default: ORACLE_POOL_MAX, or 10 offline)")
+    parser.add_argument('--idle-timeout', type=float, default=float(os.environ.get('WAREHOUSE_IDLE_TIMEOUT', 300)),
+                        help="Seconds a keep-alive connection may stay idle")
+    parser.add_argument('--backlog', type=int, default=1024)
+    args = parser.parse_args()
+
+    server = AsyncChatServer(args.db_threads, args.idle_timeout)
+    start = time.perf_counter()
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.backlog))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print(f"Served {server.requests:,} requests in {time.perf_counter() - start:.0f} s "
+              f"(peak {server.peak_connections:,} connections)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from location_store import open_store
+
+# Set in each worker process by init_worker()
+_assistant = None
+
+def open_worker_store(spec):
+    """Each worker holds its own connection; oracle reads ORACLE_USER/ORACLE_PASSWORD/ORACLE_DSN"""
+    if spec == 'oracle':
+        import cx_Oracle
+        conn = cx_Oracle.connect(os.environ['ORACLE_USER'], os.environ['ORACLE_PASSWORD'], os.environ['ORACLE_DSN'])
+        return open_store('oracle', conn)
+    return open_store(spec)
+
+def init_worker(assistant_kind, store_spec):
+    global _assistant
+    # stdout carries the JSONL results; assistant diagnostics go to stderr
+    sys.stdout = sys.stderr
+    if assistant_kind == 'auto':
+        from warehouse_ai_assistant_auto import WarehouseAIAssistant
+    else:
+        from warehouse_ai_assistant import WarehouseAIAssistant
+    _assistant = WarehouseAIAssistant(store=open_worker_store(store_spec))
+
+def parse_conversation(line):
+    """A JSON list of utterances, or {"id": ..., "utterances": [...]}"""
+    conversation = json.loads(line)
+    if isinstance(conversation, list):
+        conversation_id, utterances = None, conversation
+    elif isinstance(conversation, dict):
+        conversation_id, utterances = conversation.get('id'), conversation['utterances']
+    else:
+        raise ValueError(f"expected a list or an object, got {type(conversation).__name__}")
+    if not isinstance(utterances, list) or not all(isinstance(utterance, str) for utterance in utterances):
+        raise ValueError("utterances must be a list of strings")
+    return conversation_id, utterances
+
+def run_conversation(line_number, line, keep_replies):
+    """Drive one conversation through process_user_input from a fresh greeting state"""
+    start = time.perf_counter()
+    result = {'line': line_number}
+    try:
+        conversation_id, utterances = parse_conversation(line)
+    except (ValueError, KeyError, TypeError) as e:
+        result.update(outcome='error', error=f"Bad input line: {e}")
+        return result
+
+    assistant = _assistant
+    assistant.conversation_state = "greeting"
+    assistant.current_location = {}
+    created, failures, cancelled = [], [], 0
+    replies = []
+    try:
+        for utterance in utterances:
+            state = assistant.conversation_state
+            # Keep the dict itself: the assistant swaps in a new one once the location is saved
+            location = assistant.current_location
+            reply = assistant.process_user_input(utterance)
+            if keep_replies:
+                replies.append(reply)
+            if state == "approval" and assistant.conversation_state == "greeting":
+                if reply.startswith("✅"):
+                    created.append(location.get('LOCATION_ID'))
+                elif reply.startswith("❌"):
+                    failures.append(reply.splitlines()[0].lstrip("❌ "))
+                else:
+                    cancelled += 1
+    except Exception as e:
+        result['error'] = str(e)
+
+    if 'error' in result:
+        outcome = 'error'
+    elif created:
+        outcome = 'created'
+    elif failures:
+        outcome = 'failed'
+        result['error'] = failures[-1]
+    elif cancelled:
+        outcome = 'cancelled'
+    else:
+        outcome = 'incomplete'
+    if conversation_id is not None:
+        result['id'] = conversation_id
+    result.update(outcome=outcome, created=created, final_state=assistant.conversation_state,
+                  utterances=len(utterances), elapsed_ms=round((time.perf_counter() - start) * 1000, 3))
+    if keep_replies:
+        result['replies'] = replies
+    return result
+
+def run_chunk(chunk, keep_replies):
+    return [run_conversation(line_number, line, keep_replies) for line_number, line in chunk]
+
+def read_chunks(input_file, chunk_size):
+    """(line_number, line) chunks, read lazily so memory does not grow with the file"""
+    numbered = ((number, line) for number, line in enumerate(input_file, 1) if line.strip())
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def run_batch(input_file, output_file, workers, assistant_kind, store_spec, chunk_size=32, keep_replies=False):
+    """Stream results in input order, keeping at most a few chunks per worker in flight"""
+    outcomes = Counter()
+    max_in_flight = workers * 4
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(assistant_kind, store_spec)) as pool:
+        def write_oldest():
+            for result in in_flight.popleft().result():
+                outcomes[result['outcome']] += 1
+                output_file.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+        for chunk in read_chunks(input_file, chunk_size):
+            in_flight.append(pool.submit(run_chunk, chunk, keep_replies))
+            if len(in_flight) >= max_in_flight:
+                write_oldest()
+        while in_flight:
+            write_oldest()
+    return outcomes
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of conversations through the assistant in parallel")
+    parser.add_argument('input', help="JSONL: one conversation (list of utterances) per line, '-' for stdin")
+    parser.add_argument('--output', default='-', help="JSONL results, one line per conversation ('-' for stdout)")
+    parser.add_argument('--assistant', choices=['auto', 'basic'], default='auto',
+                        help="warehouse_ai_assistant_auto.py or warehouse_ai_assistant.py")
+    parser.add_argument('--store', default='oracle',
+                        help="oracle (ORACLE_USER/ORACLE_PASSWORD/ORACLE_DSN, one connection per worker), "
+                             "sqlite:<path>, or memory (a separate store per worker, for dry runs)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=32, help="Conversations sent to a worker at a time")
+    parser.add_argument('--replies', action='store_true', help="Include every assistant reply in the results")
+    args = parser.parse_args()
+
+    input_file = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    start = time.perf_counter()
+    try:
+        outcomes = run_batch(input_file, output_file, args.workers, args.assistant, args.store,
+                             args.chunk_size, args.replies)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+    elapsed = time.perf_counter() - start
+    total = sum(outcomes.values())
+    summary = ', '.join(f"{outcome} {count}" for outcome, count in sorted(outcomes.items()))
+    print(f"{total} conversations in {elapsed:.1f}s ({total / elapsed:,.0f}/s) with {args.workers} workers: {summary}",
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
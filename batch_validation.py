@@ -0,0 +1,195 @@
+import argparse
+import csv
+import string
+import sys
+import time
+from array import array
+
+VALID_LOCATION_TYPES = [
+    'Warehouse', 'Storage', 'Shelf', 'Rack', 'Zone',
+    'Area', 'Section', 'Room', 'Floor', 'Bay', 'Slot'
+]
+
+INVALID_NAME_CHARS = frozenset('<>"\'')
+
+# One bit per failed rule; messages are exactly those of the per-row validators
+NAME_REQUIRED = 1 << 0
+NAME_TOO_SHORT = 1 << 1
+NAME_TOO_LONG = 1 << 2
+NAME_INVALID_CHARS = 1 << 3
+ZONE_REQUIRED = 1 << 4
+ZONE_FORMAT = 1 << 5
+AISLE_REQUIRED = 1 << 6
+AISLE_FORMAT = 1 << 7
+AISLE_RANGE = 1 << 8
+TYPE_REQUIRED = 1 << 9
+TYPE_INVALID = 1 << 10
+DUPLICATE_NAME = 1 << 11
+
+# (field, bit, message) in the order comprehensive_validation reports them
+RULES = [
+    ('LOCATION_NAME', NAME_REQUIRED, "Location name is required"),
+    ('LOCATION_NAME', NAME_TOO_SHORT, "Location name must be at least 3 characters long"),
+    ('LOCATION_NAME', NAME_TOO_LONG, "Location name must be less than 100 characters"),
+    ('LOCATION_NAME', NAME_INVALID_CHARS, "Location name contains invalid characters"),
+    ('ZONE', ZONE_REQUIRED, "Zone is required"),
+    ('ZONE', ZONE_FORMAT, "Zone must be a single letter (A-Z)"),
+    ('AISLE', AISLE_REQUIRED, "Aisle is required"),
+    ('AISLE', AISLE_FORMAT, "Aisle must be 1-2 digits (01-99)"),
+    ('AISLE', AISLE_RANGE, "Aisle number must be between 01 and 99"),
+    ('LOCATION_TYPE', TYPE_REQUIRED, "Location type is required"),
+    ('LOCATION_TYPE', TYPE_INVALID, f"Location type must be one of: {', '.join(VALID_LOCATION_TYPES)}")
+]
+
+def zone_bits(zone):
+    if not zone:
+        return ZONE_REQUIRED
+    return 0 if len(zone) == 1 and zone in string.ascii_uppercase else ZONE_FORMAT
+
+def aisle_bits(aisle):
+    # re's \d is any Unicode decimal digit, the same set str.isdecimal() accepts
+    if not aisle:
+        return AISLE_REQUIRED
+    if len(aisle) > 2 or not aisle.isdecimal():
+        return AISLE_FORMAT
+    return 0 if 1 <= int(aisle) <= 99 else AISLE_RANGE
+
+def type_bits(location_type):
+    if not location_type:
+        return TYPE_REQUIRED
+    return 0 if location_type in VALID_LOCATION_TYPES else TYPE_INVALID
+
+class LookupColumn:
+    """Bits per distinct value, computed once: zone, aisle and type columns have few distinct values"""
+    MAX_ENTRIES = 4096
+
+    def __init__(self, rule, seed):
+        self.rule = rule
+        self.table = {value: rule(value) for value in seed}
+
+    def bits(self, values):
+        table = self.table
+        missing = set(values).difference(table)
+        if missing:
+            if len(table) + len(missing) > self.MAX_ENTRIES:
+                # Junk values: evaluate without growing the table
+                return [table[value] if value in table else self.rule(value) for value in values]
+            table.update((value, self.rule(value)) for value in missing)
+        return list(map(table.__getitem__, values))
+
+def column(rows, field):
+    """One stripped column; a missing or None value is empty, as for .get(field, '')"""
+    return [(row.get(field) or '').strip() for row in rows]
+
+def name_column_bits(names):
+    """Name rules column-wise: lengths first, the character scan only for rows of valid length"""
+    lengths = list(map(len, names))
+    isdisjoint = INVALID_NAME_CHARS.isdisjoint
+    return [(0 if isdisjoint(name) else NAME_INVALID_CHARS) if 3 <= length <= 100 else
+            NAME_REQUIRED if not length else NAME_TOO_SHORT if length < 3 else NAME_TOO_LONG
+            for name, length in zip(names, lengths)]
+
+class BatchValidationResult:
+    """Per-row error bitmap (array of uint16) for a validated batch"""
+    def __init__(self, bitmaps, rows):
+        self.bitmaps = bitmaps
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.bitmaps)
+
+    def is_valid(self, index):
+        return not self.bitmaps[index]
+
+    def invalid_rows(self):
+        return [index for index, bits in enumerate(self.bitmaps) if bits]
+
+    def messages(self, index):
+        """The same '• FIELD: message' list comprehensive_validation builds for this row"""
+        bits = self.bitmaps[index]
+        errors = [f"• {field}: {message}" for field, bit, message in RULES if bits & bit]
+        if bits & DUPLICATE_NAME:
+            row = self.rows[index]
+            errors.append(f"• Duplicate: Location name '{row['LOCATION_NAME']}' already exists in "
+                          f"Zone {row['ZONE']}, Aisle {row['AISLE']}")
+        return errors
+
+    def rule_counts(self):
+        """How many rows failed each rule"""
+        counts = {message: 0 for _, _, message in RULES}
+        counts['Duplicate name'] = 0
+        for bits in self.bitmaps:
+            if bits:
+                for _, bit, message in RULES:
+                    if bits & bit:
+                        counts[message] += 1
+                if bits & DUPLICATE_NAME:
+                    counts['Duplicate name'] += 1
+        return counts
+
+class BatchValidator:
+    """comprehensive_validation over whole batches, one rule table per column
+
+    Zone, aisle and type are checked through precomputed lookup tables of
+    their (few) distinct values; names by length and a character-set test.
+    `name_exists(name, zone, aisle)` adds the duplicate-name check for rows
+    whose fields are valid, as check_names=True does per row.
+    """
+    def __init__(self, name_exists=None):
+        self.name_exists = name_exists
+        self.zones = LookupColumn(zone_bits, string.ascii_uppercase)
+        self.aisles = LookupColumn(aisle_bits, [f"{number:02d}" for number in range(100)] +
+                                   [str(number) for number in range(10)])
+        self.types = LookupColumn(type_bits, VALID_LOCATION_TYPES)
+
+    def validate(self, rows):
+        rows = rows if isinstance(rows, list) else list(rows)
+        names = column(rows, 'LOCATION_NAME')
+        bitmaps = array('H', [name | zone | aisle | location_type for name, zone, aisle, location_type in zip(
+            name_column_bits(names),
+            self.zones.bits(column(rows, 'ZONE')),
+            self.aisles.bits(column(rows, 'AISLE')),
+            self.types.bits(column(rows, 'LOCATION_TYPE')))])
+        if self.name_exists is not None:
+            for index, bits in enumerate(bitmaps):
+                row = rows[index]
+                if not bits and self.name_exists(row['LOCATION_NAME'], row['ZONE'], row['AISLE']):
+                    bitmaps[index] = DUPLICATE_NAME
+        return BatchValidationResult(bitmaps, rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate a CSV of locations (LOCATION_NAME, ZONE, AISLE, "
+                                                 "LOCATION_TYPE columns) with the assistant's rules")
+    parser.add_argument('csv_path')
+    parser.add_argument('--rejects', help="Write failing rows with a REJECT_REASON column to this CSV")
+    parser.add_argument('--show', type=int, default=10, help="Failing rows to print")
+    args = parser.parse_args()
+
+    with open(args.csv_path, newline='', encoding='utf-8') as csv_file:
+        reader = csv.DictReader(csv_file)
+        rows = list(reader)
+        fieldnames = reader.fieldnames or []
+    start = time.perf_counter()
+    result = BatchValidator().validate(rows)
+    elapsed = time.perf_counter() - start
+    invalid = result.invalid_rows()
+    print(f"{len(rows):,} rows validated in {elapsed * 1000:.1f} ms: {len(rows) - len(invalid):,} valid, "
+          f"{len(invalid):,} invalid")
+    for message, count in result.rule_counts().items():
+        if count:
+            print(f"  {count:>8,}  {message}")
+    for index in invalid[:args.show]:
+        # Line 1 is the header
+        print(f"Line {index + 2}: " + '; '.join(error.lstrip('• ') for error in result.messages(index)))
+    if args.rejects:
+        with open(args.rejects, 'w', newline='', encoding='utf-8') as reject_file:
+            writer = csv.DictWriter(reject_file, fieldnames=['LINE_NUMBER'] + fieldnames + ['REJECT_REASON'],
+                                    extrasaction='ignore')
+            writer.writeheader()
+            for index in invalid:
+                writer.writerow(dict(rows[index], LINE_NUMBER=index + 2,
+                                     REJECT_REASON='; '.join(error.lstrip('• ') for error in result.messages(index))))
+    return 1 if invalid else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+
+from loadtest_chat import STATES, conversation, percentile
+
+SERVERS = {
+    # Flask's own server with a thread per connection, as `app.run` serves it
+    'sync': [sys.executable, '-c', "import sys; from web_ai_assistant import app; "
+                                   "app.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True)"],
+    'async': [sys.executable, 'async_web_assistant.py', '--host', '127.0.0.1', '--port']
+}
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def process_memory(pid):
+    """(resident KiB, thread count) of a server process from /proc"""
+    figures = {}
+    with open(f"/proc/{pid}/status", encoding='ascii') as status:
+        for line in status:
+            name, _, value = line.partition(':')
+            if name in ('VmRSS', 'Threads'):
+                figures[name] = int(value.split()[0])
+    return figures['VmRSS'], figures['Threads']
+
+def start_server(kind, store):
+    port = free_port()
+    env = dict(os.environ, WAREHOUSE_STORE=store)
+    # Never reach a real database
+    env.pop('ORACLE_DSN', None)
+    process = subprocess.Popen(SERVERS[kind] + [str(port)], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise SystemExit(f"The {kind} server did not start")
+
+class Client:
+    """One keep-alive HTTP/1.1 connection carrying one operator's session cookie"""
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+        self.cookie = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+
+    async def chat(self, message):
+        if self.writer is None:
+            await self.open()
+        body = json.dumps({'message': message}).encode()
+        head = (f"POST /chat HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n" + (f"Cookie: {self.cookie}\r\n" if self.cookie else '') + "\r\n")
+        self.writer.write(head.encode() + body)
+        await self.writer.drain()
+        response_head = (await self.reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+        length = 0
+        reconnect = False
+        for line in response_head.split('\r\n')[1:]:
+            name, _, value = line.partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+            elif name.lower() == 'set-cookie':
+                self.cookie = value.strip().split(';', 1)[0]
+            elif name.lower() == 'connection':
+                reconnect = value.strip().lower() == 'close'
+        reply = json.loads(await self.reader.readexactly(length))
+        if reconnect:
+            # Werkzeug's server closes the connection after every response
+            self.close()
+        return reply
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+async def run_sessions(port, sessions, concurrency, seed):
+    """Play `sessions` conversations, `concurrency` at a time; returns timings per state and wall time"""
+    rng = random.Random(seed)
+    pending = [conversation(rng, number) for number in range(sessions)]
+    timings = {state: [] for state in STATES}
+
+    async def operator():
+        while pending:
+            messages = pending.pop()
+            client = Client(port)
+            state = 'greeting'
+            for message in messages:
+                start = time.perf_counter()
+                state_before, state = state, (await client.chat(message))['state']
+                timings[state_before].append(time.perf_counter() - start)
+            client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(operator() for _ in range(concurrency)))
+    return timings, time.perf_counter() - start
+
+async def hold_idle(port, pid, connections, batch=200):
+    """Start `connections` sessions with one greeting each, then hold a connection open per session
+    waiting for the next message; returns memory before and after"""
+    before = process_memory(pid)
+    clients = []
+    for offset in range(0, connections, batch):
+        opened = [Client(port) for _ in range(min(batch, connections - offset))]
+        await asyncio.gather(*(client.chat('hi') for client in opened))
+        await asyncio.gather(*(client.open() for client in opened if client.writer is None))
+        clients.extend(opened)
+    await asyncio.sleep(1)
+    after = process_memory(pid)
+    for client in clients:
+        client.close()
+    return before, after
+
+def measure(kind, args):
+    process, port = start_server(kind, args.store)
+    try:
+        timings, wall = asyncio.run(run_sessions(port, args.sessions, args.concurrency, args.seed))
+        (rss_before, threads_before), (rss_after, threads_after) = asyncio.run(
+            hold_idle(port, process.pid, args.idle_connections))
+    finally:
+        process.terminate()
+        process.wait()
+    values = sorted(value for state_values in timings.values() for value in state_values)
+    return {
+        'requests_per_s': round(len(values) / wall, 1),
+        'p50_ms': round(percentile(values, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 3),
+        'idle_rss_kib': rss_after - rss_before,
+        'kib_per_idle_connection': round((rss_after - rss_before) / args.idle_connections, 2),
+        'threads': threads_after
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the Flask and asyncio /chat servers: "
+                                                 "latency under load and memory per idle connection")
+    parser.add_argument('--sessions', type=int, default=1000, help="Conversations played under load")
+    parser.add_argument('--concurrency', type=int, default=50, help="Operators chatting at once")
+    parser.add_argument('--idle-connections', type=int, default=2000,
+                        help="Keep-alive connections held open after one message each")
+    parser.add_argument('--store', default='memory', help="Local stand-in database: memory or sqlite:<path>")
+    parser.add_argument('--servers', default='sync,async')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    # Both ends hold one descriptor per idle connection
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = args.idle_connections + 256
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+
+    print(f"{args.sessions:,} conversations at concurrency {args.concurrency}, "
+          f"{args.idle_connections:,} idle connections, store {args.store}")
+    print(f"{'server':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'idle RSS KiB':>14}{'KiB/idle conn':>15}{'threads':>9}")
+    for kind in args.servers.split(','):
+        figures = measure(kind, args)
+        print(f"{kind:<8}{figures['requests_per_s']:>10,.1f}{figures['p50_ms']:>10.3f}{figures['p99_ms']:>10.3f}"
+              f"{figures['idle_rss_kib']:>14,}{figures['kib_per_idle_connection']:>15.2f}{figures['threads']:>9,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import random
+import time
+
+from location_store import open_store
+from warehouse_ai_assistant_auto import WarehouseAIAssistant
+
+NAMES = ['Pick Face {i}', 'Bulk Rack {i}', 'ab', '', '   ', 'x' * 101, 'x' * 100, 'Bad <{i}>', "O'Brien {i}",
+         '  Padded Name {i}  ', 'Bay\t{i}\n']
+ZONES = ['A', 'B', 'J', 'Z', 'a', '', 'AA', '1', ' C ', 'É']
+AISLES = ['01', '1', '99', '00', '0', '100', '7a', '', ' 05 ', '٠٣', '١٢', '²']
+TYPES = ['Bay', 'Rack', 'Shelf', 'bay', 'Bin', '', ' Slot ', 'Warehouse']
+
+def generate_rows(count, seed=7):
+    """Mostly valid rows plus every edge case the per-row validators distinguish"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        clean = rng.random() < 0.7
+        rows.append({
+            'LOCATION_NAME': f"Pick Face {i}" if clean else rng.choice(NAMES).format(i=i),
+            'ZONE': rng.choice('ABCDEFGHIJ') if clean else rng.choice(ZONES),
+            'AISLE': f"{rng.randint(1, 40):02d}" if clean else rng.choice(AISLES),
+            'LOCATION_TYPE': 'Bay' if clean else rng.choice(TYPES)
+        })
+    return rows
+
+def per_row(assistant, rows, check_names):
+    results = []
+    for row in rows:
+        assistant.current_location = dict(row)
+        is_valid, errors = assistant.comprehensive_validation(check_names=check_names)
+        results.append(list(errors))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare batch validation with per-row comprehensive_validation")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--check-names', action='store_true',
+                        help="Include the duplicate-name check against a pre-filled in-memory store")
+    args = parser.parse_args()
+
+    rows = generate_rows(args.rows)
+    store = open_store('memory')
+    if args.check_names:
+        # Every tenth well-formed row's name already exists in its zone/aisle
+        seeded = [row for row in rows[::10] if len(row['ZONE'] + row['AISLE']) == 3 and row['AISLE'].isascii()]
+        for i, row in enumerate(seeded):
+            store.insert_location({'LOCATION_ID': f"{row['ZONE']}{row['AISLE']}{i:06d}",
+                                   'LOCATION_NAME': row['LOCATION_NAME'], 'SITE_CODE': 'WH1', 'LOCATION_TYPE': 'Bay'})
+    assistant = WarehouseAIAssistant(store=store)
+
+    start = time.perf_counter()
+    expected = per_row(assistant, rows, args.check_names)
+    per_row_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = assistant.validate_batch(rows, check_names=args.check_names)
+    batch_seconds = time.perf_counter() - start
+
+    mismatches = [index for index in range(len(rows)) if result.messages(index) != expected[index]]
+    if mismatches:
+        index = mismatches[0]
+        raise SystemExit(f"{len(mismatches)} mismatches; row {index} {rows[index]!r}: "
+                         f"{result.messages(index)} != {expected[index]}")
+    invalid = len(result.invalid_rows())
+    print(f"{len(rows):,} rows ({invalid:,} invalid), identical messages for every row")
+    print(f"{'per-row':<10}{per_row_seconds * 1000:>10.1f} ms{len(rows) / per_row_seconds:>14,.0f} rows/s")
+    print(f"{'batch':<10}{batch_seconds * 1000:>10.1f} ms{len(rows) / batch_seconds:>14,.0f} rows/s"
+          f"  ({per_row_seconds / batch_seconds:.1f}x)")
+
+if __name__ == "__main__":
+    main()
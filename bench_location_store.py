@@ -0,0 +1,77 @@
+import argparse
+import os
+import tempfile
+import time
+
+from location_store import OracleLocationStore, SQLiteLocationStore, open_store
+from utterance_parser import ZONE_AISLE_PARSER
+from warehouse_ai_assistant_auto import WarehouseAIAssistant
+
+STAGES = ['parse', 'validate', 'allocate', 'insert', 'fetch']
+
+def utterances(count, zones='ABCDEFGHIJ'):
+    """Realistic create requests spread over zones and aisles"""
+    for i in range(count):
+        zone = zones[i % len(zones)]
+        aisle = (i // len(zones)) % 40 + 1
+        yield f'Create location name "Pick Face {i}", zone {zone}, aisle {aisle:02d}, type bay'
+
+def run_store(store, count):
+    """Drive the auto assistant's create path against one store, timing each stage"""
+    assistant = WarehouseAIAssistant(store=store)
+    totals = dict.fromkeys(STAGES, 0.0)
+    created = 0
+    for utterance in utterances(count):
+        t0 = time.perf_counter()
+        assistant.current_location = ZONE_AISLE_PARSER.parse(utterance)
+        t1 = time.perf_counter()
+        is_valid, _ = assistant.comprehensive_validation()
+        t2 = time.perf_counter()
+        assistant.generate_auto_fields()
+        t3 = time.perf_counter()
+        success, _ = assistant.insert_location() if is_valid else (False, None)
+        t4 = time.perf_counter()
+        if success:
+            store.fetch_inserted_record(assistant.current_location['LOCATION_ID'])
+            created += 1
+        t5 = time.perf_counter()
+        for stage, elapsed in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)):
+            totals[stage] += elapsed
+    return created, totals
+
+def open_bench_store(name, workdir):
+    """A '-nocache' suffix opens a cursor per call instead of reusing one per statement"""
+    cache_statements = not name.endswith('-nocache')
+    name = name.removesuffix('-nocache')
+    if name == 'sqlite-file':
+        return SQLiteLocationStore(os.path.join(workdir, f"loc_bench_{cache_statements}.db"), cache_statements)
+    if name == 'sqlite':
+        return SQLiteLocationStore(cache_statements=cache_statements)
+    if name == 'oracle':
+        import cx_Oracle
+        conn = cx_Oracle.connect(os.environ['ORACLE_USER'], os.environ['ORACLE_PASSWORD'], os.environ['ORACLE_DSN'])
+        return OracleLocationStore(conn, cache_statements=cache_statements)
+    return open_store(name)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the create-location path per storage backend")
+    parser.add_argument('--count', type=int, default=2000, help="Locations to create per store")
+    parser.add_argument('--stores', default='memory,sqlite,sqlite-nocache,sqlite-file',
+                        help="Comma list of memory, sqlite, sqlite-file, oracle (oracle reads ORACLE_USER/"
+                             "ORACLE_PASSWORD/ORACLE_DSN and inserts real rows); add -nocache to a database "
+                             "store to compare against a cursor per call, e.g. oracle,oracle-nocache")
+    args = parser.parse_args()
+
+    print(f"{'store':<21}{'created':>9}" + ''.join(f"{stage + ' µs':>13}" for stage in STAGES) + f"{'loc/s':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.stores.split(','):
+            store = open_bench_store(name.strip(), workdir)
+            try:
+                created, totals = run_store(store, args.count)
+            finally:
+                store.close()
+            per_op = ''.join(f"{totals[stage] / args.count * 1e6:>13.1f}" for stage in STAGES)
+            print(f"{name:<21}{created:>9}{per_op}{args.count / sum(totals.values()):>10,.0f}")
+
+if __name__ == "__main__":
+    main()
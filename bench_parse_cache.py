@@ -0,0 +1,75 @@
+import argparse
+import random
+import time
+
+from utterance_parser import LOCATION_ID_PARSER, ZONE_AISLE_PARSER, ParseCache
+
+NAMES = ['Cold Dock', 'Pick Face', 'Main', 'Overflow North', 'Returns', 'Mezzanine East', 'Bulk']
+
+# Values that must not be read through a template: keywords inside names and
+# site codes, "site code" lookalikes, values running into the next character
+ADVERSARIAL = [
+    'create location name Storage Room 3, zone A, aisle 01, type bay',
+    'create location name Dock 4, zone AB, aisle 01, type bay',
+    'create location name Dock 4, zone A, aisle 123, type bay',
+    'create location name Dock 4, zone name, aisle 01, type bay',
+    'create location name "Rack 9", zone C, aisle 02, type slot',
+    'create location name "Dock 9, zone C, aisle 02, type slot',
+    'create location ID 104, name Dock 4, site code WH1, type shelf',
+    'create location ID 105, name Dock 5, site code CODEX, type shelf',
+    'create location ID 106, name Dock 6, site code code, type shelf',
+    'create location ID 107, name Dock 7, site code code 12, type shelf',
+    'create location ID 108, name Dock 8, site code SITE9, type shelf',
+    'create location ID 10a, name Dock 8, site code WH1, type shelf',
+    'create location ID 109, name Zone Dock, site code WH1, type shelf',
+]
+
+def zone_aisle_utterances(rng, count, adversarial_share):
+    for _ in range(count):
+        if rng.random() < adversarial_share:
+            yield rng.choice(ADVERSARIAL)
+        else:
+            yield (f"create location name {rng.choice(NAMES)} {rng.randint(1, 999)}, "
+                   f"zone {rng.choice('ABCD')}, aisle {rng.randint(1, 40):02d}, type bay")
+
+def location_id_utterances(rng, count, adversarial_share):
+    for _ in range(count):
+        if rng.random() < adversarial_share:
+            yield rng.choice(ADVERSARIAL)
+        else:
+            yield (f"Create location ID {rng.randint(100, 99999)}, name \"{rng.choice(NAMES)} {rng.randint(1, 99)}\", "
+                   f"site code WH{rng.randint(1, 4)}, type shelf")
+
+WORKLOADS = {
+    'zone/aisle': (ZONE_AISLE_PARSER, zone_aisle_utterances),
+    'location id': (LOCATION_ID_PARSER, location_id_utterances)
+}
+
+def timed(func, utterances):
+    start = time.perf_counter()
+    results = [func(utterance) for utterance in utterances]
+    return results, (time.perf_counter() - start) / len(utterances) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cached and uncached utterance parsing "
+                                                 "on templated operator utterances")
+    parser.add_argument('--utterances', type=int, default=50000)
+    parser.add_argument('--adversarial', type=float, default=0.05, help="Share of adversarial utterances")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'workload':<14}{'parse µs':>10}{'cached µs':>11}{'exact hits':>12}{'template hits':>15}{'hit rate':>10}")
+    for name, (utterance_parser, generate) in WORKLOADS.items():
+        utterances = list(generate(random.Random(args.seed), args.utterances, args.adversarial))
+        cache = ParseCache(utterance_parser)
+        expected, parse_us = timed(utterance_parser.parse, utterances)
+        results, cached_us = timed(cache.parse, utterances)
+        for utterance, result, wanted in zip(utterances, results, expected):
+            if result != wanted:
+                raise SystemExit(f"Mismatch on '{utterance}': {result} != {wanted}")
+        stats = cache.stats()
+        print(f"{name:<14}{parse_us:>10.1f}{cached_us:>11.1f}{stats['exact_hits']:>12,}"
+              f"{stats['template_hits']:>15,}{stats['hit_rate']:>10.1%}")
+
+if __name__ == "__main__":
+    main()
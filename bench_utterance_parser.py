@@ -0,0 +1,67 @@
+import argparse
+import re
+import timeit
+
+from utterance_parser import BASIC_TYPE_KEYWORDS, LOCATION_ID_PARSER
+
+def legacy_extract_location_info(user_input):
+    """The per-field regex chain the assistants used before utterance_parser"""
+    current_location = {}
+    user_input = user_input.lower()
+
+    location_id_match = re.search(r'location\s*(?:id|#)?\s*[:\-]?\s*(\d+)', user_input)
+    if location_id_match:
+        current_location['LOCATION_ID'] = location_id_match.group(1)
+
+    name_match = re.search(r'name\s*[:\-]?\s*["\']([^"\']+)["\']', user_input)
+    if not name_match:
+        name_match = re.search(r'name\s*[:\-]?\s*(\w+(?:\s+\w+)*)', user_input)
+    if name_match:
+        current_location['LOCATION_NAME'] = name_match.group(1).title()
+
+    site_match = re.search(r'site\s*(?:code)?\s*[:\-]?\s*([a-zA-Z0-9]+)', user_input)
+    if site_match:
+        current_location['SITE_CODE'] = site_match.group(1).upper()
+
+    for keyword, location_type in BASIC_TYPE_KEYWORDS.items():
+        if keyword in user_input:
+            current_location['LOCATION_TYPE'] = location_type
+            break
+    return current_location
+
+def build_cases(scale):
+    """Typical, long and adversarial utterances; the adversarial whitespace runs
+    are kept small for the legacy chain, whose nested \\s* backtracking is cubic"""
+    typical = 'Create location ID 101, name "Main Storage Area", site code WH1, type warehouse'
+    long_text = ' '.join(['please add a new bin next to the loading dock'] * 50 * scale) + ' ' + typical
+    return [
+        ('typical', typical, typical),
+        ('long', long_text, long_text),
+        ('whitespace run', 'location' + ' ' * 150 + '!', 'location' + ' ' * 20000 * scale + '!'),
+        ('unclosed quote', 'name "' + 'x' * 2000 * scale, 'name "' + 'x' * 2000 * scale),
+        ('repeated labels', 'name: ' * 500 * scale, 'name: ' * 500 * scale),
+    ]
+
+def time_call(func, text, number):
+    """Best per-call time in microseconds over a few repeats"""
+    best = min(timeit.repeat(lambda: func(text), number=number, repeat=3))
+    return best / number * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare utterance_parser with the legacy regex chain")
+    parser.add_argument('--number', type=int, default=200, help="Calls per timing repeat")
+    parser.add_argument('--scale', type=int, default=1, help="Multiplier for long/adversarial input sizes")
+    args = parser.parse_args()
+
+    print(f"{'case':<18}{'legacy len':>12}{'legacy µs':>14}{'parser len':>12}{'parser µs':>14}")
+    for name, legacy_text, parser_text in build_cases(args.scale):
+        expected = legacy_extract_location_info(legacy_text)
+        if LOCATION_ID_PARSER.parse(legacy_text) != expected:
+            raise SystemExit(f"Mismatch on case '{name}': {LOCATION_ID_PARSER.parse(legacy_text)} != {expected}")
+        number = max(1, args.number // 20) if name == 'whitespace run' else args.number
+        legacy_us = time_call(legacy_extract_location_info, legacy_text, number)
+        parser_us = time_call(LOCATION_ID_PARSER.parse, parser_text, number)
+        print(f"{name:<18}{len(legacy_text):>12}{legacy_us:>14.1f}{len(parser_text):>12}{parser_us:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import getpass
+import socket
+import threading
+import time
+
+from metrics import METRICS
+
+# Cold-start reference point: the assistants import this before their other local modules
+PROCESS_START = time.perf_counter()
+
+class DatabaseConnectError(Exception):
+    """Raised on first use of a DeferredConnection whose connect failed"""
+
+def dsn_address(dsn):
+    """(host, port) of an Easy Connect DSN such as host:port/service; None for a TNS alias or descriptor"""
+    if not dsn or '(' in dsn:
+        return None
+    address = dsn.split('://', 1)[-1].lstrip('/').split('/', 1)[0].split('?', 1)[0]
+    if address == dsn.strip():
+        # No service part: a tnsnames.ora alias, resolved by the client library
+        return None
+    host, _, port = address.rpartition(':') if address.count(':') == 1 else (address, '', '')
+    return host, int(port) if port.isdigit() else 1521
+
+def load_driver():
+    """Import cx_Oracle and load the Oracle client libraries (the slow part of the first connect)"""
+    import cx_Oracle
+    cx_Oracle.clientversion()
+    return cx_Oracle
+
+class DeferredConnection:
+    """Stands in for a connection still being opened; the first use waits for it"""
+    def __init__(self, open_connection):
+        self.connection = None
+        self.error = None
+        self.thread = threading.Thread(target=self._open, args=(open_connection,), name='db-connect', daemon=True)
+        self.thread.start()
+
+    def _open(self, open_connection):
+        try:
+            self.connection = open_connection()
+        except Exception as e:
+            self.error = e
+
+    @property
+    def failed(self):
+        """True once the background connect has finished with an error (never blocks)"""
+        return not self.thread.is_alive() and self.error is not None
+
+    def resolve(self):
+        if self.connection is None:
+            self.thread.join()
+            if self.error is not None:
+                raise DatabaseConnectError(f"Database connection failed: {self.error}") from self.error
+        return self.connection
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def close(self):
+        """Close the session if it opened; a failed connect has nothing to close"""
+        self.thread.join()
+        if self.connection is not None:
+            self.connection.close()
+
+class ConnectionPrewarm:
+    """Overlap the slow parts of opening an Oracle session with the operator typing
+
+    warm() starts importing the driver, loading the client libraries and
+    resolving the listener host as soon as the DSN is known; connect() starts
+    the handshake once the credentials are in and returns a DeferredConnection,
+    so the assistant can take the first utterance while the session
+    authenticates. Each phase is recorded under startup.* in METRICS.
+    """
+    def __init__(self):
+        self.timings = {}
+        self.warm_thread = None
+        # Typing time is the operator's, so readiness is measured from the last answer
+        self.credentials_entered = None
+
+    def record(self, phase, start):
+        elapsed = time.perf_counter() - start
+        self.timings[phase] = elapsed
+        METRICS.observe(f"startup.{phase}", elapsed)
+
+    def warm(self, dsn):
+        self.warm_thread = threading.Thread(target=self._warm, args=(dsn,), name='db-prewarm', daemon=True)
+        self.warm_thread.start()
+
+    def _warm(self, dsn):
+        # Failures are left for connect() to report with the driver's own message
+        try:
+            start = time.perf_counter()
+            load_driver()
+            self.record('driver_load', start)
+            address = dsn_address(dsn)
+            if address:
+                start = time.perf_counter()
+                socket.getaddrinfo(*address, type=socket.SOCK_STREAM)
+                self.record('dsn_resolve', start)
+        except Exception:
+            pass
+
+    def connect(self, username, password, dsn, phase='connect'):
+        """Start cx_Oracle.connect in the background and return its DeferredConnection"""
+        def open_connection():
+            if self.warm_thread is not None:
+                self.warm_thread.join()
+            cx_Oracle = load_driver()
+            start = time.perf_counter()
+            conn = cx_Oracle.connect(username, password, dsn)
+            self.record(phase, start)
+            if phase == 'connect':
+                self.timings['session_ready'] = time.perf_counter() - (self.credentials_entered or PROCESS_START)
+            return conn
+        return DeferredConnection(open_connection)
+
+    def prompt_and_connect(self):
+        """Ask for the DSN first so warming overlaps typing the credentials"""
+        self.timings['first_prompt'] = time.perf_counter() - PROCESS_START
+        dsn = input("Enter Oracle DSN (e.g., host:port/service): ")
+        self.warm(dsn)
+        username = input("Enter Oracle username: ")
+        password = getpass.getpass("Enter Oracle password: ")
+        self.credentials_entered = time.perf_counter()
+        return self.connect(username, password, dsn), (username, password, dsn)
+
+    def mark_ready(self):
+        """Record how long the assistant took to be ready for the first utterance"""
+        self.timings['ready'] = time.perf_counter() - (self.credentials_entered or PROCESS_START)
+        METRICS.observe('startup.ready', self.timings['ready'])
+
+    def report(self):
+        since = "after the credentials were entered" if self.credentials_entered else "after start"
+        parts = [f"first prompt after {self.timings['first_prompt'] * 1000:.0f} ms"] if 'first_prompt' in self.timings else []
+        if 'ready' in self.timings:
+            parts.append(f"ready for input {self.timings['ready'] * 1000:.0f} ms {since}")
+        if 'session_ready' in self.timings:
+            parts.append(f"database session after {self.timings['session_ready'] * 1000:.0f} ms")
+        phases = ', '.join(f"{phase.replace('_', ' ')} {self.timings[phase] * 1000:.0f} ms"
+                           for phase in ('driver_load', 'dsn_resolve', 'connect') if phase in self.timings)
+        return f"⏱️ Startup: {'; '.join(parts)}" + (f" ({phases})" if phases else '')
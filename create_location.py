@@ -1,15 +1,33 @@
-import cx_Oracle
-import getpass
+import argparse
+import csv
+import hashlib
+import sys
+from collections import Counter
 from datetime import datetime
+from itertools import chain
+from connection_prewarm import ConnectionPrewarm
+from loc_export import EXPORT_FORMATS, EXPORT_PAGE_SIZE, LIST_FILTERS, export_chunks, location_pages
+from location_store import INSERT_INPUT_SIZES, INSERT_SQL, LOC_COLUMNS, SYNC_COLUMNS, open_store
+import sql_trace
+from statement_cache import StatementCache, scan
+
+MANDATORY_FIELDS = ['LOCATION_ID', 'LOCATION_NAME', 'SITE_CODE', 'LOCATION_TYPE']
+CSV_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+# Oracle rejects IN lists with more than 1000 expressions
+MAX_IN_LIST = 1000
+# IN-list lengths with a cached statement. A shorter chunk repeats its last ID
+# up to the next size, so an import keeps at most this many cursors open
+# whatever its batch sizes and reject counts.
+IN_LIST_SIZES = (10, 50, 200, MAX_IN_LIST)
 
 # 1. Establish connection to the Oracle database for the specified site.
 def get_db_connection():
-    # Prompt user for Oracle DB credentials and connection string
-    username = input("Enter Oracle username: ")
-    password = getpass.getpass("Enter Oracle password: ")
-    dsn = input("Enter Oracle DSN (e.g., host:port/service): ")
-    # Establish and return the database connection
-    return cx_Oracle.connect(username, password, dsn)
+    # Prompt for the DSN first, then the credentials: the driver loads and the
+    # host resolves while they are typed, and the session opens in the
+    # background while the location details are entered. The first use of the
+    # connection waits for it (and raises if the connect failed).
+    conn, _ = ConnectionPrewarm().prompt_and_connect()
+    return sql_trace.trace_connection(conn)
 
 def get_location_input():
     # Collect all required fields from the user
@@ -25,20 +43,17 @@ def get_location_input():
 def validate_fields(location):
     # --- Field Validation ---
     # Check that all mandatory fields are provided
-    missing = [field for field in ['LOCATION_ID', 'LOCATION_NAME', 'SITE_CODE', 'LOCATION_TYPE'] if not location[field]]
+    missing = [field for field in MANDATORY_FIELDS if not location[field]]
     if missing:
         # If any mandatory field is missing, print which ones
         print(f"Mandatory fields are required: {', '.join(missing)}")
         return False
     return True
 
-def check_duplicate(conn, location_id):
+def check_duplicate(store, location_id):
     # --- Duplicate Check ---
     # Query the LOC table to see if the LOCATION_ID already exists
-    cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM LOC WHERE LOCATION_ID = :id", id=location_id)
-    exists = cursor.fetchone() is not None
-    cursor.close()
+    exists = store.check_duplicate(location_id)
     if exists:
         # If LOCATION_ID exists, inform the user
         print("Location ID already available")
@@ -57,48 +72,330 @@ def show_test_result(location):
             return approval == 'yes'
         print("Please enter 'yes' or 'no'.")
 
-def insert_location(conn, location):
+def insert_location(store, location):
     # --- Insert into LOC Table ---
     # Insert the new location data into the LOC table with metadata
-    cursor = conn.cursor()
-    sql = """
-        INSERT INTO LOC (LOCATION_ID, LOCATION_NAME, SITE_CODE, LOCATION_TYPE, CREATED_BY, CREATED_DATE)
-        VALUES (:LOCATION_ID, :LOCATION_NAME, :SITE_CODE, :LOCATION_TYPE, :CREATED_BY, :CREATED_DATE)
-    """
-    cursor.execute(sql, location)
-    conn.commit()
-    cursor.close()
-
-def fetch_inserted_record(conn, location_id):
+    store.insert_location(location)
+
+def fetch_inserted_record(store, location_id):
     # Fetch the inserted record details for confirmation
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM LOC WHERE LOCATION_ID = :id", id=location_id)
-    row = cursor.fetchone()
-    columns = [col[0] for col in cursor.description]
-    cursor.close()
-    return dict(zip(columns, row)) if row else None
-
-def main():
+    return store.fetch_inserted_record(location_id)
+
+def read_location_batches(path, batch_size):
+    # --- Streaming CSV Reader ---
+    # Yield (line_number, row) chunks so only one batch is held in memory at a time
+    with open(path, newline='', encoding='utf-8') as csv_file:
+        reader = csv.DictReader(csv_file)
+        batch = []
+        for row in reader:
+            batch.append((reader.line_num, row))
+            if len(batch) >= batch_size:
+                yield reader.fieldnames, batch
+                batch = []
+        if batch:
+            yield reader.fieldnames, batch
+
+def prepare_import_row(row, default_created_by):
+    # Turn one CSV row into insert binds, or return the reason it was rejected
+    location = {field: (row.get(field) or '').strip() for field in LOC_COLUMNS}
+    missing = [field for field in MANDATORY_FIELDS if not location[field]]
+    if missing:
+        return None, f"Mandatory fields are required: {', '.join(missing)}"
+    location['CREATED_BY'] = location['CREATED_BY'] or default_created_by
+    if location['CREATED_DATE']:
+        try:
+            location['CREATED_DATE'] = datetime.strptime(location['CREATED_DATE'], CSV_DATE_FORMAT)
+        except ValueError:
+            return None, f"CREATED_DATE must match {CSV_DATE_FORMAT}"
+    else:
+        location['CREATED_DATE'] = datetime.now()
+    return location, None
+
+def find_existing_location_ids(statements, location_ids):
+    # --- Set-based Duplicate Check ---
+    # One query per chunk of IDs instead of one check_duplicate round trip per row.
+    # Chunks are padded to one of IN_LIST_SIZES, so every batch reuses a cached statement.
+    existing = set()
+    for start in range(0, len(location_ids), MAX_IN_LIST):
+        chunk = location_ids[start:start + MAX_IN_LIST]
+        size = next(size for size in IN_LIST_SIZES if size >= len(chunk))
+        chunk = chunk + [chunk[-1]] * (size - len(chunk))
+        binds = ', '.join(f":{i + 1}" for i in range(size))
+        sql = f"SELECT LOCATION_ID FROM LOC WHERE LOCATION_ID IN ({binds})"
+        cursor = statements.cursor(sql, **scan(MAX_IN_LIST))
+        cursor.execute(sql, chunk)
+        existing.update(row[0] for row in cursor)
+    return existing
+
+def insert_location_batch(statements, locations):
+    # --- Array Insert ---
+    # Insert a whole batch in one executemany call; rows the database refuses are
+    # reported back as (index, message) instead of failing the batch
+    cursor = statements.cursor(INSERT_SQL, inputsizes=INSERT_INPUT_SIZES)
+    cursor.executemany(INSERT_SQL, locations, batcherrors=True)
+    errors = [(error.offset, error.message) for error in cursor.getbatcherrors()]
+    statements.conn.commit()
+    return errors
+
+def import_locations(conn, path, batch_size=500, reject_path=None, created_by='CSV_Import'):
+    # --- Bulk CSV Import ---
+    # Stream the file in batches: validate, check duplicates once per batch,
+    # array-insert and commit per batch. Rejected rows go to a reject file.
+    reject_path = reject_path or f"{path}.rejects.csv"
+    statements = StatementCache(conn)
+    try:
+        return import_batches(statements, path, batch_size, reject_path, created_by)
+    finally:
+        statements.close()
+
+def import_batches(statements, path, batch_size, reject_path, created_by):
+    # The import itself; the caller closes the cached cursors however it ends
+    inserted = rejected = 0
+    with open(reject_path, 'w', newline='', encoding='utf-8') as reject_file:
+        reject_writer = None
+        for batch_number, (fieldnames, batch) in enumerate(read_location_batches(path, batch_size), 1):
+            if reject_writer is None:
+                reject_writer = csv.DictWriter(reject_file, fieldnames=['LINE_NUMBER'] + list(fieldnames) + ['REJECT_REASON'],
+                                               extrasaction='ignore')
+                reject_writer.writeheader()
+            rejects = []
+            candidates = []
+            seen_ids = set()
+            for line_number, row in batch:
+                location, error = prepare_import_row(row, created_by)
+                if error is None and location['LOCATION_ID'] in seen_ids:
+                    error = "Duplicate LOCATION_ID in file"
+                if error:
+                    rejects.append((line_number, row, error))
+                    continue
+                seen_ids.add(location['LOCATION_ID'])
+                candidates.append((line_number, row, location))
+
+            existing = find_existing_location_ids(statements, [location['LOCATION_ID'] for _, _, location in candidates])
+            pending = []
+            for line_number, row, location in candidates:
+                if location['LOCATION_ID'] in existing:
+                    rejects.append((line_number, row, "Location ID already available"))
+                else:
+                    pending.append((line_number, row, location))
+
+            if pending:
+                errors = insert_location_batch(statements, [location for _, _, location in pending])
+                for offset, message in errors:
+                    line_number, row, _ = pending[offset]
+                    rejects.append((line_number, row, message))
+                inserted += len(pending) - len(errors)
+
+            rejects.sort(key=lambda reject: reject[0])
+            for line_number, row, reason in rejects:
+                reject_writer.writerow(dict(row, LINE_NUMBER=line_number, REJECT_REASON=reason))
+            rejected += len(rejects)
+            print(f"Batch {batch_number}: {len(batch) - len(rejects)} inserted, {len(rejects)} rejected")
+
+    print(f"\nImport complete: {inserted} inserted, {rejected} rejected.")
+    if rejected:
+        print(f"Rejected rows written to {reject_path}")
+    return inserted, rejected
+
+def content_hash(location):
+    # --- Row Fingerprint ---
+    # Digest of the columns a sync may change, so a CSV row and a LOC row compare in one step
+    content = '\x1f'.join('' if location[column] is None else str(location[column]) for column in SYNC_COLUMNS)
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
+
+def apply_sync_batch(apply, pending, rejects):
+    # Run one array insert or update; rows the database refuses join the rejects.
+    # Returns how many were refused.
+    if not pending:
+        return 0
+    errors = apply([location for _, _, location in pending])
+    for offset, message in errors:
+        line_number, row, _ = pending[offset]
+        rejects.append((line_number, row, message))
+    return len(errors)
+
+def sync_locations(store, path, batch_size=500, page_size=EXPORT_PAGE_SIZE, dry_run=False, reject_path=None,
+                   created_by='CSV_Import'):
+    # --- Incremental CSV Sync ---
+    # Stream-merge the CSV, sorted by LOCATION_ID, with a keyset scan of LOC.
+    # IDs only in the file are inserted and rows whose content hash differs are
+    # updated, as array DML with one commit per CSV batch; memory holds one CSV
+    # batch and one LOC page. LOC rows missing from the file are only counted.
+    reject_path = reject_path or f"{path}.rejects.csv"
+    insert_verb, update_verb = ("to insert", "to update") if dry_run else ("inserted", "updated")
+    totals = Counter()
+    changed_columns = Counter()
+    # Every row inserted sorts before the LOC row under the cursor, which is on a page
+    # already fetched, so later keyset pages never return it
+    loc_rows = chain.from_iterable(location_pages(store, page_size))
+    current = next(loc_rows, None)
+    previous_id = None
+    with open(reject_path, 'w', newline='', encoding='utf-8') as reject_file:
+        reject_writer = None
+        for batch_number, (fieldnames, batch) in enumerate(read_location_batches(path, batch_size), 1):
+            if reject_writer is None:
+                reject_writer = csv.DictWriter(reject_file, fieldnames=['LINE_NUMBER'] + list(fieldnames) + ['REJECT_REASON'],
+                                               extrasaction='ignore')
+                reject_writer.writeheader()
+            rejects = []
+            inserts = []
+            updates = []
+            for line_number, row in batch:
+                location, error = prepare_import_row(row, created_by)
+                if error is None:
+                    location_id = location['LOCATION_ID']
+                    if previous_id is not None and location_id < previous_id:
+                        raise ValueError(f"{path} line {line_number}: LOCATION_ID {location_id} comes after "
+                                         f"{previous_id}; sync needs the file sorted by LOCATION_ID")
+                    if location_id == previous_id:
+                        error = "Duplicate LOCATION_ID in file"
+                if error:
+                    rejects.append((line_number, row, error))
+                    continue
+                previous_id = location_id
+
+                while current is not None and current[0] < location_id:
+                    totals['loc_only'] += 1
+                    current = next(loc_rows, None)
+                if current is not None and current[0] == location_id:
+                    existing = dict(zip(LOC_COLUMNS, current))
+                    current = next(loc_rows, None)
+                    if content_hash(existing) == content_hash(location):
+                        totals['unchanged'] += 1
+                        continue
+                    changed_columns.update(column for column in SYNC_COLUMNS if existing[column] != location[column])
+                    updates.append((line_number, row, location))
+                else:
+                    inserts.append((line_number, row, location))
+
+            inserted, updated = len(inserts), len(updates)
+            if not dry_run:
+                inserted -= apply_sync_batch(store.insert_locations, inserts, rejects)
+                updated -= apply_sync_batch(store.update_locations, updates, rejects)
+
+            rejects.sort(key=lambda reject: reject[0])
+            for line_number, row, reason in rejects:
+                reject_writer.writerow(dict(row, LINE_NUMBER=line_number, REJECT_REASON=reason))
+            totals['inserted'] += inserted
+            totals['updated'] += updated
+            totals['rejected'] += len(rejects)
+            print(f"Batch {batch_number}: {inserted} {insert_verb}, {updated} {update_verb}, {len(rejects)} rejected")
+
+    if current is not None:
+        totals['loc_only'] += 1 + sum(1 for _ in loc_rows)
+    print(f"\n{'Dry run' if dry_run else 'Sync'} complete: {totals['inserted']} {insert_verb}, "
+          f"{totals['updated']} {update_verb}, {totals['unchanged']} unchanged, {totals['rejected']} rejected; "
+          f"{totals['loc_only']} LOC rows are not in the file")
+    if changed_columns:
+        print("Changed columns: " + ", ".join(f"{column} {count}" for column, count in changed_columns.most_common()))
+    if totals['rejected']:
+        print(f"Rejected rows written to {reject_path}")
+    return dict(totals, changed_columns=dict(changed_columns))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Create warehouse locations in the LOC table.")
+    parser.add_argument('--store', default='oracle',
+                        help="Storage backend for single-location, sync and export modes: oracle, memory or sqlite:<path>")
+    parser.add_argument('--sql-trace', metavar='LOG', help="Trace every SQL statement to the JSONL query LOG")
+    subparsers = parser.add_subparsers(dest='command')
+    import_parser = subparsers.add_parser('import', help="Bulk import locations from a CSV file")
+    import_parser.add_argument('csv_path', help="CSV file shaped like sample_locations.csv")
+    import_parser.add_argument('--batch-size', type=int, default=500, help="Rows per array insert and commit")
+    import_parser.add_argument('--reject-file', help="Where to write rejected rows (default: <csv_path>.rejects.csv)")
+    import_parser.add_argument('--created-by', default='CSV_Import', help="CREATED_BY for rows that leave it empty")
+    sync_parser = subparsers.add_parser('sync', help="Apply only the inserts and changes in a CSV sorted by LOCATION_ID")
+    sync_parser.add_argument('csv_path', help="CSV file shaped like sample_locations.csv, sorted by LOCATION_ID")
+    sync_parser.add_argument('--batch-size', type=int, default=500, help="CSV rows per array insert/update and commit")
+    sync_parser.add_argument('--page-size', type=int, default=EXPORT_PAGE_SIZE, help="LOC rows per keyset page and fetch")
+    sync_parser.add_argument('--dry-run', action='store_true', help="Report the differences without changing LOC")
+    sync_parser.add_argument('--reject-file', help="Where to write rejected rows (default: <csv_path>.rejects.csv)")
+    sync_parser.add_argument('--created-by', default='CSV_Import', help="CREATED_BY for inserted rows that leave it empty")
+    export_parser = subparsers.add_parser('export', help="Stream LOC rows to CSV or NDJSON in LOCATION_ID order")
+    export_parser.add_argument('--zone', help="Only LOCATION_IDs starting with this zone letter")
+    export_parser.add_argument('--aisle', help="Only this aisle (the two digits after the zone)")
+    export_parser.add_argument('--site-code')
+    export_parser.add_argument('--location-type')
+    export_parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+    export_parser.add_argument('--output', default='-', help="File to write (default: standard output)")
+    export_parser.add_argument('--page-size', type=int, default=EXPORT_PAGE_SIZE, help="Rows per keyset page and fetch")
+    return parser.parse_args(argv)
+
+def run_import(args):
+    conn = None
     try:
-        # Step 1: Connect to the Oracle database
         conn = get_db_connection()
+        import_locations(conn, args.csv_path, args.batch_size, args.reject_file, args.created_by)
+    except Exception as e:
+        print("Error:", e)
+    finally:
+        if conn:
+            conn.close()
+
+def run_sync(args):
+    store = None
+    try:
+        conn = get_db_connection() if args.store == 'oracle' else None
+        store = open_store(args.store, conn)
+        sync_locations(store, args.csv_path, args.batch_size, args.page_size, args.dry_run, args.reject_file,
+                       args.created_by)
+    except Exception as e:
+        print("Error:", e)
+    finally:
+        if store is not None:
+            store.close()
+
+def run_export(args):
+    # --- Streaming Export ---
+    # Keyset pages on LOCATION_ID, one fetch each, written as they arrive:
+    # memory stays at one page however large LOC is
+    store = output = None
+    exported = 0
+    try:
+        conn = get_db_connection() if args.store == 'oracle' else None
+        store = open_store(args.store, conn)
+        filters = {name: getattr(args, name) for name in LIST_FILTERS}
+        output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+
+        def counted(pages):
+            nonlocal exported
+            for page in pages:
+                exported += len(page)
+                yield page
+
+        for chunk in export_chunks(counted(location_pages(store, args.page_size, **filters)), args.format):
+            output.write(chunk)
+        print(f"Exported {exported} locations", file=sys.stderr)
+    except Exception as e:
+        print("Error:", e, file=sys.stderr)
+    finally:
+        if output is not None and output is not sys.stdout:
+            output.close()
+        if store is not None:
+            store.close()
+
+def main(store_spec='oracle'):
+    store = None
+    try:
+        # Step 1: Connect to the Oracle database (or open the offline store)
+        conn = get_db_connection() if store_spec == 'oracle' else None
+        store = open_store(store_spec, conn)
         # Step 2: Collect location data from user
         location = get_location_input()
         # Step 3: Validate mandatory fields
         if not validate_fields(location):
             return
         # Step 4: Check for duplicate LOCATION_ID
-        if check_duplicate(conn, location['LOCATION_ID']):
+        if check_duplicate(store, location['LOCATION_ID']):
             return
         # Step 5: Show test result and ask for user approval
         if not show_test_result(location):
             print("Location creation aborted by user")
             return
         # Step 6: Insert the new location into the LOC table
-        insert_location(conn, location)
+        insert_location(store, location)
         print("\nLocation successfully created.")
         # Step 7: Fetch and display the inserted record details
-        record = fetch_inserted_record(conn, location['LOCATION_ID'])
+        record = fetch_inserted_record(store, location['LOCATION_ID'])
         print("Inserted Record Details:")
         for k, v in record.items():
             print(f"{k}: {v}")
@@ -107,9 +404,21 @@ def main():
         print("Error:", e)
     finally:
         try:
-            conn.close()
+            store.close()
         except:
             pass
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    args = parse_args()
+    if args.sql_trace:
+        sql_trace.enable_tracing(args.sql_trace)
+    if args.command == 'import':
+        run_import(args)
+    elif args.command == 'sync':
+        run_sync(args)
+    elif args.command == 'export':
+        run_export(args)
+    else:
+        main(args.store)
+    if args.sql_trace:
+        print(sql_trace.trace_report()) 
\ No newline at end of file
@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+STATES = ['greeting', 'collecting_info', 'approval']
+GREETINGS = ['hi', 'hello there', 'what can you do?']
+CREATE_PROMPTS = ['create location', 'add new location', 'I need a new location']
+TYPES = ['warehouse', 'storage', 'shelf', 'rack', 'area', 'section', 'room', 'floor']
+
+def conversation(rng, session_number):
+    """Utterances for one simulated operator: greeting -> collecting_info -> approval"""
+    messages = []
+    if rng.random() < 0.2:
+        messages.append(rng.choice(GREETINGS))
+    messages.append(rng.choice(CREATE_PROMPTS))
+
+    # About 5% of operators pick an ID that another session already used
+    if session_number and rng.random() < 0.05:
+        location_id = 100000 + rng.randrange(session_number)
+    else:
+        location_id = 100000 + session_number
+    name = f"Pick Face {session_number}"
+    site = f"WH{rng.randint(1, 10)}"
+    location_type = rng.choice(TYPES)
+    if rng.random() < 0.3:
+        # Details spread over two messages
+        messages.append(f'location id {location_id}, name "{name}"')
+        messages.append(f'site code {site}, type {location_type}')
+    else:
+        messages.append(f'Create location ID {location_id}, name "{name}", site code {site}, type {location_type}')
+
+    if rng.random() < 0.1:
+        messages.append('maybe')
+    messages.append('yes' if rng.random() < 0.85 else 'no')
+    return messages
+
+def run_session(app, messages, timings):
+    """Play one conversation through /chat, recording latency by the state it was sent in"""
+    client = app.test_client()
+    state = 'greeting'
+    for message in messages:
+        start = time.perf_counter()
+        response = client.post('/chat', json={'message': message})
+        timings[state].append(time.perf_counter() - start)
+        state = response.get_json()['state']
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def run_load(app, sessions, workers, seed):
+    """Drive `sessions` conversations over `workers` threads; return timings per state and wall time"""
+    rng = random.Random(seed)
+    conversations = [conversation(rng, number) for number in range(sessions)]
+    per_worker = [{state: [] for state in STATES} for _ in range(workers)]
+
+    def worker(index):
+        for messages in conversations[index::workers]:
+            run_session(app, messages, per_worker[index])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(worker, range(workers)))
+    wall = time.perf_counter() - start
+
+    timings = {state: [] for state in STATES}
+    for worker_timings in per_worker:
+        for state in STATES:
+            timings[state].extend(worker_timings[state])
+    return timings, wall
+
+def measure_allocations(app, sessions, seed):
+    """Single-threaded pass with tracemalloc: peak bytes and net retained blocks per request"""
+    rng = random.Random(seed + 1)
+    stats = {state: {'requests': 0, 'peak_bytes': 0, 'net_blocks': 0} for state in STATES}
+    tracemalloc.start()
+    try:
+        for number in range(sessions):
+            client = app.test_client()
+            state = 'greeting'
+            for message in conversation(rng, 1000000 + number):
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+                blocks_before = sys.getallocatedblocks()
+                response = client.post('/chat', json={'message': message})
+                _, peak = tracemalloc.get_traced_memory()
+                stats[state]['requests'] += 1
+                stats[state]['peak_bytes'] += peak - before
+                stats[state]['net_blocks'] += sys.getallocatedblocks() - blocks_before
+                state = response.get_json()['state']
+    finally:
+        tracemalloc.stop()
+    return stats
+
+def summarise(timings, wall, allocations, args):
+    total_requests = sum(len(values) for values in timings.values())
+    results = {
+        'config': {'sessions': args.sessions, 'workers': args.workers, 'store': args.store, 'seed': args.seed},
+        'throughput': {
+            'requests_per_s': round(total_requests / wall, 1),
+            'sessions_per_s': round(args.sessions / wall, 1)
+        },
+        'states': {}
+    }
+    for state in STATES:
+        values = sorted(timings[state])
+        allocation = allocations.get(state, {})
+        requests = allocation.get('requests') or 1
+        results['states'][state] = {
+            'requests': len(values),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(values, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 3),
+            'alloc_peak_kib': round(allocation.get('peak_bytes', 0) / requests / 1024, 2),
+            'net_blocks': round(allocation.get('net_blocks', 0) / requests, 1)
+        }
+    return results
+
+def print_report(results):
+    throughput = results['throughput']
+    print(f"Throughput: {throughput['requests_per_s']:,} req/s, {throughput['sessions_per_s']:,} sessions/s")
+    print(f"{'state':<17}{'requests':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak KiB':>10}{'net blocks':>12}")
+    for state, figures in results['states'].items():
+        print(f"{state:<17}{figures['requests']:>10}{figures['p50_ms']:>10.3f}{figures['p95_ms']:>10.3f}"
+              f"{figures['p99_ms']:>10.3f}{figures['alloc_peak_kib']:>10.2f}{figures['net_blocks']:>12.1f}")
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Print regressions against a saved run; return True if any were found"""
+    regressions = []
+    old_rate = baseline['throughput']['requests_per_s']
+    new_rate = results['throughput']['requests_per_s']
+    if new_rate < old_rate / (1 + tolerance):
+        regressions.append(f"throughput {old_rate:,} -> {new_rate:,} req/s")
+    for state, figures in results['states'].items():
+        old = baseline['states'].get(state)
+        if not old:
+            continue
+        for metric in ('p95_ms', 'p99_ms', 'alloc_peak_kib'):
+            if old[metric] and figures[metric] > old[metric] * (1 + tolerance):
+                regressions.append(f"{state} {metric} {old[metric]} -> {figures[metric]}")
+    if regressions:
+        print("\n❌ Regressions against baseline:")
+        for regression in regressions:
+            print(f"   • {regression}")
+    else:
+        print("\n✅ No regressions against baseline")
+    return bool(regressions)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the web assistant's /chat flow")
+    parser.add_argument('--sessions', type=int, default=2000, help="Simulated operator conversations")
+    parser.add_argument('--workers', type=int, default=16, help="Concurrent client threads")
+    parser.add_argument('--store', default='memory', help="Local stand-in database: memory or sqlite:<path>")
+    parser.add_argument('--alloc-sessions', type=int, default=200, help="Conversations in the tracemalloc pass")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save', help="Write results as JSON (use as the next baseline)")
+    parser.add_argument('--baseline', help="Compare against a saved JSON run; exit 1 on regression")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # Never reach a real database: the app picks its store at import time
+    os.environ.pop('ORACLE_DSN', None)
+    os.environ['WAREHOUSE_STORE'] = args.store
+    from web_ai_assistant import app
+
+    timings, wall = run_load(app, args.sessions, args.workers, args.seed)
+    allocations = measure_allocations(app, args.alloc_sessions, args.seed) if args.alloc_sessions else {}
+    results = summarise(timings, wall, allocations, args)
+    print_report(results)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as result_file:
+            json.dump(results, result_file, indent=2)
+        print(f"\nResults saved to {args.save}")
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            if compare_with_baseline(results, json.load(baseline_file), args.tolerance):
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from location_store import LOC_COLUMNS
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson'
+}
+
+# Rows per keyset page: one fetch round trip each, and the most held in memory at once
+EXPORT_PAGE_SIZE = 2000
+MAX_PAGE_SIZE = 5000
+
+LIST_FILTERS = ('zone', 'aisle', 'site_code', 'location_type')
+
+def export_value(value):
+    """Dates as CSV_DATE_FORMAT text (what SQLite stores and the CSV import reads back)"""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ', timespec='seconds')
+    return value
+
+def location_pages(store, page_size=EXPORT_PAGE_SIZE, after=None, **filters):
+    """Yield LOC pages (lists of LOC_COLUMNS tuples) until the filtered table is exhausted"""
+    while True:
+        page = store.list_locations(after, page_size, **filters)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after = page[-1][0]
+
+def location_dicts(page):
+    return [dict(zip(LOC_COLUMNS, map(export_value, row))) for row in page]
+
+def csv_chunks(pages, header=True):
+    """One CSV text chunk per page, header first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(LOC_COLUMNS)
+    for page in pages:
+        writer.writerows([map(export_value, row) for row in page])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header of an empty export
+        yield buffer.getvalue()
+
+def ndjson_chunks(pages):
+    """One chunk of newline-delimited JSON objects per page"""
+    for page in pages:
+        yield ''.join(json.dumps(location) + '\n' for location in location_dicts(page))
+
+def export_chunks(pages, export_format):
+    """Pages from location_pages() as text chunks in `export_format`"""
+    if export_format == 'csv':
+        return csv_chunks(pages)
+    if export_format == 'ndjson':
+        return ndjson_chunks(pages)
+    raise ValueError(f"Unknown export format '{export_format}' (expected {' or '.join(EXPORT_FORMATS)})")
@@ -0,0 +1,108 @@
+import heapq
+import threading
+
+# Counter table holding the last sequence number handed out per zone/aisle.
+# Create it once per schema before enabling the allocator.
+COUNTER_DDL = """
+    CREATE TABLE LOC_ID_COUNTER (
+        ZONE        VARCHAR2(1) NOT NULL,
+        AISLE       VARCHAR2(2) NOT NULL,
+        LAST_NUMBER NUMBER      NOT NULL,
+        CONSTRAINT LOC_ID_COUNTER_PK PRIMARY KEY (ZONE, AISLE)
+    )
+"""
+
+# Reserve :block_size numbers in a single round trip. The first reservation for an
+# aisle seeds the counter from the highest existing LOC id; a concurrent seeder
+# losing the insert race falls back to the update. The block runs as an
+# autonomous transaction, so its COMMIT leaves the caller's transaction alone.
+RESERVE_BLOCK_PLSQL = """
+    DECLARE
+        PRAGMA AUTONOMOUS_TRANSACTION;
+        v_max NUMBER;
+    BEGIN
+        UPDATE LOC_ID_COUNTER
+           SET LAST_NUMBER = LAST_NUMBER + :block_size
+         WHERE ZONE = :zone AND AISLE = :aisle
+        RETURNING LAST_NUMBER INTO :last_number;
+
+        IF SQL%ROWCOUNT = 0 THEN
+            SELECT NVL(MAX(TO_NUMBER(SUBSTR(LOCATION_ID, LENGTH(:zone || :aisle) + 1))), 0)
+              INTO v_max
+              FROM LOC
+             WHERE REGEXP_LIKE(LOCATION_ID, '^' || :zone || :aisle || '[0-9]+$');
+            BEGIN
+                INSERT INTO LOC_ID_COUNTER (ZONE, AISLE, LAST_NUMBER)
+                VALUES (:zone, :aisle, v_max + :block_size);
+                :last_number := v_max + :block_size;
+            EXCEPTION
+                WHEN DUP_VAL_ON_INDEX THEN
+                    UPDATE LOC_ID_COUNTER
+                       SET LAST_NUMBER = LAST_NUMBER + :block_size
+                     WHERE ZONE = :zone AND AISLE = :aisle
+                    RETURNING LAST_NUMBER INTO :last_number;
+            END;
+        END IF;
+
+        COMMIT;
+    END;
+"""
+
+def format_location_id(zone, aisle, number):
+    """Format: ZONE + AISLE + 3-digit number (e.g., A01001)"""
+    return f"{zone}{aisle}{number:03d}"
+
+class LocationIdAllocator:
+    """Hand out LOCATION_IDs from the per-(zone, aisle) counter table
+
+    Each database call reserves a block of `block_size` numbers, so with a
+    block size above 1 most allocations are served from the in-process lease
+    without touching the database. IDs handed back with release() (never
+    inserted, e.g. a cancelled conversation) are allocated again first.
+    Numbers left in a lease when the process exits are never handed out (IDs
+    stay unique, but may have gaps).
+    """
+    def __init__(self, conn, block_size=1):
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1")
+        self.conn = conn
+        self.block_size = block_size
+        self.leases = {}
+        # (zone, aisle) -> heap of released numbers
+        self.released = {}
+        self.lock = threading.Lock()
+        self.round_trips = 0
+
+    def reserve_block(self, zone, aisle, count):
+        """Atomically reserve `count` numbers and return the first one"""
+        cursor = self.conn.cursor()
+        try:
+            last_number = cursor.var(int)
+            cursor.execute(RESERVE_BLOCK_PLSQL, zone=zone, aisle=aisle,
+                           block_size=count, last_number=last_number)
+            self.round_trips += 1
+            return int(last_number.getvalue()) - count + 1
+        finally:
+            cursor.close()
+
+    def allocate(self, zone, aisle):
+        """Return the next LOCATION_ID for the zone/aisle in O(1)"""
+        key = (zone, aisle)
+        with self.lock:
+            released = self.released.get(key)
+            if released:
+                return format_location_id(zone, aisle, heapq.heappop(released))
+            lease = self.leases.get(key)
+            if lease is None or lease[0] > lease[1]:
+                first = self.reserve_block(zone, aisle, self.block_size)
+                lease = [first, first + self.block_size - 1]
+                self.leases[key] = lease
+            number = lease[0]
+            lease[0] += 1
+        return format_location_id(zone, aisle, number)
+
+    def release(self, zone, aisle, location_id):
+        """Take back an allocated ID that was not inserted"""
+        number = int(location_id[len(zone) + len(aisle):])
+        with self.lock:
+            heapq.heappush(self.released.setdefault((zone, aisle), []), number)
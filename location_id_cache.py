@@ -0,0 +1,288 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime
+
+from loc_export import location_pages
+from location_store import LOC_COLUMNS, LocationStore
+
+CREATED_DATE_COLUMN = LOC_COLUMNS.index('CREATED_DATE')
+
+class BloomFilter:
+    """Bit-array membership filter: no false negatives, tunable false positives"""
+    def __init__(self, capacity, error_rate=0.01, max_bytes=None):
+        self.capacity = capacity
+        bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        # Over budget: keep the size and accept a higher false-positive rate
+        self.capped = max_bytes is not None and bits > max_bytes * 8
+        if self.capped:
+            bits = max_bytes * 8
+        self.size = max(bits, 8)
+        self.hash_count = max(1, round(self.size / max(capacity, 1) * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(key))
+
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+class LocationIdCache:
+    """Process-local filter over LOC.LOCATION_ID answering definite "not present"
+
+    Warm-loaded from the store page by page, so only the filter and one page
+    are ever held, then topped up by CREATED_DATE at most every
+    `refresh_interval` seconds so IDs inserted by other writers are picked up.
+    CREATED_DATE is not commit order: CSV imports and syncs keep the file's
+    dates and write-behind stamps the date before the commit, so such rows are
+    missed by the top-up. The filter is therefore rebuilt from scratch every
+    `rebuild_interval` seconds, which bounds how long a committed ID can be
+    reported as absent. Only "maybe present" answers need a database lookup.
+    """
+    def __init__(self, store, error_rate=0.01, max_bytes=8 * 1024 * 1024, refresh_interval=5.0,
+                 rebuild_interval=300.0):
+        self.store = store
+        self.error_rate = error_rate
+        self.max_bytes = max_bytes
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.lock = threading.Lock()
+        # One warm or top-up at a time
+        self.load_lock = threading.Lock()
+        self.filter = None
+        self.high_water = None
+        # IDs created exactly at high_water; the next ">=" refresh returns them again
+        self.at_high_water = set()
+        # IDs this process inserts while a warm is scanning, added to the new filter
+        self.added_while_warming = None
+        self.last_refresh = 0.0
+        self.last_rebuild = 0.0
+        self.definite_misses = 0
+        self.maybe_hits = 0
+        self.false_positives = 0
+        self.refreshes = 0
+        self.rebuilds = 0
+
+    def scan_ids(self, capacity):
+        """Stream every LOCATION_ID into a filter sized for `capacity`
+
+        Returns (filter, high_water, IDs created at high_water, ID count). The
+        filter is None if LOC held more than `capacity` IDs; the scan still
+        runs to the end so the count can size the next attempt.
+        """
+        bloom = BloomFilter(capacity, self.error_rate, self.max_bytes)
+        high_water, at_high_water, count = None, set(), 0
+        for page in location_pages(self.store):
+            for row in page:
+                location_id, created = row[0], row[CREATED_DATE_COLUMN]
+                count += 1
+                if bloom is not None:
+                    if count > capacity and not bloom.capped:
+                        bloom = None
+                    else:
+                        bloom.add(location_id)
+                if isinstance(created, str):
+                    # SQLite keeps dates as text
+                    created = datetime.fromisoformat(created)
+                if created is None:
+                    continue
+                if high_water is None or created > high_water:
+                    high_water, at_high_water = created, {location_id}
+                elif created == high_water:
+                    at_high_water.add(location_id)
+        return bloom, high_water, at_high_water, count
+
+    def warm(self, wait=True):
+        """(Re)build the filter from every LOCATION_ID in the store
+
+        With wait=False, a warm or top-up already running in another thread is
+        left to finish and the current filter stays in use.
+        """
+        rebuilds = self.rebuilds
+        if not self.load_lock.acquire(blocking=wait):
+            return
+        try:
+            if self.filter is not None and self.rebuilds != rebuilds:
+                # Rebuilt by another thread while this one waited
+                return
+            with self.lock:
+                previous = self.filter.count if self.filter is not None else 0
+                self.added_while_warming = []
+            started = time.monotonic()
+            # Leave headroom so inserts do not push the false-positive rate up straight away
+            bloom, high_water, at_high_water, count = self.scan_ids(max(2 * previous, 1024))
+            if bloom is None:
+                bloom, high_water, at_high_water, count = self.scan_ids(2 * count)
+            with self.lock:
+                for location_id in self.added_while_warming:
+                    bloom.add(location_id)
+                self.added_while_warming = None
+                self.filter = bloom
+                self.high_water = high_water
+                self.at_high_water = at_high_water
+                self.last_refresh = self.last_rebuild = started
+                self.rebuilds += 1
+        finally:
+            with self.lock:
+                self.added_while_warming = None
+            self.load_lock.release()
+
+    def refresh(self):
+        """Add IDs created since the last load; rebuild on schedule or once the filter outgrows its sizing"""
+        if (self.filter is None or self.high_water is None
+                or time.monotonic() - self.last_rebuild >= self.rebuild_interval):
+            self.warm(wait=self.filter is None)
+            return
+        if not self.load_lock.acquire(blocking=False):
+            return
+        try:
+            rows = self.store.location_ids_since(self.high_water)
+            with self.lock:
+                for location_id, created in rows:
+                    if not (created == self.high_water and location_id in self.at_high_water):
+                        self.filter.add(location_id)
+                newest = max((created for _, created in rows if created is not None), default=self.high_water)
+                if newest > self.high_water:
+                    self.high_water = newest
+                    self.at_high_water = set()
+                self.at_high_water.update(location_id for location_id, created in rows if created == newest)
+                self.last_refresh = time.monotonic()
+                self.refreshes += 1
+                oversized = self.filter.count > self.filter.capacity and not self.filter.capped
+        finally:
+            self.load_lock.release()
+        if oversized:
+            self.warm()
+
+    def invalidate(self):
+        """Drop the filter; the next lookup warm-loads it again"""
+        with self.lock:
+            self.filter = None
+            self.high_water = None
+            self.at_high_water = set()
+
+    def might_contain(self, location_id):
+        """False means the ID is definitely not in LOC"""
+        if self.filter is None or time.monotonic() - self.last_refresh >= self.refresh_interval:
+            self.refresh()
+        with self.lock:
+            present = location_id in self.filter
+            if present:
+                self.maybe_hits += 1
+            else:
+                self.definite_misses += 1
+            return present
+
+    def add(self, location_id):
+        """Record an ID this process has just inserted"""
+        with self.lock:
+            if self.filter is not None:
+                self.filter.add(location_id)
+            if self.added_while_warming is not None:
+                self.added_while_warming.append(location_id)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.definite_misses + self.maybe_hits
+            return {
+                'loaded': self.filter is not None,
+                'ids': self.filter.count if self.filter else 0,
+                'filter_bytes': self.filter.nbytes if self.filter else 0,
+                'max_bytes': self.max_bytes,
+                'hash_count': self.filter.hash_count if self.filter else 0,
+                'definite_misses': self.definite_misses,
+                'maybe_hits': self.maybe_hits,
+                'false_positives': self.false_positives,
+                'db_lookups_avoided': round(self.definite_misses / lookups, 3) if lookups else 0.0,
+                'refreshes': self.refreshes,
+                'rebuilds': self.rebuilds
+            }
+
+class CachedLocationStore(LocationStore):
+    """Wraps any LocationStore so check_duplicate() consults the ID cache first
+
+    A "not present" can be stale for at most the cache's rebuild interval
+    (rows committed by other writers with an older CREATED_DATE); the LOC
+    primary key still rejects such an insert.
+    """
+    def __init__(self, store, **cache_options):
+        self.store = store
+        self.id_cache = LocationIdCache(store, **cache_options)
+
+    @property
+    def round_trips(self):
+        return self.store.round_trips
+
+    def check_duplicate(self, location_id):
+        if not self.id_cache.might_contain(location_id):
+            return False
+        exists = self.store.check_duplicate(location_id)
+        if not exists:
+            with self.id_cache.lock:
+                self.id_cache.false_positives += 1
+        return exists
+
+    def insert_location(self, location):
+        self.store.insert_location(location)
+        self.id_cache.add(location['LOCATION_ID'])
+
+    def insert_locations(self, locations):
+        errors = self.store.insert_locations(locations)
+        rejected = {offset for offset, _ in errors}
+        for offset, location in enumerate(locations):
+            if offset not in rejected:
+                self.id_cache.add(location['LOCATION_ID'])
+        return errors
+
+    def update_locations(self, locations):
+        return self.store.update_locations(locations)
+
+    def get_next_location_id(self, zone, aisle):
+        return self.store.get_next_location_id(zone, aisle)
+
+    def check_duplicate_location_name(self, name, zone, aisle):
+        return self.store.check_duplicate_location_name(name, zone, aisle)
+
+    def fetch_inserted_record(self, location_id):
+        return self.store.fetch_inserted_record(location_id)
+
+    def location_ids_since(self, since=None):
+        return self.store.location_ids_since(since)
+
+    def location_names(self, zone, aisle):
+        return self.store.location_names(zone, aisle)
+
+    def list_locations(self, after=None, limit=500, zone=None, aisle=None, site_code=None, location_type=None):
+        return self.store.list_locations(after, limit, zone, aisle, site_code, location_type)
+
+    def find_location_by_name(self, name, zone, aisle):
+        return self.store.find_location_by_name(name, zone, aisle)
+
+    def create_location(self, location, zone, aisle):
+        row = self.store.create_location(location, zone, aisle)
+        self.id_cache.add(row['LOCATION_ID'])
+        return row
+
+    def create_locations(self, entries):
+        results = self.store.create_locations(entries)
+        for row, _ in results:
+            if row is not None:
+                self.id_cache.add(row['LOCATION_ID'])
+        return results
+
+    def close(self):
+        self.store.close()
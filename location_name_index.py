@@ -0,0 +1,278 @@
+import heapq
+import math
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import chain
+
+from loc_export import EXPORT_PAGE_SIZE, location_pages
+from location_store import location_name_key
+
+class LocationNameIndex:
+    """Per-(zone, aisle) hash index of normalized location names
+
+    Each aisle is loaded from the store the first time it is asked for and then
+    kept up to date through add(), so later duplicate-name checks are O(1)
+    lookups without a database round trip. The store's create_location() still
+    re-checks the name, so a name inserted by another writer is never missed.
+    """
+    def __init__(self, store):
+        self.store = store
+        self.aisles = {}
+        self.lock = threading.Lock()
+
+    def aisle(self, zone, aisle):
+        """Return the name keys for a zone/aisle, loading them on first use"""
+        key = (zone, aisle)
+        with self.lock:
+            names = self.aisles.get(key)
+            if names is None:
+                names = {location_name_key(name) for name in self.store.location_names(zone, aisle)}
+                self.aisles[key] = names
+            return names
+
+    def contains(self, name, zone, aisle):
+        """Check if an equivalent name already exists in the zone/aisle"""
+        return location_name_key(name) in self.aisle(zone, aisle)
+
+    def add(self, name, zone, aisle):
+        """Keep the index in sync after a location has been inserted"""
+        names = self.aisle(zone, aisle)
+        with self.lock:
+            names.add(location_name_key(name))
+
+    def invalidate(self):
+        """Drop every loaded aisle; they are reloaded on next use"""
+        with self.lock:
+            self.aisles.clear()
+
+# Replies list at most this many matches; near-duplicate warnings need a closer match
+FIND_LIMIT = 5
+FIND_SIMILARITY = 0.3
+NEAR_DUPLICATE_SIMILARITY = 0.5
+
+# A trigram in at least 1/DENSE_FRACTION of the names is kept as a bitset, no larger than its posting array
+DENSE_FRACTION = 32
+
+FIND_COMMAND = re.compile(r"^\s*find\s+(?:locations?\s+)?(?:named\s+|called\s+)?(.+?)\s*$", re.IGNORECASE)
+WORD = re.compile(r"[^\W_]+")
+NONZERO_BYTE = re.compile(rb"[^\x00]")
+
+def find_query(user_input):
+    """The name to look up in 'find [location] <name>', or None for any other utterance"""
+    match = FIND_COMMAND.match(user_input)
+    if match is None:
+        return None
+    return match.group(1).strip('"\'') or None
+
+def format_matches(matches):
+    """Reply lines for search() results"""
+    return [f"{location_id}: {name} ({similarity:.0%} similar)" for similarity, location_id, name in matches]
+
+def word_trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def name_trigrams(name):
+    """Distinct trigrams of a name, each word lower-cased and padded as '  word ' (as pg_trgm does)"""
+    trigrams = set()
+    for word in WORD.findall(name.lower()):
+        trigrams |= word_trigrams(word)
+    return trigrams
+
+def to_bitset(posting, count):
+    bits = bytearray((count + 7) // 8)
+    for number in posting:
+        bits[number >> 3] |= 1 << (number & 7)
+    return int.from_bytes(bits, 'little')
+
+def set_bits(bits):
+    """Positions of the set bits of a non-negative int, ascending"""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for match in NONZERO_BYTE.finditer(data):
+        byte, base = data[match.start()], match.start() * 8
+        for bit in range(8):
+            if byte >> bit & 1:
+                yield base + bit
+
+class TrigramNameIndex:
+    """In-memory trigram inverted index over every LOCATION_NAME for fuzzy lookup
+
+    Similarity is Jaccard over trigram sets, as in pg_trgm: a name with d
+    trigrams sharing s of the query's q scores s / (q + d - s). A trigram's
+    posting is an array of name numbers, or once it is in 1/DENSE_FRACTION
+    of the names, a bitset; names are also kept in one bitset per trigram
+    count. A search adds up the query's trigrams with a bit-sliced counter
+    (a few big-int operations per trigram however many names contain it; a
+    sparse posting is turned into a bitset first), then visits names by
+    shared count s, highest first, and within a count by size, smallest
+    first, stopping once nothing left can beat the best `limit` found. No
+    name is scanned.
+
+    LOC is read once, page by page, on first use; add() keeps the index
+    current for locations inserted through this process afterwards.
+    """
+    def __init__(self, store, page_size=EXPORT_PAGE_SIZE):
+        self.store = store
+        self.page_size = page_size
+        self.location_ids = []
+        self.names = []
+        self.sizes = array('H')
+        self.numbers = {}
+        self.sparse = {}
+        self.dense = {}
+        self.by_size = {}
+        self.loaded = False
+        self.lock = threading.RLock()
+
+    def load(self):
+        """Read every LOCATION_NAME from the store (once; caller holds the lock)"""
+        if self.loaded:
+            return
+        # Postings are built per distinct word, then per trigram from its words': a name has far fewer
+        # words than trigrams
+        word_trigram_sets = {}
+        word_numbers = {}
+        for page in location_pages(self.store, self.page_size):
+            for location_id, name, *_ in page:
+                words = set(WORD.findall(name.lower()))
+                if not words or location_id in self.numbers:
+                    continue
+                number = len(self.names)
+                self.numbers[location_id] = number
+                self.location_ids.append(location_id)
+                self.names.append(name)
+                trigram_sets = []
+                for word in words:
+                    known = word_trigram_sets.get(word)
+                    if known is None:
+                        known = word_trigram_sets[word] = word_trigrams(word)
+                        word_numbers[word] = array('I')
+                    trigram_sets.append(known)
+                    word_numbers[word].append(number)
+                self.sizes.append(min(len(set().union(*trigram_sets)), 0xFFFF))
+        trigram_words = {}
+        for word, trigrams in word_trigram_sets.items():
+            for trigram in trigrams:
+                trigram_words.setdefault(trigram, []).append(word_numbers[word])
+        count = len(self.names)
+        for trigram, postings in trigram_words.items():
+            posting = array('I', chain.from_iterable(postings)) if len(postings) > 1 else postings[0]
+            if len(posting) * DENSE_FRACTION >= count:
+                self.dense[trigram] = to_bitset(posting, count)
+            else:
+                self.sparse[trigram] = posting
+        by_size = {}
+        for number, size in enumerate(self.sizes):
+            by_size.setdefault(size, []).append(number)
+        self.by_size = {size: to_bitset(numbers, count) for size, numbers in by_size.items()}
+        self.loaded = True
+
+    def index(self, location_id, name, trigrams):
+        if location_id in self.numbers or not trigrams:
+            return
+        number = len(self.names)
+        size = min(len(trigrams), 0xFFFF)
+        self.numbers[location_id] = number
+        self.location_ids.append(location_id)
+        self.names.append(name)
+        self.sizes.append(size)
+        self.by_size[size] = self.by_size.get(size, 0) | 1 << number
+        sparse, dense = self.sparse, self.dense
+        for trigram in trigrams:
+            if trigram in dense:
+                dense[trigram] |= 1 << number
+                continue
+            posting = sparse.get(trigram)
+            if posting is None:
+                posting = sparse[trigram] = array('I')
+            posting.append(number)
+            if len(posting) * DENSE_FRACTION >= number + 1 and number >= DENSE_FRACTION:
+                dense[trigram] = to_bitset(posting, number + 1)
+                del sparse[trigram]
+
+    def add(self, location_id, name):
+        """Keep the index in sync after a location has been inserted or queued"""
+        with self.lock:
+            self.load()
+            self.index(location_id, name, name_trigrams(name))
+
+    def search(self, text, limit=FIND_LIMIT, threshold=FIND_SIMILARITY, prefix=None):
+        """[(similarity, LOCATION_ID, LOCATION_NAME)] best first; `prefix` keeps LOCATION_IDs starting with it"""
+        query = name_trigrams(text)
+        if not query:
+            return []
+        with self.lock:
+            self.load()
+            size = len(query)
+            count = len(self.names)
+            # Bit n of slices[i] is bit i of the number of query trigrams name n shares
+            slices = []
+            for trigram in query:
+                carry = self.dense.get(trigram)
+                if carry is None:
+                    posting = self.sparse.get(trigram)
+                    if posting is None:
+                        continue
+                    carry = to_bitset(posting, count)
+                for i, bits in enumerate(slices):
+                    slices[i], carry = bits ^ carry, bits & carry
+                    if not carry:
+                        break
+                if carry:
+                    slices.append(carry)
+
+            sizes = sorted(self.by_size)
+            location_ids, names = self.location_ids, self.names
+            best = []
+
+            def consider(similarity, number):
+                if prefix is None or location_ids[number].startswith(prefix):
+                    entry = (similarity, -number)
+                    if len(best) < limit:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+
+            top = min(size, (1 << len(slices)) - 1)
+            for shared in range(top, max(math.ceil(threshold * size), 1) - 1, -1):
+                # Nothing at this count or below can beat a full list scoring above shared / size
+                if len(best) >= limit and best[0][0] > shared / size:
+                    break
+                equal = -1
+                for i, bits in enumerate(slices):
+                    equal &= bits if shared >> i & 1 else ~bits
+                if equal <= 0:
+                    continue
+                # Smallest names score best
+                for name_size in sizes[bisect_left(sizes, shared):]:
+                    similarity = shared / (size + name_size - shared)
+                    if similarity < threshold or (len(best) >= limit and similarity <= best[0][0]):
+                        break
+                    for number in set_bits(equal & self.by_size[name_size]):
+                        consider(similarity, number)
+            return [(round(similarity, 3), location_ids[-number], names[-number])
+                    for similarity, number in sorted(best, reverse=True)]
+
+    def near_duplicates(self, name, prefix=None, threshold=NEAR_DUPLICATE_SIMILARITY, limit=3):
+        """Similar existing names, leaving out exact (normalized) duplicates, which are checked separately"""
+        key = location_name_key(name)
+        return [match for match in self.search(name, limit + 1, threshold, prefix)
+                if location_name_key(match[2]) != key][:limit]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'loaded': self.loaded,
+                'names': len(self.names),
+                'trigrams': len(self.sparse) + len(self.dense),
+                'dense_trigrams': len(self.dense),
+                'index_bytes': (sum(len(posting) * posting.itemsize for posting in self.sparse.values()) +
+                                sum((bits.bit_length() + 7) // 8 for bits in (*self.dense.values(), *self.by_size.values())))
+            }
+
+    def invalidate(self):
+        """Drop the index; it is rebuilt from the store on next use"""
+        with self.lock:
+            self.__init__(self.store, self.page_size)
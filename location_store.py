@@ -0,0 +1,764 @@
+import sqlite3
+import threading
+from bisect import bisect_right
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from metrics import METRICS, timed
+from sql_trace import trace_connection
+from statement_cache import LATEST_ROW, POINT_LOOKUP, StatementCache, configure_cursor, scan
+
+LOC_COLUMNS = ['LOCATION_ID', 'LOCATION_NAME', 'SITE_CODE', 'LOCATION_TYPE', 'CREATED_BY', 'CREATED_DATE']
+
+INSERT_SQL = """
+    INSERT INTO LOC (LOCATION_ID, LOCATION_NAME, SITE_CODE, LOCATION_TYPE, CREATED_BY, CREATED_DATE)
+    VALUES (:LOCATION_ID, :LOCATION_NAME, :SITE_CODE, :LOCATION_TYPE, :CREATED_BY, :CREATED_DATE)
+"""
+
+# Fixed bind types for INSERT_SQL, so a NULL CREATED_BY/CREATED_DATE in the
+# first row or a longer name later never forces a re-bind or a new child cursor
+INSERT_INPUT_SIZES = {
+    'LOCATION_ID': 128,
+    'LOCATION_NAME': 2000,
+    'SITE_CODE': 128,
+    'LOCATION_TYPE': 128,
+    'CREATED_BY': 128,
+    'CREATED_DATE': datetime
+}
+
+# Columns a CSV sync may change; CREATED_BY/CREATED_DATE record the original insert
+SYNC_COLUMNS = ['LOCATION_NAME', 'SITE_CODE', 'LOCATION_TYPE']
+
+UPDATE_SQL = """
+    UPDATE LOC
+    SET LOCATION_NAME = :LOCATION_NAME, SITE_CODE = :SITE_CODE, LOCATION_TYPE = :LOCATION_TYPE
+    WHERE LOCATION_ID = :LOCATION_ID
+"""
+
+UPDATE_INPUT_SIZES = {column: INSERT_INPUT_SIZES[column] for column in ['LOCATION_ID'] + SYNC_COLUMNS}
+
+CHECK_DUPLICATE_SQL = "SELECT 1 FROM LOC WHERE LOCATION_ID = :id"
+FETCH_RECORD_SQL = "SELECT * FROM LOC WHERE LOCATION_ID = :id"
+LOCATION_NAMES_SQL = "SELECT LOCATION_NAME FROM LOC WHERE LOCATION_ID LIKE :pattern"
+NEXT_LOCATION_ID_SQL = """
+    SELECT LOCATION_ID
+    FROM LOC
+    WHERE LOCATION_ID LIKE :pattern
+    ORDER BY LENGTH(LOCATION_ID) DESC, LOCATION_ID DESC
+"""
+
+SQLITE_DDL = """
+    CREATE TABLE IF NOT EXISTS LOC (
+        LOCATION_ID   TEXT PRIMARY KEY,
+        LOCATION_NAME TEXT NOT NULL,
+        SITE_CODE     TEXT NOT NULL,
+        LOCATION_TYPE TEXT NOT NULL,
+        CREATED_BY    TEXT,
+        CREATED_DATE  TEXT
+    )
+"""
+
+# NAME_KEY is location_name_key() registered on each connection
+SQLITE_NAME_KEY_INDEX_DDL = """
+    CREATE INDEX IF NOT EXISTS LOC_AISLE_NAME_IX ON LOC (substr(LOCATION_ID, 1, 3), NAME_KEY(LOCATION_NAME))
+"""
+
+def loc_binds(location):
+    """Only the LOC columns, so extra conversation fields (ZONE, AISLE) are never bound"""
+    return {column: location.get(column) for column in LOC_COLUMNS}
+
+def update_binds(location):
+    return {column: location.get(column) for column in UPDATE_INPUT_SIZES}
+
+def next_sequence_id(zone, aisle, last_id):
+    """Format: ZONE + AISLE + 3-digit number, one past last_id (or 001)"""
+    next_number = int(last_id[len(zone) + len(aisle):]) + 1 if last_id else 1
+    return f"{zone}{aisle}{next_number:03d}"
+
+# Names are unique per zone/aisle ignoring case and runs of whitespace, the same
+# names .title() maps together. The prefix is ZONE (1 letter) + AISLE (2 digits).
+AISLE_PREFIX_SQL = "SUBSTR(LOCATION_ID, 1, 3)"
+NAME_KEY_SQL = "UPPER(TRIM(REGEXP_REPLACE(LOCATION_NAME, '[[:space:]]+', ' ')))"
+
+# Function-based index so the duplicate-name check is an index-only probe. It is
+# not UNIQUE because the basic assistants accept free-form LOCATION_IDs; make it
+# UNIQUE on schemas where every ID follows the ZONE + AISLE + number format.
+NAME_KEY_INDEX_DDL = f"CREATE INDEX LOC_AISLE_NAME_IX ON LOC ({AISLE_PREFIX_SQL}, {NAME_KEY_SQL})"
+
+LOCATION_NAME_EXISTS_SQL = f"""
+    SELECT 1
+    FROM LOC
+    WHERE {AISLE_PREFIX_SQL} = :prefix
+    AND {NAME_KEY_SQL} = :name_key
+    AND ROWNUM = 1
+"""
+
+FIND_LOCATION_BY_NAME_SQL = f"""
+    SELECT LOCATION_ID
+    FROM LOC
+    WHERE {AISLE_PREFIX_SQL} = :prefix
+    AND {NAME_KEY_SQL} = :name_key
+    AND ROWNUM = 1
+"""
+
+def location_name_key(name):
+    """Normalized name used for uniqueness: whitespace collapsed, case folded"""
+    return ' '.join(name.split()).upper()
+
+def like_prefix(prefix):
+    """LIKE pattern matching values that start with `prefix` literally"""
+    return prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def location_page_query(after, limit, zone=None, aisle=None, site_code=None, location_type=None,
+                        limit_clause="FETCH FIRST :limit ROWS ONLY"):
+    """(sql, binds) for one keyset page of LOC in LOCATION_ID order
+
+    The page starts after the last LOCATION_ID of the previous one, so each
+    page is an index range scan on the primary key instead of an OFFSET that
+    re-reads every earlier row. Zone and aisle are the LOCATION_ID prefix.
+    """
+    conditions = []
+    binds = {'limit': limit}
+    if after is not None:
+        conditions.append("LOCATION_ID > :after")
+        binds['after'] = after
+    if zone:
+        conditions.append("LOCATION_ID LIKE :prefix ESCAPE '\\'")
+        binds['prefix'] = like_prefix(f"{zone.upper()}{aisle or ''}")
+    elif aisle:
+        conditions.append("SUBSTR(LOCATION_ID, 2, 2) = :aisle")
+        binds['aisle'] = aisle
+    if site_code:
+        conditions.append("SITE_CODE = :site_code")
+        binds['site_code'] = site_code
+    if location_type:
+        conditions.append("LOCATION_TYPE = :location_type")
+        binds['location_type'] = location_type
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ''
+    return f"SELECT {', '.join(LOC_COLUMNS)} FROM LOC {where}ORDER BY LOCATION_ID {limit_clause}", binds
+
+def location_matches(row, zone=None, aisle=None, site_code=None, location_type=None):
+    """The location_page_query filters for a LOC row held as a dict"""
+    location_id = row['LOCATION_ID']
+    if zone and not location_id.startswith(f"{zone.upper()}{aisle or ''}"):
+        return False
+    if aisle and not zone and location_id[1:3] != aisle:
+        return False
+    return ((not site_code or row['SITE_CODE'] == site_code) and
+            (not location_type or row['LOCATION_TYPE'] == location_type))
+
+# Validate name uniqueness, insert (moving to the next free number if the
+# proposed ID was taken meanwhile), commit and return the row: one round trip.
+# LOC_AISLE_NAME_IX is not UNIQUE, so the check and insert hold an exclusive
+# per-aisle lock (DBMS_LOCK, released by the COMMIT) to keep two sessions from
+# both passing the check; the schema owner needs EXECUTE on DBMS_LOCK.
+CREATE_LOCATION_DECLARE = """
+    DECLARE
+        v_count       NUMBER;
+        v_lock        NUMBER;
+        v_next        VARCHAR2(40);
+        v_location_id LOC.LOCATION_ID%TYPE := :location_id;
+"""
+
+def create_location_body(on_duplicate_name):
+    """Lock the aisle, check the name (running `on_duplicate_name` if taken) and insert"""
+    return f"""
+        -- Aisles whose hashes collide only share the lock, which is harmless
+        v_lock := DBMS_LOCK.REQUEST(ORA_HASH('LOC_AISLE:' || :prefix, 1073741823), DBMS_LOCK.X_MODE,
+                                    timeout => 10, release_on_commit => TRUE);
+        IF v_lock NOT IN (0, 4) THEN
+            RAISE_APPLICATION_ERROR(-20002, 'Could not lock zone/aisle ' || :prefix || ' (DBMS_LOCK status ' || v_lock || ')');
+        END IF;
+
+        SELECT COUNT(*) INTO v_count
+          FROM LOC
+         WHERE {AISLE_PREFIX_SQL} = :prefix
+           AND {NAME_KEY_SQL} = :name_key
+           AND ROWNUM = 1;
+        IF v_count > 0 THEN
+            {on_duplicate_name}
+        END IF;
+
+        BEGIN
+            INSERT INTO LOC (LOCATION_ID, LOCATION_NAME, SITE_CODE, LOCATION_TYPE, CREATED_BY, CREATED_DATE)
+            VALUES (v_location_id, :location_name, :site_code, :location_type, :created_by, :created_date)
+            RETURNING LOCATION_ID, CREATED_DATE INTO :out_location_id, :out_created_date;
+        EXCEPTION
+            WHEN DUP_VAL_ON_INDEX THEN
+                SELECT TO_CHAR(NVL(MAX(TO_NUMBER(SUBSTR(LOCATION_ID, LENGTH(:prefix) + 1))), 0) + 1)
+                  INTO v_next
+                  FROM LOC
+                 WHERE REGEXP_LIKE(LOCATION_ID, '^' || :prefix || '[0-9]+$');
+                -- At least 3 digits, as next_sequence_id: 999 is followed by 1000
+                v_location_id := :prefix || LPAD(v_next, GREATEST(3, LENGTH(v_next)), '0');
+                INSERT INTO LOC (LOCATION_ID, LOCATION_NAME, SITE_CODE, LOCATION_TYPE, CREATED_BY, CREATED_DATE)
+                VALUES (v_location_id, :location_name, :site_code, :location_type, :created_by, :created_date)
+                RETURNING LOCATION_ID, CREATED_DATE INTO :out_location_id, :out_created_date;
+        END;
+"""
+
+CREATE_LOCATION_PLSQL = f"""{CREATE_LOCATION_DECLARE}
+    BEGIN{create_location_body("RAISE_APPLICATION_ERROR(-20001, 'Location name already exists in this zone/aisle');")}
+        COMMIT;
+    EXCEPTION
+        WHEN OTHERS THEN
+            v_lock := DBMS_LOCK.RELEASE(ORA_HASH('LOC_AISLE:' || :prefix, 1073741823));
+            RAISE;
+    END;
+"""
+
+# The same per row for create_locations(), run with executemany and committed
+# once by the caller: a taken name leaves :out_location_id NULL instead of
+# raising, and the aisle locks are held until that commit.
+CREATE_LOCATIONS_PLSQL = f"""{CREATE_LOCATION_DECLARE}
+    BEGIN
+        :out_location_id := NULL;{create_location_body("RETURN;")}
+    END;
+"""
+
+class DuplicateLocationError(Exception):
+    """Raised when inserting a LOCATION_ID that already exists"""
+
+class DuplicateLocationNameError(Exception):
+    """Raised when the location name already exists in the zone/aisle"""
+
+class LocationStore:
+    """Storage interface for the LOC table shared by all assistants
+
+    `round_trips` counts database calls made through the store.
+    """
+    round_trips = 0
+
+    def check_duplicate(self, location_id):
+        """Check if LOCATION_ID already exists"""
+        raise NotImplementedError
+
+    def insert_location(self, location):
+        """Insert and commit one location"""
+        raise NotImplementedError
+
+    def insert_locations(self, locations):
+        """Insert many locations with one commit; returns [(offset, message)] for rejected rows"""
+        raise NotImplementedError
+
+    def update_locations(self, locations):
+        """Set the SYNC_COLUMNS of many locations with one commit; returns [(offset, message)] for rows not updated"""
+        raise NotImplementedError
+
+    def get_next_location_id(self, zone, aisle):
+        """Next location ID after the highest existing one in the zone/aisle"""
+        raise NotImplementedError
+
+    def check_duplicate_location_name(self, name, zone, aisle):
+        """Check if the location name already exists in the zone/aisle"""
+        raise NotImplementedError
+
+    def fetch_inserted_record(self, location_id):
+        """Return the LOC row as a dict, or None"""
+        raise NotImplementedError
+
+    def location_ids_since(self, since=None):
+        """(LOCATION_ID, CREATED_DATE) pairs created at or after `since` (all rows if None)"""
+        raise NotImplementedError
+
+    def location_names(self, zone, aisle):
+        """LOCATION_NAME of every location in the zone/aisle"""
+        raise NotImplementedError
+
+    def list_locations(self, after=None, limit=500, zone=None, aisle=None, site_code=None, location_type=None):
+        """Up to `limit` LOC rows as LOC_COLUMNS tuples, in LOCATION_ID order, after LOCATION_ID `after`"""
+        raise NotImplementedError
+
+    def find_location_by_name(self, name, zone, aisle):
+        """LOCATION_ID of the location with this name in the zone/aisle, or None"""
+        raise NotImplementedError
+
+    def create_location(self, location, zone, aisle):
+        """Validate the name, insert and return the created row as one operation
+
+        If the proposed LOCATION_ID was taken in the meantime, the next free
+        number in the zone/aisle is used instead. Backends override this with
+        a single atomic call; this default composes the primitives.
+        """
+        if self.check_duplicate_location_name(location['LOCATION_NAME'], zone, aisle):
+            raise DuplicateLocationNameError(f"Location name '{location['LOCATION_NAME']}' already exists "
+                                             f"in Zone {zone}, Aisle {aisle}")
+        row = loc_binds(location)
+        if self.check_duplicate(row['LOCATION_ID']):
+            row['LOCATION_ID'] = self.get_next_location_id(zone, aisle)
+        self.insert_location(row)
+        return row
+
+    def create_locations(self, entries):
+        """create_location() for many (location, zone, aisle) entries
+
+        Returns (row, error) per entry: the created row, or None and the
+        message of a name already taken. Backends override this to commit
+        the whole batch once; this default commits per row.
+        """
+        results = []
+        for location, zone, aisle in entries:
+            try:
+                results.append((self.create_location(location, zone, aisle), None))
+            except DuplicateLocationNameError as e:
+                results.append((None, str(e)))
+        return results
+
+    def close(self):
+        pass
+
+class OracleLocationStore(LocationStore):
+    """LOC on Oracle through cx_Oracle
+
+    Pass either a single connection or `connect`, a zero-argument callable
+    returning a context manager that yields a connection (e.g., a pool borrow).
+    A single connection keeps one open cursor per statement (StatementCache);
+    a pool relies on its sessions' statement cache instead.
+    """
+    def __init__(self, conn=None, connect=None, cache_statements=True):
+        self.conn = conn
+        self.connect = connect or (lambda: nullcontext(self.conn))
+        self.statements = StatementCache(conn) if conn is not None and connect is None and cache_statements else None
+
+    @contextmanager
+    def statement(self, sql, **shape):
+        """Yield (connection, cursor) for `sql`, sized for its query shape"""
+        with self.connect() as conn:
+            if self.statements is not None:
+                yield conn, self.statements.cursor(sql, **shape)
+                return
+            cursor = configure_cursor(conn.cursor(), **shape)
+            try:
+                yield conn, cursor
+            finally:
+                cursor.close()
+
+    @timed('sql.check_duplicate')
+    def check_duplicate(self, location_id):
+        with self.statement(CHECK_DUPLICATE_SQL, **POINT_LOOKUP) as (conn, cursor):
+            cursor.execute(CHECK_DUPLICATE_SQL, id=location_id)
+            exists = cursor.fetchone() is not None
+            self.round_trips += 1
+            return exists
+
+    @timed('sql.insert_location')
+    def insert_location(self, location):
+        with self.statement(INSERT_SQL, inputsizes=INSERT_INPUT_SIZES) as (conn, cursor):
+            cursor.execute(INSERT_SQL, loc_binds(location))
+            with METRICS.timer('sql.commit'):
+                conn.commit()
+            self.round_trips += 2
+
+    @timed('sql.insert_locations')
+    def insert_locations(self, locations):
+        with self.statement(INSERT_SQL, inputsizes=INSERT_INPUT_SIZES) as (conn, cursor):
+            cursor.executemany(INSERT_SQL, [loc_binds(location) for location in locations], batcherrors=True)
+            errors = [(error.offset, error.message) for error in cursor.getbatcherrors()]
+            with METRICS.timer('sql.commit'):
+                conn.commit()
+            self.round_trips += 2
+            return errors
+
+    @timed('sql.update_locations')
+    def update_locations(self, locations):
+        with self.statement(UPDATE_SQL, inputsizes=UPDATE_INPUT_SIZES) as (conn, cursor):
+            cursor.executemany(UPDATE_SQL, [update_binds(location) for location in locations],
+                               batcherrors=True, arraydmlrowcounts=True)
+            errors = [(error.offset, error.message) for error in cursor.getbatcherrors()]
+            failed = {offset for offset, _ in errors}
+            errors.extend((offset, f"LOCATION_ID {locations[offset]['LOCATION_ID']} not found")
+                          for offset, count in enumerate(cursor.getarraydmlrowcounts())
+                          if count == 0 and offset not in failed)
+            with METRICS.timer('sql.commit'):
+                conn.commit()
+            self.round_trips += 2
+            return sorted(errors)
+
+    @timed('sql.get_next_location_id')
+    def get_next_location_id(self, zone, aisle):
+        with self.statement(NEXT_LOCATION_ID_SQL, **LATEST_ROW) as (conn, cursor):
+            cursor.execute(NEXT_LOCATION_ID_SQL, pattern=f"{zone}{aisle}%")
+            last = cursor.fetchone()
+            self.round_trips += 1
+            return next_sequence_id(zone, aisle, last[0] if last else None)
+
+    @timed('sql.check_duplicate_location_name')
+    def check_duplicate_location_name(self, name, zone, aisle):
+        with self.statement(LOCATION_NAME_EXISTS_SQL, **POINT_LOOKUP) as (conn, cursor):
+            cursor.execute(LOCATION_NAME_EXISTS_SQL,
+                           {'prefix': f"{zone}{aisle}", 'name_key': location_name_key(name)})
+            existing = cursor.fetchone()
+            self.round_trips += 1
+            return existing is not None
+
+    @timed('sql.find_location_by_name')
+    def find_location_by_name(self, name, zone, aisle):
+        with self.statement(FIND_LOCATION_BY_NAME_SQL, **POINT_LOOKUP) as (conn, cursor):
+            cursor.execute(FIND_LOCATION_BY_NAME_SQL,
+                           {'prefix': f"{zone}{aisle}", 'name_key': location_name_key(name)})
+            existing = cursor.fetchone()
+            self.round_trips += 1
+            return existing[0] if existing else None
+
+    @timed('sql.fetch_inserted_record')
+    def fetch_inserted_record(self, location_id):
+        with self.statement(FETCH_RECORD_SQL, **POINT_LOOKUP) as (conn, cursor):
+            cursor.execute(FETCH_RECORD_SQL, id=location_id)
+            row = cursor.fetchone()
+            columns = [col[0] for col in cursor.description]
+            self.round_trips += 1
+            return dict(zip(columns, row)) if row else None
+
+    @timed('sql.location_ids_since')
+    def location_ids_since(self, since=None):
+        if since is None:
+            sql, binds = "SELECT LOCATION_ID, CREATED_DATE FROM LOC", {}
+        else:
+            sql, binds = "SELECT LOCATION_ID, CREATED_DATE FROM LOC WHERE CREATED_DATE >= :since", {'since': since}
+        with self.statement(sql, **scan(5000)) as (conn, cursor):
+            cursor.execute(sql, binds)
+            rows = cursor.fetchall()
+            self.round_trips += 1
+            return rows
+
+    @timed('sql.location_names')
+    def location_names(self, zone, aisle):
+        with self.statement(LOCATION_NAMES_SQL, **scan(1000)) as (conn, cursor):
+            cursor.execute(LOCATION_NAMES_SQL, pattern=f"{zone}{aisle}%")
+            names = [name for (name,) in cursor]
+            self.round_trips += 1
+            return names
+
+    @timed('sql.list_locations')
+    def list_locations(self, after=None, limit=500, zone=None, aisle=None, site_code=None, location_type=None):
+        sql, binds = location_page_query(after, limit, zone, aisle, site_code, location_type)
+        # The whole page arrives in one fetch
+        with self.statement(sql, **scan(limit)) as (conn, cursor):
+            cursor.execute(sql, binds)
+            rows = cursor.fetchall()
+            self.round_trips += 1
+            return rows
+
+    @timed('sql.create_location')
+    def create_location(self, location, zone, aisle):
+        row = loc_binds(location)
+        with self.statement(CREATE_LOCATION_PLSQL) as (conn, cursor):
+            try:
+                out_location_id = cursor.var(str)
+                out_created_date = cursor.var(datetime)
+                cursor.execute(CREATE_LOCATION_PLSQL,
+                               location_id=row['LOCATION_ID'], location_name=row['LOCATION_NAME'],
+                               site_code=row['SITE_CODE'], location_type=row['LOCATION_TYPE'],
+                               created_by=row['CREATED_BY'], created_date=row['CREATED_DATE'],
+                               prefix=f"{zone}{aisle}", name_key=location_name_key(row['LOCATION_NAME']),
+                               out_location_id=out_location_id,
+                               out_created_date=out_created_date)
+            except Exception as e:
+                if 'ORA-20001' in str(e):
+                    raise DuplicateLocationNameError(f"Location name '{row['LOCATION_NAME']}' already exists "
+                                                     f"in Zone {zone}, Aisle {aisle}")
+                raise
+            finally:
+                self.round_trips += 1
+        row['LOCATION_ID'] = out_location_id.getvalue()
+        row['CREATED_DATE'] = out_created_date.getvalue()
+        return row
+
+    @timed('sql.create_locations')
+    def create_locations(self, entries):
+        """One executemany of the per-row PL/SQL and one commit for the whole batch"""
+        rows = [loc_binds(location) for location, _, _ in entries]
+        # Aisle locks are held until the commit; taking them in prefix order keeps
+        # two writers from deadlocking on each other's aisles
+        order = sorted(range(len(entries)), key=lambda offset: f"{entries[offset][1]}{entries[offset][2]}")
+        with self.statement(CREATE_LOCATIONS_PLSQL) as (conn, cursor):
+            out_location_id = cursor.var(str, arraysize=len(entries))
+            out_created_date = cursor.var(datetime, arraysize=len(entries))
+            cursor.setinputsizes(out_location_id=out_location_id, out_created_date=out_created_date)
+            binds = []
+            for offset in order:
+                row, (_, zone, aisle) = rows[offset], entries[offset]
+                binds.append({'location_id': row['LOCATION_ID'], 'location_name': row['LOCATION_NAME'],
+                              'site_code': row['SITE_CODE'], 'location_type': row['LOCATION_TYPE'],
+                              'created_by': row['CREATED_BY'], 'created_date': row['CREATED_DATE'],
+                              'prefix': f"{zone}{aisle}", 'name_key': location_name_key(row['LOCATION_NAME'])})
+            try:
+                cursor.executemany(CREATE_LOCATIONS_PLSQL, binds)
+                with METRICS.timer('sql.commit'):
+                    conn.commit()
+            except Exception:
+                # Release the aisle locks and the rows already inserted
+                conn.rollback()
+                raise
+            finally:
+                self.round_trips += 2
+        results = [None] * len(entries)
+        for position, offset in enumerate(order):
+            row, (_, zone, aisle) = rows[offset], entries[offset]
+            location_id = out_location_id.getvalue(position)
+            if location_id is None:
+                results[offset] = (None, f"Location name '{row['LOCATION_NAME']}' already exists "
+                                         f"in Zone {zone}, Aisle {aisle}")
+            else:
+                row['LOCATION_ID'] = location_id
+                row['CREATED_DATE'] = out_created_date.getvalue(position)
+                results[offset] = (row, None)
+        return results
+
+    def close(self):
+        if self.statements is not None:
+            self.statements.close()
+        if self.conn:
+            self.conn.close()
+
+class MemoryLocationStore(LocationStore):
+    """In-process LOC stand-in with no database round trips (for benchmarks and tests)"""
+    def __init__(self):
+        self.rows = {}
+        self.names = set()
+        self.last_numbers = {}
+        # LOCATION_IDs in order for list_locations, rebuilt after inserts
+        self.sorted_ids = None
+        self.lock = threading.RLock()
+
+    def check_duplicate(self, location_id):
+        return location_id in self.rows
+
+    def insert_location(self, location):
+        row = loc_binds(location)
+        location_id = row['LOCATION_ID']
+        with self.lock:
+            if location_id in self.rows:
+                raise DuplicateLocationError(f"LOCATION_ID {location_id} already exists")
+            self.rows[location_id] = row
+            self.sorted_ids = None
+            prefix, suffix = location_id[:3], location_id[3:]
+            self.names.add((prefix, location_name_key(row['LOCATION_NAME'])))
+            if suffix.isdigit():
+                self.last_numbers[prefix] = max(self.last_numbers.get(prefix, 0), int(suffix))
+
+    def insert_locations(self, locations):
+        errors = []
+        for offset, location in enumerate(locations):
+            try:
+                self.insert_location(location)
+            except DuplicateLocationError as e:
+                errors.append((offset, str(e)))
+        return errors
+
+    def update_locations(self, locations):
+        errors = []
+        with self.lock:
+            for offset, location in enumerate(locations):
+                row = self.rows.get(location['LOCATION_ID'])
+                if row is None:
+                    errors.append((offset, f"LOCATION_ID {location['LOCATION_ID']} not found"))
+                    continue
+                prefix = row['LOCATION_ID'][:3]
+                self.names.discard((prefix, location_name_key(row['LOCATION_NAME'])))
+                row.update((column, location.get(column)) for column in SYNC_COLUMNS)
+                self.names.add((prefix, location_name_key(row['LOCATION_NAME'])))
+        return errors
+
+    def get_next_location_id(self, zone, aisle):
+        last_number = self.last_numbers.get(f"{zone}{aisle}", 0)
+        return f"{zone}{aisle}{last_number + 1:03d}"
+
+    def check_duplicate_location_name(self, name, zone, aisle):
+        return (f"{zone}{aisle}", location_name_key(name)) in self.names
+
+    def find_location_by_name(self, name, zone, aisle):
+        prefix, name_key = f"{zone}{aisle}", location_name_key(name)
+        with self.lock:
+            if (prefix, name_key) not in self.names:
+                return None
+            return next((location_id for location_id, row in self.rows.items()
+                         if location_id.startswith(prefix) and location_name_key(row['LOCATION_NAME']) == name_key),
+                        None)
+
+    def fetch_inserted_record(self, location_id):
+        row = self.rows.get(location_id)
+        return dict(row) if row else None
+
+    def location_names(self, zone, aisle):
+        prefix = f"{zone}{aisle}"
+        with self.lock:
+            return [row['LOCATION_NAME'] for location_id, row in self.rows.items() if location_id.startswith(prefix)]
+
+    def location_ids_since(self, since=None):
+        with self.lock:
+            return [(row['LOCATION_ID'], row['CREATED_DATE']) for row in self.rows.values()
+                    if since is None or (row['CREATED_DATE'] is not None and row['CREATED_DATE'] >= since)]
+
+    def list_locations(self, after=None, limit=500, zone=None, aisle=None, site_code=None, location_type=None):
+        with self.lock:
+            if self.sorted_ids is None:
+                self.sorted_ids = sorted(self.rows)
+            ids = self.sorted_ids
+            page = []
+            index = bisect_right(ids, after) if after is not None else 0
+            while index < len(ids) and len(page) < limit:
+                row = self.rows[ids[index]]
+                if location_matches(row, zone, aisle, site_code, location_type):
+                    page.append(tuple(row[column] for column in LOC_COLUMNS))
+                index += 1
+            return page
+
+    def create_location(self, location, zone, aisle):
+        with self.lock:
+            return super().create_location(location, zone, aisle)
+
+    def create_locations(self, entries):
+        with self.lock:
+            return super().create_locations(entries)
+
+class SQLiteLocationStore(LocationStore):
+    """LOC in SQLite, for offline runs with real SQL round trips"""
+    def __init__(self, path=':memory:', cache_statements=True):
+        self.conn = trace_connection(sqlite3.connect(path, check_same_thread=False))
+        self.lock = threading.RLock()
+        self.conn.create_function('NAME_KEY', 1, location_name_key, deterministic=True)
+        self.conn.execute(SQLITE_DDL)
+        self.conn.execute(SQLITE_NAME_KEY_INDEX_DDL)
+        self.conn.commit()
+        self.statements = StatementCache(self.conn) if cache_statements else None
+
+    def cursor(self, sql):
+        """The cached cursor for `sql` (caller holds the lock)"""
+        return self.statements.cursor(sql) if self.statements is not None else self.conn.cursor()
+
+    def execute(self, sql, params):
+        with self.lock:
+            self.round_trips += 1
+            return self.cursor(sql).execute(sql, params).fetchall()
+
+    def binds(self, location):
+        """LOC binds with CREATED_DATE as the ISO text SQLite stores"""
+        binds = loc_binds(location)
+        if isinstance(binds['CREATED_DATE'], datetime):
+            binds['CREATED_DATE'] = binds['CREATED_DATE'].isoformat(sep=' ', timespec='seconds')
+        return binds
+
+    @timed('sql.check_duplicate')
+    def check_duplicate(self, location_id):
+        return bool(self.execute(CHECK_DUPLICATE_SQL, {'id': location_id}))
+
+    @timed('sql.insert_location')
+    def insert_location(self, location):
+        binds = self.binds(location)
+        with self.lock:
+            try:
+                self.round_trips += 1
+                self.cursor(INSERT_SQL).execute(INSERT_SQL, binds)
+                with METRICS.timer('sql.commit'):
+                    self.conn.commit()
+            except sqlite3.IntegrityError as e:
+                self.conn.rollback()
+                raise DuplicateLocationError(str(e))
+
+    @timed('sql.insert_locations')
+    def insert_locations(self, locations):
+        errors = []
+        with self.lock:
+            cursor = self.cursor(INSERT_SQL)
+            for offset, location in enumerate(locations):
+                try:
+                    cursor.execute(INSERT_SQL, self.binds(location))
+                except sqlite3.IntegrityError as e:
+                    errors.append((offset, str(e)))
+            with METRICS.timer('sql.commit'):
+                self.conn.commit()
+            self.round_trips += 1
+        return errors
+
+    @timed('sql.update_locations')
+    def update_locations(self, locations):
+        errors = []
+        with self.lock:
+            cursor = self.cursor(UPDATE_SQL)
+            for offset, location in enumerate(locations):
+                if cursor.execute(UPDATE_SQL, update_binds(location)).rowcount == 0:
+                    errors.append((offset, f"LOCATION_ID {location['LOCATION_ID']} not found"))
+            with METRICS.timer('sql.commit'):
+                self.conn.commit()
+            self.round_trips += 1
+        return errors
+
+    @timed('sql.get_next_location_id')
+    def get_next_location_id(self, zone, aisle):
+        rows = self.execute("""
+            SELECT LOCATION_ID FROM LOC WHERE LOCATION_ID LIKE :pattern
+            ORDER BY LENGTH(LOCATION_ID) DESC, LOCATION_ID DESC LIMIT 1
+        """, {'pattern': f"{zone}{aisle}%"})
+        return next_sequence_id(zone, aisle, rows[0][0] if rows else None)
+
+    @timed('sql.check_duplicate_location_name')
+    def check_duplicate_location_name(self, name, zone, aisle):
+        return bool(self.execute("""
+            SELECT 1 FROM LOC WHERE substr(LOCATION_ID, 1, 3) = :prefix AND NAME_KEY(LOCATION_NAME) = :name_key
+        """, {'prefix': f"{zone}{aisle}", 'name_key': location_name_key(name)}))
+
+    @timed('sql.find_location_by_name')
+    def find_location_by_name(self, name, zone, aisle):
+        rows = self.execute("""
+            SELECT LOCATION_ID FROM LOC WHERE substr(LOCATION_ID, 1, 3) = :prefix AND NAME_KEY(LOCATION_NAME) = :name_key
+            LIMIT 1
+        """, {'prefix': f"{zone}{aisle}", 'name_key': location_name_key(name)})
+        return rows[0][0] if rows else None
+
+    @timed('sql.location_names')
+    def location_names(self, zone, aisle):
+        rows = self.execute(LOCATION_NAMES_SQL, {'pattern': f"{zone}{aisle}%"})
+        return [name for (name,) in rows]
+
+    @timed('sql.fetch_inserted_record')
+    def fetch_inserted_record(self, location_id):
+        with self.lock:
+            self.round_trips += 1
+            cursor = self.cursor(FETCH_RECORD_SQL).execute(FETCH_RECORD_SQL, {'id': location_id})
+            row = cursor.fetchone()
+            columns = [col[0] for col in cursor.description]
+        return dict(zip(columns, row)) if row else None
+
+    @timed('sql.location_ids_since')
+    def location_ids_since(self, since=None):
+        if since is None:
+            rows = self.execute("SELECT LOCATION_ID, CREATED_DATE FROM LOC", {})
+        else:
+            rows = self.execute("SELECT LOCATION_ID, CREATED_DATE FROM LOC WHERE CREATED_DATE >= :since",
+                                {'since': since.isoformat(sep=' ', timespec='seconds')})
+        return [(location_id, datetime.fromisoformat(created) if created else None)
+                for location_id, created in rows]
+
+    @timed('sql.list_locations')
+    def list_locations(self, after=None, limit=500, zone=None, aisle=None, site_code=None, location_type=None):
+        sql, binds = location_page_query(after, limit, zone, aisle, site_code, location_type, "LIMIT :limit")
+        return self.execute(sql, binds)
+
+    def create_location(self, location, zone, aisle):
+        with self.lock:
+            return super().create_location(location, zone, aisle)
+
+    def create_locations(self, entries):
+        with self.lock:
+            return super().create_locations(entries)
+
+    def close(self):
+        if self.statements is not None:
+            self.statements.close()
+        self.conn.close()
+
+def open_store(spec, conn=None):
+    """Build a store from a spec: 'oracle' (needs conn), 'memory', 'sqlite:<path>' or 'sites:<config.json>'"""
+    if spec == 'oracle':
+        return OracleLocationStore(conn)
+    if spec == 'memory':
+        return MemoryLocationStore()
+    if spec.startswith('sqlite'):
+        _, _, path = spec.partition(':')
+        return SQLiteLocationStore(path or ':memory:')
+    if spec.startswith('sites:'):
+        # site_shards builds on this module
+        from site_shards import ShardedLocationStore
+        return ShardedLocationStore.from_config(spec.partition(':')[2])
+    raise ValueError(f"Unknown store '{spec}' (expected oracle, memory, sqlite:<path> or sites:<config.json>)")
@@ -0,0 +1,158 @@
+import bisect
+import functools
+import threading
+import time
+
+# Upper bounds in seconds, 50µs to 10s; the last bucket catches everything above
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Fixed-bucket latency histogram: O(log buckets) per observation, no samples kept"""
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(BUCKETS[index], self.max) if index < len(BUCKETS) else self.max
+        return self.max
+
+class StageTimer:
+    """Plain class rather than @contextmanager: no generator per timed block"""
+    __slots__ = ('registry', 'stage', 'start')
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.registry.observe(self.stage, time.perf_counter() - self.start, exc_type is not None)
+        return False
+
+class MetricsRegistry:
+    """Per-stage latency histograms and error counters, shared by the whole process"""
+    FOLD_EVERY = 1024
+
+    def __init__(self):
+        self.histograms = {}
+        self.errors = {}
+        # Raw observations per stage; list.append is atomic, so the hot path takes no lock
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def observe(self, stage, seconds, failed=False):
+        pending = self.pending.get(stage)
+        if pending is None:
+            with self.lock:
+                pending = self.pending.setdefault(stage, [])
+        # A failed call is recorded as a negative duration
+        pending.append(-seconds if failed else seconds)
+        if len(pending) >= self.FOLD_EVERY:
+            with self.lock:
+                self.fold(stage, pending)
+
+    def fold(self, stage, pending):
+        """Move buffered observations into the stage histogram (caller holds the lock)"""
+        count = len(pending)
+        observations = pending[:count]
+        # Only the folded prefix is removed; appends racing with us stay buffered
+        del pending[:count]
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        for seconds in observations:
+            if seconds < 0:
+                seconds = -seconds
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+            histogram.observe(seconds)
+
+    def fold_all(self):
+        for stage, pending in list(self.pending.items()):
+            self.fold(stage, pending)
+
+    def timer(self, stage):
+        """Context manager timing a block under `stage`"""
+        return StageTimer(self, stage)
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.errors.clear()
+            self.pending.clear()
+
+    def render_prometheus(self):
+        """Text exposition format for a /metrics scrape"""
+        lines = ['# HELP warehouse_stage_seconds Time spent per assistant stage',
+                 '# TYPE warehouse_stage_seconds histogram']
+        with self.lock:
+            self.fold_all()
+            for stage in sorted(self.histograms):
+                histogram = self.histograms[stage]
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'warehouse_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'warehouse_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'warehouse_stage_seconds_sum{{stage="{stage}"}} {histogram.total:.6f}')
+                lines.append(f'warehouse_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            lines.append('# HELP warehouse_stage_errors_total Stage calls that raised')
+            lines.append('# TYPE warehouse_stage_errors_total counter')
+            for stage in sorted(self.errors):
+                lines.append(f'warehouse_stage_errors_total{{stage="{stage}"}} {self.errors[stage]}')
+        return '\n'.join(lines) + '\n'
+
+    def report(self):
+        """Per-stage breakdown table, slowest total first (for --profile)"""
+        with self.lock:
+            self.fold_all()
+            rows = sorted(self.histograms.items(), key=lambda item: item[1].total, reverse=True)
+            errors = dict(self.errors)
+        if not rows:
+            return "No stages were timed."
+        lines = [f"{'stage':<34}{'calls':>8}{'total ms':>11}{'mean µs':>10}{'p95 µs':>10}{'max µs':>10}{'errors':>8}"]
+        for stage, histogram in rows:
+            lines.append(f"{stage:<34}{histogram.count:>8}{histogram.total * 1e3:>11.2f}"
+                         f"{histogram.total / histogram.count * 1e6:>10.1f}{histogram.quantile(0.95) * 1e6:>10.0f}"
+                         f"{histogram.max * 1e6:>10.0f}{errors.get(stage, 0):>8}")
+        return '\n'.join(lines)
+
+METRICS = MetricsRegistry()
+
+def timed(stage):
+    """Decorator recording each call's latency under `stage` in METRICS"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = function(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                METRICS.observe(stage, time.perf_counter() - start, failed)
+        return wrapper
+    return decorator
@@ -0,0 +1,114 @@
+import threading
+
+from location_id_allocator import format_location_id
+
+class AisleOccupancy:
+    """Used sequence numbers of one zone/aisle, one flag byte per number
+
+    Free-slot searches run as bytearray.find() calls, so "first gap" and
+    "N contiguous free numbers" are answered in C without a Python loop.
+    """
+    FREE = 0
+    USED = 1
+
+    def __init__(self):
+        # Index 0 is a sentinel; sequence numbers start at 1
+        self.flags = bytearray(1)
+        self.flags[0] = self.USED
+        self.highest = 0
+
+    def mark_used(self, number):
+        """Record a sequence number as taken"""
+        if number >= len(self.flags):
+            self.flags.extend(bytes(number - len(self.flags) + 1))
+        self.flags[number] = self.USED
+        self.highest = max(self.highest, number)
+
+    def mark_free(self, number):
+        """Release a sequence number (e.g., after a slot is deleted)"""
+        if 0 < number < len(self.flags):
+            self.flags[number] = self.FREE
+            if number == self.highest:
+                self.highest = self.flags.rfind(self.USED)
+
+    def is_used(self, number):
+        """Check whether a sequence number is taken"""
+        return 0 < number < len(self.flags) and self.flags[number] == self.USED
+
+    def next_free(self):
+        """Number after the highest one in use (the old max + 1 behaviour)"""
+        return self.highest + 1
+
+    def first_gap(self):
+        """Lowest free number, reusing numbers freed by deleted slots"""
+        gap = self.flags.find(self.FREE, 1, self.highest + 1)
+        return gap if gap != -1 else self.highest + 1
+
+    def contiguous_free(self, count):
+        """First number of the lowest run of `count` free numbers"""
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        start = self.flags.find(bytes(count), 1, self.highest + 1)
+        # No run fits below the highest used number, so start right after it
+        return start if start != -1 else self.highest + 1
+
+class OccupancyIndex:
+    """Per-(zone, aisle) occupancy of LOCATION_ID sequence numbers
+
+    Each aisle is loaded from LOC the first time it is asked for and then kept
+    up to date through mark_used(), so later lookups never touch the database.
+    """
+    def __init__(self, conn):
+        self.conn = conn
+        self.aisles = {}
+        self.lock = threading.Lock()
+        self.round_trips = 0
+
+    def load_aisle(self, zone, aisle):
+        """Read the used sequence numbers for one zone/aisle from LOC"""
+        occupancy = AisleOccupancy()
+        prefix = f"{zone}{aisle}"
+        cursor = self.conn.cursor()
+        try:
+            cursor.arraysize = 1000
+            cursor.execute("SELECT LOCATION_ID FROM LOC WHERE LOCATION_ID LIKE :pattern",
+                           pattern=f"{prefix}%")
+            for (location_id,) in cursor:
+                suffix = location_id[len(prefix):]
+                if suffix.isdigit():
+                    occupancy.mark_used(int(suffix))
+        finally:
+            cursor.close()
+            self.round_trips += 1
+        return occupancy
+
+    def aisle(self, zone, aisle):
+        """Return the occupancy for a zone/aisle, loading it on first use"""
+        key = (zone, aisle)
+        with self.lock:
+            occupancy = self.aisles.get(key)
+            if occupancy is None:
+                occupancy = self.load_aisle(zone, aisle)
+                self.aisles[key] = occupancy
+            return occupancy
+
+    def next_free_id(self, zone, aisle):
+        """LOCATION_ID after the highest one in use"""
+        return format_location_id(zone, aisle, self.aisle(zone, aisle).next_free())
+
+    def first_gap_id(self, zone, aisle):
+        """Lowest free LOCATION_ID in the aisle"""
+        return format_location_id(zone, aisle, self.aisle(zone, aisle).first_gap())
+
+    def contiguous_free_ids(self, zone, aisle, count):
+        """First run of `count` consecutive free LOCATION_IDs in the aisle"""
+        start = self.aisle(zone, aisle).contiguous_free(count)
+        return [format_location_id(zone, aisle, number) for number in range(start, start + count)]
+
+    def mark_used(self, zone, aisle, location_id):
+        """Keep the index in sync after a location has been inserted"""
+        suffix = location_id[len(zone) + len(aisle):]
+        if suffix.isdigit():
+            occupancy = self.aisle(zone, aisle)
+            with self.lock:
+                occupancy.mark_used(int(suffix))
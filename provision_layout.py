@@ -0,0 +1,176 @@
+import argparse
+import string
+import time
+from datetime import datetime
+
+from create_location import get_db_connection, insert_location_batch
+from location_id_allocator import LocationIdAllocator, format_location_id
+from site_shards import site_code_for_zone
+from statement_cache import StatementCache
+from warehouse_ai_assistant_auto import WarehouseAIAssistant
+
+class LayoutSpec:
+    """Zones x aisles x bays to provision in one operation"""
+    def __init__(self, zones, aisles, bays_per_aisle, location_type='Bay', created_by='Layout_Provisioning'):
+        self.zones = zones
+        self.aisles = aisles
+        self.bays_per_aisle = bays_per_aisle
+        self.location_type = location_type
+        self.created_by = created_by
+
+    @property
+    def total_rows(self):
+        return len(self.zones) * len(self.aisles) * self.bays_per_aisle
+
+    def validate(self):
+        """Check the spec with the same rules the auto assistant applies"""
+        rules = WarehouseAIAssistant()
+        errors = []
+        for zone in self.zones:
+            valid, message = rules.validate_zone(zone)
+            if not valid:
+                errors.append(f"Zone {zone}: {message}")
+        for aisle in self.aisles:
+            valid, message = rules.validate_aisle(aisle)
+            if not valid:
+                errors.append(f"Aisle {aisle}: {message}")
+        valid, message = rules.validate_location_type(self.location_type)
+        if not valid:
+            errors.append(message)
+        if self.bays_per_aisle < 1:
+            errors.append("Bays per aisle must be at least 1")
+        return errors
+
+def parse_zones(text):
+    """'A-D' or 'A,C,E' -> ['A', 'B', 'C', 'D'] / ['A', 'C', 'E']; ValueError for a malformed range"""
+    zones = []
+    for part in text.upper().split(','):
+        part = part.strip()
+        if '-' in part:
+            first, last = (bound.strip() for bound in part.split('-', 1))
+            letters = string.ascii_uppercase
+            if not all(len(bound) == 1 and bound in letters for bound in (first, last)) or first > last:
+                raise ValueError(f"Zone range '{part}' must be two letters in order, e.g. A-D")
+            zones.extend(letters[letters.index(first):letters.index(last) + 1])
+        elif part:
+            zones.append(part)
+    return zones
+
+def parse_aisles(text):
+    """'01-40' or '1,5,7' -> ['01', ..., '40'] / ['01', '05', '07']; ValueError for a malformed range"""
+    aisles = []
+    for part in text.split(','):
+        part = part.strip()
+        if '-' in part:
+            bounds = [bound.strip() for bound in part.split('-', 1)]
+            if not all(bound.isdigit() for bound in bounds) or int(bounds[0]) > int(bounds[1]):
+                raise ValueError(f"Aisle range '{part}' must be two numbers in increasing order, e.g. 01-40")
+            first, last = map(int, bounds)
+            aisles.extend(f"{number:02d}" for number in range(first, last + 1))
+        elif part:
+            aisles.append(part.zfill(2))
+    return aisles
+
+def expand_layout(spec, reserve):
+    """Lazily yield LOC rows for the layout, one aisle at a time
+
+    reserve(zone, aisle, count) must reserve `count` sequence numbers for the
+    aisle and return the first one, so each aisle costs a single reservation.
+    """
+    created_date = datetime.now()
+    for zone in spec.zones:
+        site_code = site_code_for_zone(zone)
+        for aisle in spec.aisles:
+            first = reserve(zone, aisle, spec.bays_per_aisle)
+            for number in range(first, first + spec.bays_per_aisle):
+                location_id = format_location_id(zone, aisle, number)
+                yield {
+                    'LOCATION_ID': location_id,
+                    'LOCATION_NAME': f"{spec.location_type} {location_id}",
+                    'SITE_CODE': site_code,
+                    'LOCATION_TYPE': spec.location_type,
+                    'CREATED_BY': spec.created_by,
+                    'CREATED_DATE': created_date
+                }
+
+def batched(rows, batch_size):
+    """Group an iterator into lists of at most batch_size items"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def provision_layout(conn, spec, batch_size=1000, dry_run=False):
+    """Reserve IDs per aisle and array-insert the whole layout, reporting rows/second"""
+    statements = None
+    if dry_run:
+        reserve = lambda zone, aisle, count: 1
+    else:
+        reserve = LocationIdAllocator(conn).reserve_block
+        statements = StatementCache(conn)
+
+    total = spec.total_rows
+    processed = failed = 0
+    first_id = last_id = None
+    start = time.perf_counter()
+    try:
+        for batch in batched(expand_layout(spec, reserve), batch_size):
+            first_id = first_id or batch[0]['LOCATION_ID']
+            last_id = batch[-1]['LOCATION_ID']
+            if not dry_run:
+                errors = insert_location_batch(statements, batch)
+                for offset, message in errors[:3]:
+                    print(f"\n❌ {batch[offset]['LOCATION_ID']}: {message}")
+                failed += len(errors)
+            processed += len(batch)
+            rate = processed / max(time.perf_counter() - start, 1e-9)
+            print(f"\r{processed:,}/{total:,} rows  {rate:,.0f} rows/s", end='', flush=True)
+    finally:
+        if statements is not None:
+            statements.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n{'Dry run' if dry_run else 'Provisioning'} complete: {processed - failed:,} rows "
+          f"({failed:,} failed) in {elapsed:.1f}s, IDs {first_id} .. {last_id}")
+    return processed - failed, failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Provision a whole grid of warehouse locations")
+    parser.add_argument('--zones', required=True, help="Zone range or list, e.g. A-D or A,C")
+    parser.add_argument('--aisles', required=True, help="Aisle range or list, e.g. 01-40")
+    parser.add_argument('--bays', type=int, required=True, help="Locations per aisle")
+    parser.add_argument('--type', default='Bay', help="LOCATION_TYPE for every generated location")
+    parser.add_argument('--created-by', default='Layout_Provisioning', help="CREATED_BY for every generated location")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Rows per array insert and commit")
+    parser.add_argument('--dry-run', action='store_true', help="Expand the layout without touching the database")
+    args = parser.parse_args()
+
+    try:
+        spec = LayoutSpec(parse_zones(args.zones), parse_aisles(args.aisles), args.bays, args.type, args.created_by)
+    except ValueError as e:
+        errors = [str(e)]
+    else:
+        errors = spec.validate()
+    if errors:
+        print("❌ Invalid layout:\n" + "\n".join(f"• {error}" for error in errors))
+        return
+
+    print(f"Layout: {len(spec.zones)} zones x {len(spec.aisles)} aisles x {spec.bays_per_aisle} bays "
+          f"= {spec.total_rows:,} locations")
+    conn = None
+    try:
+        if not args.dry_run:
+            conn = get_db_connection()
+        provision_layout(conn, spec, args.batch_size, args.dry_run)
+    except Exception as e:
+        print("Error:", e)
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import argparse
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing.managers import BaseManager
+
+LOCATION_SLOTS = {
+    'LOCATION_ID': 'location_id',
+    'LOCATION_NAME': 'location_name',
+    'SITE_CODE': 'site_code',
+    'LOCATION_TYPE': 'location_type'
+}
+
+class Conversation:
+    """Compact per-conversation state kept on the server instead of in the cookie"""
+    __slots__ = ('state', 'location_id', 'location_name', 'site_code', 'location_type', 'last_seen')
+
+    def __init__(self, state='greeting'):
+        self.state = state
+        self.location_id = None
+        self.location_name = None
+        self.site_code = None
+        self.location_type = None
+        self.last_seen = time.monotonic()
+
+    def location(self):
+        """The collected fields as the dict the assistant works with"""
+        location = {}
+        for field, slot in LOCATION_SLOTS.items():
+            value = getattr(self, slot)
+            if value is not None:
+                location[field] = value
+        return location
+
+    def set_location(self, location):
+        """Replace the collected fields (extra keys are not kept)"""
+        for field, slot in LOCATION_SLOTS.items():
+            setattr(self, slot, location.get(field))
+
+def conversation_size(conversation):
+    """Approximate bytes held by one conversation object and its values"""
+    size = sys.getsizeof(conversation)
+    for slot in Conversation.__slots__:
+        value = getattr(conversation, slot)
+        if value is not None:
+            size += sys.getsizeof(value)
+    return size
+
+class ConversationStore:
+    """In-process conversation store with TTL expiry and LRU eviction
+
+    Conversations are kept in access order, so expired ones always sit at the
+    front and are purged in amortised O(1) per request.
+    """
+    def __init__(self, ttl=1800, max_conversations=100000):
+        self.ttl = ttl
+        self.max_conversations = max_conversations
+        self.conversations = OrderedDict()
+        self.lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+
+    def purge(self, now):
+        """Drop expired conversations, then the least recently used beyond the bound"""
+        while self.conversations:
+            sid, conversation = next(iter(self.conversations.items()))
+            if now - conversation.last_seen < self.ttl:
+                break
+            del self.conversations[sid]
+            self.expired += 1
+        while len(self.conversations) > self.max_conversations:
+            self.conversations.popitem(last=False)
+            self.evicted += 1
+
+    def create(self):
+        """Start a new conversation; returns (sid, conversation)"""
+        sid = secrets.token_urlsafe(12)
+        conversation = Conversation()
+        self.save(sid, conversation)
+        return sid, conversation
+
+    def load(self, sid):
+        """Return the conversation for a session ID, or None if unknown or expired"""
+        now = time.monotonic()
+        with self.lock:
+            conversation = self.conversations.get(sid)
+            if conversation is None or now - conversation.last_seen >= self.ttl:
+                return None
+            conversation.last_seen = now
+            self.conversations.move_to_end(sid)
+            return conversation
+
+    def save(self, sid, conversation):
+        """Store the conversation under its session ID and mark it most recently used"""
+        now = time.monotonic()
+        conversation.last_seen = now
+        with self.lock:
+            self.conversations[sid] = conversation
+            self.conversations.move_to_end(sid)
+            self.purge(now)
+
+    def delete(self, sid):
+        with self.lock:
+            self.conversations.pop(sid, None)
+
+    def stats(self):
+        """Conversation count, eviction counters and measured memory per conversation"""
+        with self.lock:
+            count = len(self.conversations)
+            sample = list(self.conversations.values())[-100:]
+            per_conversation = sum(map(conversation_size, sample)) / len(sample) if sample else 0
+            return {
+                'conversations': count,
+                'max_conversations': self.max_conversations,
+                'ttl_seconds': self.ttl,
+                'expired': self.expired,
+                'evicted': self.evicted,
+                'bytes_per_conversation': round(per_conversation, 1),
+                'approx_total_bytes': round(per_conversation * count)
+            }
+
+class ConversationStoreManager(BaseManager):
+    """Serves one ConversationStore to every worker process over a local socket"""
+
+def parse_address(address):
+    """'host:port' -> (host, port); anything else is a Unix socket path"""
+    host, sep, port = address.rpartition(':')
+    return (host, int(port)) if sep and port.isdigit() else address
+
+def connect_store(address, authkey):
+    """Proxy to the shared store served by `python session_store.py serve`"""
+    ConversationStoreManager.register('store')
+    manager = ConversationStoreManager(address=parse_address(address), authkey=authkey)
+    manager.connect()
+    return manager.store()
+
+def serve(address, authkey, ttl, max_conversations):
+    store = ConversationStore(ttl, max_conversations)
+    ConversationStoreManager.register('store', callable=lambda: store)
+    manager = ConversationStoreManager(address=parse_address(address), authkey=authkey)
+    print(f"Conversation store listening on {address} (ttl {ttl}s, max {max_conversations})")
+    manager.get_server().serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared conversation store for multi-worker web deployments")
+    parser.add_argument('command', choices=['serve'])
+    parser.add_argument('--address', default='127.0.0.1:50055', help="host:port or Unix socket path")
+    parser.add_argument('--authkey', default='warehouse_ai_sessions')
+    parser.add_argument('--ttl', type=int, default=1800, help="Seconds an idle conversation is kept")
+    parser.add_argument('--max-conversations', type=int, default=100000)
+    args = parser.parse_args()
+    serve(args.address, args.authkey.encode(), args.ttl, args.max_conversations)
+
+if __name__ == "__main__":
+    # Run from the importable module so pickled Conversations resolve in the workers
+    import session_store
+    session_store.main()
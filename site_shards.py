@@ -0,0 +1,183 @@
+import heapq
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from operator import itemgetter
+
+from location_store import LocationStore, OracleLocationStore, open_store
+from sql_trace import trace_connection
+from statement_cache import set_statement_cache_size
+
+# Simple mapping: Zone A = WH1, Zone B = WH2, etc.
+ZONE_SITE_CODES = {
+    'A': 'WH1', 'B': 'WH2', 'C': 'WH3', 'D': 'WH4', 'E': 'WH5',
+    'F': 'WH6', 'G': 'WH7', 'H': 'WH8', 'I': 'WH9', 'J': 'WH10'
+}
+
+def site_code_for_zone(zone):
+    """Site that owns a zone; zones outside the mapping belong to WH0"""
+    return ZONE_SITE_CODES.get(zone.upper(), 'WH0')
+
+def pool_connector(pool):
+    """connect= callable for OracleLocationStore borrowing from one site's pool"""
+    @contextmanager
+    def borrow():
+        conn = pool.acquire()
+        try:
+            yield trace_connection(conn)
+        finally:
+            pool.release(conn)
+    return borrow
+
+def open_site_store(site_code, site):
+    """Store for one entry of the site config: {"dsn": ...} (Oracle pool) or {"store": "sqlite:<path>"}"""
+    if 'store' in site:
+        return open_store(site['store']), None
+    import cx_Oracle
+    pool = cx_Oracle.SessionPool(
+        user=site.get('user') or os.environ.get('ORACLE_USER'),
+        password=site.get('password') or os.environ.get('ORACLE_PASSWORD'),
+        dsn=site['dsn'],
+        min=site.get('pool_min', 1),
+        max=site.get('pool_max', 4),
+        increment=1,
+        threaded=True,
+        getmode=cx_Oracle.SPOOL_ATTRVAL_WAIT
+    )
+    set_statement_cache_size(pool)
+    return OracleLocationStore(connect=pool_connector(pool)), pool
+
+class ShardedLocationStore(LocationStore):
+    """LOC split across one database per site, routed by site code
+
+    Zone-scoped calls go to the site that owns the zone (ZONE_SITE_CODES),
+    inserts to the row's SITE_CODE. Calls that are global by nature (the
+    LOCATION_ID duplicate check, fetch by ID, ID scans) fan out to every
+    shard in parallel, at most `max_parallel` at a time, and merge.
+    """
+    def __init__(self, shards, max_parallel=4, pools=None):
+        if not shards:
+            raise ValueError("At least one site is required")
+        self.shards = shards
+        self.pools = pools or {}
+        self.executor = ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(shards))),
+                                           thread_name_prefix='site-shard')
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, path, max_parallel=None):
+        """Open every site in a JSON config: {"sites": {"WH1": {"dsn": ...}, ...}, "max_parallel": 4}"""
+        with open(path, encoding='utf-8') as config_file:
+            config = json.load(config_file)
+        sites = config['sites']
+        max_parallel = max_parallel or config.get('max_parallel', 4)
+        # Opening a pool is a full logon per session; do the sites side by side
+        with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(sites)))) as executor:
+            opened = dict(zip(sites, executor.map(lambda item: open_site_store(*item), sites.items())))
+        shards = {site_code: store for site_code, (store, _) in opened.items()}
+        pools = {site_code: pool for site_code, (_, pool) in opened.items() if pool is not None}
+        return cls(shards, max_parallel, pools)
+
+    @property
+    def round_trips(self):
+        return sum(store.round_trips for store in self.shards.values())
+
+    def shard(self, site_code):
+        store = self.shards.get(site_code)
+        if store is None:
+            raise ValueError(f"No database is configured for site {site_code}")
+        return store
+
+    def zone_shard(self, zone):
+        return self.shard(site_code_for_zone(zone))
+
+    def fan_out(self, method, *args):
+        """Call `method` on every shard in parallel; returns {site_code: result}"""
+        futures = {site_code: self.executor.submit(getattr(store, method), *args)
+                   for site_code, store in self.shards.items()}
+        return {site_code: future.result() for site_code, future in futures.items()}
+
+    def check_duplicate(self, location_id):
+        return any(self.fan_out('check_duplicate', location_id).values())
+
+    def insert_location(self, location):
+        self.shard(location['SITE_CODE']).insert_location(location)
+
+    def by_site(self, method, locations):
+        """Group by SITE_CODE and call `method` with each group on its shard in parallel"""
+        groups = {}
+        errors = []
+        for offset, location in enumerate(locations):
+            if location.get('SITE_CODE') in self.shards:
+                groups.setdefault(location['SITE_CODE'], []).append(offset)
+            else:
+                errors.append((offset, f"No database is configured for site {location.get('SITE_CODE')}"))
+        futures = [(offsets, self.executor.submit(getattr(self.shards[site_code], method),
+                                                  [locations[offset] for offset in offsets]))
+                   for site_code, offsets in groups.items()]
+        for offsets, future in futures:
+            errors.extend((offsets[offset], message) for offset, message in future.result())
+        return sorted(errors)
+
+    def insert_locations(self, locations):
+        """Group by SITE_CODE, insert each group on its shard in parallel; offsets refer to `locations`"""
+        return self.by_site('insert_locations', locations)
+
+    def update_locations(self, locations):
+        """Update each row on its SITE_CODE's shard; a row moving to another site is not found there"""
+        return self.by_site('update_locations', locations)
+
+    def get_next_location_id(self, zone, aisle):
+        return self.zone_shard(zone).get_next_location_id(zone, aisle)
+
+    def check_duplicate_location_name(self, name, zone, aisle):
+        return self.zone_shard(zone).check_duplicate_location_name(name, zone, aisle)
+
+    def fetch_inserted_record(self, location_id):
+        for record in self.fan_out('fetch_inserted_record', location_id).values():
+            if record is not None:
+                return record
+        return None
+
+    def location_ids_since(self, since=None):
+        return [row for rows in self.fan_out('location_ids_since', since).values() for row in rows]
+
+    def location_names(self, zone, aisle):
+        return self.zone_shard(zone).location_names(zone, aisle)
+
+    def list_locations(self, after=None, limit=500, zone=None, aisle=None, site_code=None, location_type=None):
+        """One site's page when filtered by site code, else each shard's page merged in LOCATION_ID order"""
+        args = (after, limit, zone, aisle, site_code, location_type)
+        if site_code in self.shards:
+            return self.shards[site_code].list_locations(*args)
+        pages = self.fan_out('list_locations', *args).values()
+        return list(islice(heapq.merge(*pages, key=itemgetter(0)), limit))
+
+    def find_location_by_name(self, name, zone, aisle):
+        return self.zone_shard(zone).find_location_by_name(name, zone, aisle)
+
+    def create_location(self, location, zone, aisle):
+        return self.zone_shard(zone).create_location(location, zone, aisle)
+
+    def create_locations(self, entries):
+        """Group by the zone's shard, create each group there in parallel; results follow `entries`"""
+        groups = {}
+        for offset, (_, zone, _) in enumerate(entries):
+            groups.setdefault(self.zone_shard(zone), []).append(offset)
+        futures = [(offsets, self.executor.submit(store.create_locations, [entries[offset] for offset in offsets]))
+                   for store, offsets in groups.items()]
+        results = [None] * len(entries)
+        for offsets, future in futures:
+            for offset, result in zip(offsets, future.result()):
+                results[offset] = result
+        return results
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for store in self.shards.values():
+            store.close()
+        for pool in self.pools.values():
+            pool.close()
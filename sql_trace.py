@@ -0,0 +1,309 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'MERGE')
+SORT_KEYS = ['total_ms', 'calls', 'mean_ms', 'max_ms', 'rows', 'rows_per_call', 'round_trips']
+
+def normalize_sql(sql):
+    """Collapse whitespace so the same statement from different call sites groups together"""
+    return re.sub(r'\s+', ' ', sql).strip()
+
+def bind_shape(params, kwargs=None):
+    """Bind names and Python types, never values: 'id:str' or '3 positional'"""
+    if kwargs:
+        params = kwargs
+    if isinstance(params, dict):
+        return ', '.join(f"{name}:{type(value).__name__}" for name, value in sorted(params.items()))
+    if params:
+        return f"{len(params)} positional"
+    return ''
+
+class StatementStats:
+    __slots__ = ('sql', 'calls', 'total', 'max', 'rows', 'round_trips', 'bind_shapes', 'sample_binds')
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.round_trips = 0
+        self.bind_shapes = set()
+        self.sample_binds = None
+
+    def summary(self):
+        return {
+            'sql': self.sql,
+            'calls': self.calls,
+            'total_ms': round(self.total * 1000, 3),
+            'mean_ms': round(self.total / self.calls * 1000, 3) if self.calls else 0.0,
+            'max_ms': round(self.max * 1000, 3),
+            'rows': self.rows,
+            'rows_per_call': round(self.rows / self.calls, 1) if self.calls else 0.0,
+            'round_trips': self.round_trips,
+            'bind_shapes': sorted(self.bind_shapes)
+        }
+
+class SqlTracer:
+    """Collects per-statement timings from traced cursors; optionally logs every execution as JSONL"""
+    def __init__(self, log_path=None):
+        self.statements = {}
+        self.lock = threading.Lock()
+        self.log_file = open(log_path, 'a', encoding='utf-8') if log_path else None
+
+    def record(self, sql, shape, binds, elapsed, rows, round_trips):
+        with self.lock:
+            stats = self.statements.get(sql)
+            if stats is None:
+                stats = self.statements[sql] = StatementStats(sql)
+            stats.calls += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.rows += rows
+            stats.round_trips += round_trips
+            stats.bind_shapes.add(shape)
+            if binds is not None:
+                stats.sample_binds = binds
+            if self.log_file:
+                self.log_file.write(json.dumps({'sql': sql, 'binds': shape, 'elapsed_ms': round(elapsed * 1000, 3),
+                                                'rows': rows, 'round_trips': round_trips}) + '\n')
+                self.log_file.flush()
+
+    def summaries(self, sort_by='total_ms'):
+        with self.lock:
+            summaries = [stats.summary() for stats in self.statements.values()]
+        return sorted(summaries, key=lambda summary: summary[sort_by], reverse=True)
+
+    def capture_plans(self, conn, top=3):
+        """Execution plans of the `top` slowest statements (by total time), run on an untraced connection"""
+        with self.lock:
+            slowest = sorted(self.statements.values(), key=lambda stats: stats.total, reverse=True)
+        plans = {}
+        for stats in slowest:
+            if len(plans) >= top:
+                break
+            if not stats.sql.upper().startswith(EXPLAINABLE):
+                continue
+            try:
+                plans[stats.sql] = explain(conn, stats.sql, stats.sample_binds)
+            except Exception as e:
+                plans[stats.sql] = [f"(plan unavailable: {e})"]
+        return plans
+
+    def close(self):
+        if self.log_file:
+            self.log_file.close()
+
+def explain(conn, sql, binds):
+    """Plan lines for one statement: DBMS_XPLAN on Oracle, EXPLAIN QUERY PLAN on SQLite"""
+    cursor = conn.cursor()
+    try:
+        if type(conn).__module__.startswith('sqlite3'):
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", binds or {})
+            return [row[-1] for row in cursor.fetchall()]
+        # Stable across runs and processes (PLAN_TABLE.STATEMENT_ID is VARCHAR2(30))
+        statement_id = f"WH_TRACE_{hashlib.sha1(sql.encode('utf-8')).hexdigest()[:20]}"
+        # Earlier EXPLAIN PLANs of the same statement would show up in DBMS_XPLAN as well
+        cursor.execute("DELETE FROM PLAN_TABLE WHERE STATEMENT_ID = :statement_id", statement_id=statement_id)
+        try:
+            cursor.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR {sql}")
+            cursor.execute("SELECT PLAN_TABLE_OUTPUT FROM TABLE(DBMS_XPLAN.DISPLAY('PLAN_TABLE', :statement_id, 'TYPICAL'))",
+                           statement_id=statement_id)
+            return [line for (line,) in cursor.fetchall()]
+        finally:
+            cursor.execute("DELETE FROM PLAN_TABLE WHERE STATEMENT_ID = :statement_id", statement_id=statement_id)
+    finally:
+        cursor.close()
+
+class TracingCursor:
+    """Cursor proxy timing execute and fetch calls; everything else passes through"""
+    def __init__(self, cursor, tracer):
+        self.cursor = cursor
+        self.tracer = tracer
+        self.pending = None
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __setattr__(self, name, value):
+        if name in ('cursor', 'tracer', 'pending'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.cursor, name, value)
+
+    def flush(self):
+        """Record the previous statement once its rows have been consumed"""
+        if self.pending is not None:
+            sql, shape, binds, elapsed, rows, fetch_calls, array_fetches = self.pending
+            self.pending = None
+            if not fetch_calls and not sql.upper().startswith('SELECT'):
+                # DML: count the rows it touched
+                rows = max(getattr(self.cursor, 'rowcount', 0) or 0, 0)
+            arraysize = getattr(self.cursor, 'arraysize', 100) or 100
+            # Execute is one round trip; fetching more than one array's worth needs more.
+            # fetchone() and iteration read from the driver's array buffer, so only
+            # fetchmany()/fetchall() calls count on their own
+            round_trips = 1 + max(array_fetches - 1, 0, math.ceil(rows / arraysize) - 1)
+            self.tracer.record(sql, shape, binds, elapsed, rows, round_trips)
+
+    def timed_fetch(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        if self.pending is not None:
+            sql, shape, binds, elapsed, rows, fetch_calls, array_fetches = self.pending
+            is_fetchone = method == self.cursor.fetchone
+            fetched = (1 if result is not None else 0) if is_fetchone else len(result)
+            self.pending = (sql, shape, binds, elapsed + time.perf_counter() - start, rows + fetched,
+                            fetch_calls + 1, array_fetches + (0 if is_fetchone else 1))
+            if method == self.cursor.fetchall or (is_fetchone and result is None) or (not is_fetchone and not result):
+                # Result set exhausted
+                self.flush()
+        return result
+
+    def execute(self, sql, params=None, **kwargs):
+        self.flush()
+        start = time.perf_counter()
+        if params is None:
+            result = self.cursor.execute(sql, **kwargs) if kwargs else self.cursor.execute(sql)
+        else:
+            result = self.cursor.execute(sql, params, **kwargs)
+        binds = kwargs or params
+        self.pending = (normalize_sql(sql), bind_shape(params, kwargs), binds, time.perf_counter() - start, 0, 0, 0)
+        return self if result is self.cursor else result
+
+    def executemany(self, sql, seq_of_params, **kwargs):
+        self.flush()
+        rows = seq_of_params if isinstance(seq_of_params, list) else list(seq_of_params)
+        start = time.perf_counter()
+        result = self.cursor.executemany(sql, rows, **kwargs)
+        elapsed = time.perf_counter() - start
+        shape = f"{len(rows)} rows of ({bind_shape(rows[0])})" if rows else '0 rows'
+        self.tracer.record(normalize_sql(sql), shape, None, elapsed, len(rows), 1)
+        return self if result is self.cursor else result
+
+    def fetchone(self):
+        return self.timed_fetch(self.cursor.fetchone)
+
+    def fetchall(self):
+        return self.timed_fetch(self.cursor.fetchall)
+
+    def fetchmany(self, *args):
+        return self.timed_fetch(self.cursor.fetchmany, *args)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        self.flush()
+        self.cursor.close()
+
+class TracingConnection:
+    """Connection proxy handing out TracingCursors and timing commits"""
+    def __init__(self, conn, tracer):
+        self.conn = conn
+        self.tracer = tracer
+        self.open_cursors = []
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def cursor(self):
+        cursor = TracingCursor(self.conn.cursor(), self.tracer)
+        # sqlite3-style conn.execute() cursors are never closed explicitly; flush them later
+        self.open_cursors = [open_cursor for open_cursor in self.open_cursors if open_cursor.pending is not None]
+        while len(self.open_cursors) >= 100:
+            self.open_cursors.pop(0).flush()
+        self.open_cursors.append(cursor)
+        return cursor
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def commit(self):
+        self.flush()
+        start = time.perf_counter()
+        self.conn.commit()
+        self.tracer.record('COMMIT', '', None, time.perf_counter() - start, 0, 1)
+
+    def flush(self):
+        for cursor in self.open_cursors:
+            cursor.flush()
+        self.open_cursors = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+# Process-wide tracer, off unless enabled (WAREHOUSE_SQL_TRACE=<query log path> or enable_tracing())
+TRACER = None
+
+def enable_tracing(log_path=None):
+    global TRACER
+    if TRACER is None:
+        TRACER = SqlTracer(log_path)
+    return TRACER
+
+def trace_connection(conn):
+    """Wrap a DB-API connection when tracing is enabled, otherwise return it unchanged"""
+    if TRACER is None:
+        return conn
+    return TracingConnection(conn, TRACER)
+
+if os.environ.get('WAREHOUSE_SQL_TRACE'):
+    enable_tracing(os.environ['WAREHOUSE_SQL_TRACE'])
+
+def untraced(conn):
+    """The underlying connection, for work that should not show up in the trace"""
+    return conn.conn if isinstance(conn, TracingConnection) else conn
+
+def trace_report(conn=None, sort_by='total_ms', plans=3):
+    """Report for the process-wide tracer, with plans of the slowest statements if `conn` is given"""
+    if TRACER is None:
+        return "SQL tracing is not enabled."
+    captured = TRACER.capture_plans(untraced(conn), plans) if conn is not None and plans else None
+    return format_report(TRACER.summaries(sort_by), captured)
+
+def format_report(summaries, plans=None, limit=20):
+    """Sortable per-statement table, with captured plans underneath"""
+    lines = [f"{'total ms':>10}{'calls':>7}{'mean ms':>9}{'max ms':>9}{'rows':>8}{'rows/call':>10}{'trips':>7}  statement"]
+    for summary in summaries[:limit]:
+        sql = summary['sql'] if len(summary['sql']) <= 100 else summary['sql'][:97] + '...'
+        lines.append(f"{summary['total_ms']:>10.2f}{summary['calls']:>7}{summary['mean_ms']:>9.3f}"
+                     f"{summary['max_ms']:>9.3f}{summary['rows']:>8}{summary['rows_per_call']:>10.1f}"
+                     f"{summary['round_trips']:>7}  {sql}")
+    for sql, plan in (plans or {}).items():
+        lines.append(f"\nPlan for: {sql}")
+        lines.extend(f"    {line}" for line in plan)
+    return '\n'.join(lines)
+
+def summarize_log(path):
+    """Rebuild per-statement summaries from a JSONL query log"""
+    tracer = SqlTracer()
+    with open(path, encoding='utf-8') as log_file:
+        for line in log_file:
+            entry = json.loads(line)
+            tracer.record(entry['sql'], entry['binds'], None, entry['elapsed_ms'] / 1000, entry['rows'],
+                          entry['round_trips'])
+    return tracer
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a SQL query log written with WAREHOUSE_SQL_TRACE or --sql-trace")
+    parser.add_argument('command', choices=['report'])
+    parser.add_argument('log', help="JSONL query log")
+    parser.add_argument('--sort', choices=SORT_KEYS, default='total_ms')
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+    print(format_report(summarize_log(args.log).summaries(args.sort), limit=args.limit))
+
+if __name__ == "__main__":
+    main()
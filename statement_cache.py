@@ -0,0 +1,65 @@
+from sql_trace import untraced
+
+# Per-connection cache of parsed statements kept by the Oracle client (cx_Oracle default: 20)
+STMT_CACHE_SIZE = 50
+
+# Query shapes: a point lookup fits in the rows prefetched with the execute
+# itself; a scan fetches in large arrays and prefetches the first one.
+POINT_LOOKUP = {'arraysize': 1, 'prefetchrows': 2}
+LATEST_ROW = {'arraysize': 1, 'prefetchrows': 1}
+
+def scan(arraysize):
+    return {'arraysize': arraysize, 'prefetchrows': arraysize}
+
+def configure_cursor(cursor, arraysize=None, prefetchrows=None, inputsizes=None):
+    """Apply fetch sizing and input sizes; attributes a driver lacks (sqlite3 prefetchrows) are skipped"""
+    if arraysize is not None:
+        cursor.arraysize = arraysize
+    if prefetchrows is not None and hasattr(cursor, 'prefetchrows'):
+        cursor.prefetchrows = prefetchrows
+    if inputsizes:
+        cursor.setinputsizes(**inputsizes)
+    return cursor
+
+def set_statement_cache_size(conn_or_pool, size=STMT_CACHE_SIZE):
+    """Size the client-side statement cache of a cx_Oracle connection or session pool"""
+    target = untraced(conn_or_pool)
+    if hasattr(target, 'stmtcachesize'):
+        target.stmtcachesize = size
+
+class StatementCache:
+    """One long-lived cursor per SQL statement on one connection
+
+    Re-executing the same cursor skips the parse and reuses its bind and fetch
+    buffers. The cursors belong to the connection, so only use this for a
+    connection that is held for the store's lifetime and used by one thread
+    at a time; a pooled connection is a new object on every acquire.
+    """
+    def __init__(self, conn, stmtcachesize=STMT_CACHE_SIZE):
+        self.conn = conn
+        self.cursors = {}
+        self.opened = 0
+        # Applied on first use, so a connection still being opened is not waited on here
+        self.stmtcachesize = stmtcachesize
+
+    def cursor(self, sql, arraysize=None, prefetchrows=None, inputsizes=None):
+        """The cursor for `sql`, opened and sized on first use"""
+        cursor = self.cursors.get(sql)
+        if cursor is None:
+            if not self.opened:
+                set_statement_cache_size(self.conn, self.stmtcachesize)
+            cursor = configure_cursor(self.conn.cursor(), arraysize, prefetchrows)
+            self.cursors[sql] = cursor
+            self.opened += 1
+        if inputsizes:
+            # cx_Oracle applies input sizes to the next execute only
+            configure_cursor(cursor, inputsizes=inputsizes)
+        return cursor
+
+    def close(self):
+        for cursor in self.cursors.values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self.cursors.clear()
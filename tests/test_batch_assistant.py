@@ -0,0 +1,27 @@
+import io
+import json
+
+from batch_assistant import run_batch
+
+def good_conversation(name):
+    return ["create location", f"name {name}, zone A, aisle 01, type bay", "yes"]
+
+def run_lines(lines):
+    output = io.StringIO()
+    outcomes = run_batch(io.StringIO(''.join(line + '\n' for line in lines)), output, 1, 'auto', 'memory')
+    return outcomes, [json.loads(line) for line in output.getvalue().splitlines()]
+
+def test_bad_lines_are_reported_without_losing_the_rest():
+    bad = ['"hello"', '42', 'null', '{"utterances": 5}', '{"id": "x"}', '["hi", 3]',
+           '{"utterances": [null]}', 'not json']
+    lines = ([json.dumps(good_conversation('Dock 1'))] + bad
+             + [json.dumps({'id': 'last', 'utterances': good_conversation('Dock 2')})])
+    outcomes, results = run_lines(lines)
+
+    assert [result['line'] for result in results] == list(range(1, len(lines) + 1))
+    assert results[0]['outcome'] == 'created'
+    assert results[-1]['outcome'] == 'created' and results[-1]['id'] == 'last'
+    for result in results[1:-1]:
+        assert result['outcome'] == 'error'
+        assert result['error'].startswith("Bad input line")
+    assert outcomes == {'created': 2, 'error': len(bad)}
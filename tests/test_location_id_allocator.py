@@ -0,0 +1,28 @@
+from location_id_allocator import LocationIdAllocator
+
+class CountingAllocator(LocationIdAllocator):
+    """The lease logic with the LOC_ID_COUNTER round trip replaced by a local counter"""
+    def __init__(self, block_size):
+        super().__init__(None, block_size)
+        self.last_number = 0
+
+    def reserve_block(self, zone, aisle, count):
+        self.round_trips += 1
+        self.last_number += count
+        return self.last_number - count + 1
+
+def test_released_ids_are_allocated_again_first():
+    allocator = CountingAllocator(block_size=1)
+    first, second = allocator.allocate('A', '01'), allocator.allocate('A', '01')
+    assert (first, second) == ('A01001', 'A01002')
+    allocator.release('A', '01', second)
+    allocator.release('A', '01', first)
+    assert [allocator.allocate('A', '01') for _ in range(3)] == ['A01001', 'A01002', 'A01003']
+    # Reused IDs need no counter round trip
+    assert allocator.round_trips == 3
+
+def test_released_ids_stay_in_their_aisle():
+    allocator = CountingAllocator(block_size=5)
+    allocator.release('A', '01', allocator.allocate('A', '01'))
+    assert allocator.allocate('B', '02') == 'B02006'
+    assert allocator.allocate('A', '01') == 'A01001'
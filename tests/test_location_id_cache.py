@@ -0,0 +1,46 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from location_id_cache import CachedLocationStore
+from location_store import MemoryLocationStore, SQLiteLocationStore
+
+def location(location_id, created):
+    return {'LOCATION_ID': location_id, 'LOCATION_NAME': f"Bay {location_id}", 'SITE_CODE': 'WH1',
+            'LOCATION_TYPE': 'Bay', 'CREATED_BY': 'test', 'CREATED_DATE': created}
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    return MemoryLocationStore() if request.param == 'memory' else SQLiteLocationStore(str(tmp_path / 'loc.db'))
+
+def test_warm_streams_every_id(store):
+    now = datetime(2026, 1, 1)
+    # More IDs than the first sizing guess, so the warm has to rescan once
+    store.insert_locations([location(f"A01{number:04d}", now - timedelta(minutes=number)) for number in range(3000)])
+    cached = CachedLocationStore(store)
+    assert all(cached.check_duplicate(f"A01{number:04d}") for number in range(3000))
+    assert not cached.check_duplicate('B01001')
+    assert cached.id_cache.high_water == now
+    assert cached.id_cache.stats()['rebuilds'] == 1
+
+def test_old_created_date_is_picked_up_by_the_rebuild(store):
+    now = datetime(2026, 1, 1)
+    store.insert_location(location('A01001', now))
+    cached = CachedLocationStore(store, refresh_interval=0, rebuild_interval=3600)
+    assert not cached.check_duplicate('A01002')
+
+    # Another writer commits a row dated before the high-water mark (e.g. a CSV import)
+    store.insert_location(location('A01002', now - timedelta(days=30)))
+    cached.id_cache.last_rebuild -= 3600
+    assert cached.check_duplicate('A01002')
+
+def test_concurrent_lookups_warm_once(store):
+    store.insert_location(location('A01001', datetime(2026, 1, 1)))
+    cached = CachedLocationStore(store)
+    threads = [threading.Thread(target=cached.check_duplicate, args=('A01001',)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cached.id_cache.stats()['rebuilds'] == 1
@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+
+from location_store import MemoryLocationStore, SQLiteLocationStore, open_store
+from site_shards import ShardedLocationStore
+
+def oracle_store():
+    if not os.environ.get('ORACLE_DSN'):
+        pytest.skip("ORACLE_DSN is not set")
+    import cx_Oracle
+    conn = cx_Oracle.connect(os.environ['ORACLE_USER'], os.environ['ORACLE_PASSWORD'], os.environ['ORACLE_DSN'])
+    return open_store('oracle', conn)
+
+def sites_store(tmp_path):
+    config = tmp_path / 'sites.json'
+    config.write_text(json.dumps({'sites': {'WH1': {'store': 'memory'}, 'WH9': {'store': 'sqlite'}}}))
+    return ShardedLocationStore.from_config(str(config))
+
+STORES = {
+    'memory': lambda tmp_path: MemoryLocationStore(),
+    'sqlite': lambda tmp_path: SQLiteLocationStore(str(tmp_path / 'loc.db')),
+    'sites': sites_store,
+    'oracle': lambda tmp_path: oracle_store()
+}
+
+# Zone I is routed to WH9, and the Oracle rows are removed afterwards
+ZONE, AISLE = 'I', '99'
+PREFIX = f"{ZONE}{AISLE}"
+
+@pytest.fixture(params=list(STORES))
+def store(request, tmp_path):
+    store = STORES[request.param](tmp_path)
+    yield store
+    if request.param == 'oracle':
+        with store.conn.cursor() as cursor:
+            cursor.execute("DELETE FROM LOC WHERE LOCATION_ID LIKE :pattern", pattern=f"{PREFIX}%")
+        store.conn.commit()
+    store.close()
+
+def location(location_id, name):
+    return {'LOCATION_ID': location_id, 'LOCATION_NAME': name, 'SITE_CODE': 'WH9',
+            'LOCATION_TYPE': 'Bay', 'CREATED_BY': 'test', 'CREATED_DATE': None}
+
+def test_numbers_continue_past_999(store):
+    store.insert_location(location(f"{PREFIX}998", 'Bay 998'))
+    store.insert_location(location(f"{PREFIX}999", 'Bay 999'))
+    assert store.get_next_location_id(ZONE, AISLE) == f"{PREFIX}1000"
+
+    created = store.create_location(location(f"{PREFIX}1000", 'Bay 1000'), ZONE, AISLE)
+    assert created['LOCATION_ID'] == f"{PREFIX}1000"
+    # "999" sorts after "1000" as text; the next number must still be 1001
+    assert store.get_next_location_id(ZONE, AISLE) == f"{PREFIX}1001"
+
+def test_taken_id_falls_back_past_999(store):
+    store.insert_location(location(f"{PREFIX}999", 'Bay 999'))
+    store.insert_location(location(f"{PREFIX}1000", 'Bay 1000'))
+    # Proposed ID already taken: the fallback moves to the next free number
+    created = store.create_location(location(f"{PREFIX}999", 'Bay 1001'), ZONE, AISLE)
+    assert created['LOCATION_ID'] == f"{PREFIX}1001"
+    assert store.check_duplicate(f"{PREFIX}1001")
+    assert not store.check_duplicate(f"{PREFIX}100")
@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+
+from sql_trace import SqlTracer, TracingConnection
+
+@pytest.fixture
+def traced():
+    tracer = SqlTracer()
+    conn = TracingConnection(sqlite3.connect(':memory:'), tracer)
+    conn.execute("CREATE TABLE T (N INTEGER)")
+    conn.cursor().executemany("INSERT INTO T VALUES (?)", [(n,) for n in range(500)])
+    yield conn, tracer
+    conn.close()
+
+def select_summary(tracer):
+    return next(summary for summary in tracer.summaries() if summary['sql'].startswith('SELECT'))
+
+@pytest.mark.parametrize('read', [list, lambda cursor: iter(cursor.fetchone, None), lambda cursor: cursor.fetchall()])
+def test_rows_within_one_array_are_one_round_trip(traced, read):
+    conn, tracer = traced
+    cursor = conn.cursor()
+    cursor.arraysize = 1000
+    rows = list(read(cursor.execute("SELECT N FROM T")))
+    cursor.close()
+    assert len(rows) == 500
+    assert select_summary(tracer)['rows'] == 500
+    assert select_summary(tracer)['round_trips'] == 1
+
+def test_iteration_counts_one_round_trip_per_array(traced):
+    conn, tracer = traced
+    cursor = conn.cursor()
+    cursor.arraysize = 100
+    assert sum(1 for _ in cursor.execute("SELECT N FROM T")) == 500
+    cursor.close()
+    assert select_summary(tracer)['round_trips'] == 5
+
+def test_fetchmany_counts_each_call(traced):
+    conn, tracer = traced
+    cursor = conn.cursor()
+    cursor.arraysize = 100
+    cursor.execute("SELECT N FROM T")
+    while cursor.fetchmany():
+        pass
+    cursor.close()
+    # Five full arrays, then the empty fetch that finds the end
+    assert select_summary(tracer)['round_trips'] == 6
@@ -0,0 +1,96 @@
+import json
+import time
+from datetime import datetime
+
+from location_store import MemoryLocationStore
+from write_behind import WriteBehindQueue
+
+def location(location_id, name):
+    return {'LOCATION_ID': location_id, 'LOCATION_NAME': name, 'SITE_CODE': 'WH1',
+            'LOCATION_TYPE': 'Bay', 'CREATED_BY': 'test', 'CREATED_DATE': datetime.now()}
+
+def test_queued_locations_are_rechecked_when_committed(tmp_path):
+    store = MemoryLocationStore()
+    # Written by another assistant after both tickets proposed A01001
+    store.insert_location(location('A01001', 'Bay 1'))
+    insert_queue = WriteBehindQueue(store, str(tmp_path / 'queue.jsonl'))
+    moved = insert_queue.submit(location('A01001', 'Bay 2'), 'A', '01')
+    duplicate = insert_queue.submit(location('A01001', ' bay  1 '), 'A', '01')
+    insert_queue.close()
+
+    assert insert_queue.status(moved) == {'status': 'done', 'location_id': 'A01002'}
+    assert store.fetch_inserted_record('A01002')['LOCATION_NAME'] == 'Bay 2'
+    assert insert_queue.status(duplicate)['status'] == 'failed'
+    assert 'already exists' in insert_queue.status(duplicate)['error']
+    assert not insert_queue.is_pending('A01001')
+
+def test_locations_without_zone_aisle_keep_their_id(tmp_path):
+    store = MemoryLocationStore()
+    store.insert_location(location('101', 'Dock 1'))
+    insert_queue = WriteBehindQueue(store, str(tmp_path / 'queue.jsonl'))
+    taken = insert_queue.submit(location('101', 'Dock 2'))
+    free = insert_queue.submit(location('102', 'Dock 3'))
+    insert_queue.close()
+
+    assert insert_queue.status(taken)['status'] == 'failed'
+    assert insert_queue.status(free) == {'status': 'done'}
+
+class CountingStore(MemoryLocationStore):
+    """Counts create_locations() calls and fails the first `outages` lookups of a replayed row"""
+    def __init__(self, outages=0):
+        super().__init__()
+        self.create_calls = 0
+        self.outages = outages
+
+    def create_locations(self, entries):
+        self.create_calls += 1
+        return super().create_locations(entries)
+
+    def fetch_inserted_record(self, location_id):
+        if self.outages:
+            self.outages -= 1
+            raise ConnectionError("database unreachable")
+        return super().fetch_inserted_record(location_id)
+
+def journal_submit(path, ticket, row, zone=None, aisle=None):
+    record = {'op': 'submit', 'ticket': ticket, 'location': dict(row, CREATED_DATE=row['CREATED_DATE'].isoformat())}
+    if zone:
+        record.update(zone=zone, aisle=aisle)
+    with open(path, 'a', encoding='utf-8') as journal_file:
+        journal_file.write(json.dumps(record) + '\n')
+
+def test_queued_batch_is_created_in_one_call(tmp_path):
+    store = CountingStore()
+    journal = str(tmp_path / 'queue.jsonl')
+    # Replayed entries are all queued before the writer starts, so they form one batch
+    tickets = [f"ticket{n}" for n in range(3)]
+    for n, ticket in enumerate(tickets):
+        journal_submit(journal, ticket, location('A01001', f"Bay {n}"), 'A', '01')
+    insert_queue = WriteBehindQueue(store, journal)
+    insert_queue.close()
+    assert [insert_queue.status(ticket)['location_id'] for ticket in tickets] == ['A01001', 'A01002', 'A01003']
+    assert store.create_calls == 1
+
+def test_replayed_location_committed_under_a_moved_id_is_done(tmp_path):
+    store = MemoryLocationStore()
+    store.insert_location(location('A01001', 'Bay 1'))
+    # Committed as A01002 just before the crash; the journal has the provisional A01001
+    store.insert_location(location('A01002', 'Bay 2'))
+    journal = str(tmp_path / 'queue.jsonl')
+    journal_submit(journal, 'moved', location('A01001', 'Bay 2'), 'A', '01')
+    insert_queue = WriteBehindQueue(store, journal)
+    insert_queue.close()
+    assert insert_queue.status('moved') == {'status': 'done', 'location_id': 'A01002'}
+
+def test_replay_check_outage_is_retried(tmp_path):
+    store = CountingStore(outages=1)
+    store.insert_location(location('101', 'Dock 1'))
+    journal = str(tmp_path / 'queue.jsonl')
+    journal_submit(journal, 'committed', location('101', 'Dock 1'))
+    insert_queue = WriteBehindQueue(store, journal, retry_delay=0)
+    # The failed lookup must not kill the writer: the entry is retried and completes
+    deadline = time.monotonic() + 5
+    while insert_queue.status('committed')['status'] == 'queued' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    insert_queue.close()
+    assert insert_queue.status('committed') == {'status': 'done'}
@@ -0,0 +1,422 @@
+import re
+import threading
+from collections import OrderedDict
+
+# Keyword -> LOCATION_TYPE tables. Dict order is the match priority: the first
+# keyword found anywhere in the utterance wins, as in the original regex chain.
+BASIC_TYPE_KEYWORDS = {
+    'warehouse': 'Warehouse',
+    'storage': 'Storage',
+    'shelf': 'Shelf',
+    'rack': 'Rack',
+    'zone': 'Zone',
+    'area': 'Area',
+    'section': 'Section',
+    'room': 'Room',
+    'floor': 'Floor'
+}
+
+AUTO_TYPE_KEYWORDS = dict(BASIC_TYPE_KEYWORDS, bay='Bay', slot='Slot')
+
+# Field label that introduces each extracted value
+FIELD_LABELS = {
+    'LOCATION_ID': 'location',
+    'LOCATION_NAME': 'name',
+    'SITE_CODE': 'site',
+    'ZONE': 'zone',
+    'AISLE': 'aisle'
+}
+
+# Anchored building blocks. Each one is a single greedy run, so matching is
+# linear in the characters it consumes and never backtracks across runs.
+_SPACES = re.compile(r'\s*')
+_DIGITS = re.compile(r'\d+')
+_AISLE_DIGITS = re.compile(r'\d{1,2}')
+_SITE_CHARS = re.compile(r'[a-zA-Z0-9]+')
+_WORDS = re.compile(r'\w+(?:\s+\w+)*')
+_QUOTE = re.compile(r'["\']')
+_ASCII_LETTERS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+def _skip_separator(text, pos):
+    """Skip the `\\s*[:\\-]?\\s*` that may follow a field label"""
+    pos = _SPACES.match(text, pos).end()
+    if pos < len(text) and text[pos] in ':-':
+        pos = _SPACES.match(text, pos + 1).end()
+    return pos
+
+def _match_location_id(text, pos):
+    """`location\\s*(?:id|#)?\\s*[:\\-]?\\s*(\\d+)` starting after the label"""
+    pos = _SPACES.match(text, pos).end()
+    if text.startswith('id', pos):
+        pos += 2
+    elif text.startswith('#', pos):
+        pos += 1
+    match = _DIGITS.match(text, _skip_separator(text, pos))
+    return match.span() if match else None
+
+def _match_site_code(text, pos):
+    """`site\\s*(?:code)?\\s*[:\\-]?\\s*([a-zA-Z0-9]+)` starting after the label"""
+    pos = _SPACES.match(text, pos).end()
+    if text.startswith('code', pos):
+        match = _SITE_CHARS.match(text, _skip_separator(text, pos + 4))
+        if match:
+            return match.span()
+    # Without a value after "code", the word "code" itself is the value
+    match = _SITE_CHARS.match(text, _skip_separator(text, pos))
+    return match.span() if match else None
+
+def _match_zone(text, pos):
+    """`zone\\s*[:\\-]?\\s*([a-zA-Z])` starting after the label"""
+    pos = _skip_separator(text, pos)
+    return (pos, pos + 1) if pos < len(text) and text[pos] in _ASCII_LETTERS else None
+
+def _match_aisle(text, pos):
+    """`aisle\\s*[:\\-]?\\s*(\\d{1,2})` starting after the label"""
+    match = _AISLE_DIGITS.match(text, _skip_separator(text, pos))
+    return match.span() if match else None
+
+# Each matcher returns the (start, end) span of the value, or None
+FIELD_MATCHERS = {
+    'LOCATION_ID': _match_location_id,
+    'SITE_CODE': _match_site_code,
+    'ZONE': _match_zone,
+    'AISLE': _match_aisle
+}
+
+class UtteranceParser:
+    """Extract location fields from an utterance in a single scan
+
+    All field labels and type keywords are compiled into one alternation that
+    is run once over the lowercased utterance. Each label occurrence is then
+    resolved with anchored, non-backtracking matchers, so parsing is linear in
+    the length of the input. Results are identical to the per-field regex
+    chain the assistants used before.
+    """
+    def __init__(self, fields, type_keywords):
+        self.fields = list(fields)
+        self.type_keywords = dict(type_keywords)
+        self.labels = {FIELD_LABELS[field]: field for field in self.fields if field in FIELD_LABELS}
+
+        keywords = set(self.labels) | set(self.type_keywords)
+        for keyword in keywords:
+            if any(other != keyword and other.startswith(keyword) for other in keywords):
+                raise ValueError(f"Keyword '{keyword}' is a prefix of another keyword")
+        # A plain alternation lets the regex engine skip ahead on the keywords'
+        # first characters; scan() restarts one character after each hit so
+        # overlapping keywords ("locationame") are still all reported.
+        self.keyword_pattern = re.compile('|'.join(re.escape(keyword) for keyword in sorted(keywords)))
+
+    def scan(self, text, spans=None):
+        """Return raw (lowercase) field values found in already-lowercased text
+
+        When a `spans` dict is given, each value's (start, end) position in
+        `text` is recorded in it (LOCATION_TYPE has none: it is a keyword).
+        """
+        found = {}
+        seen_types = set()
+        quoted_name = None
+        plain_name_pos = None
+        quotes_exhausted = _QUOTE.search(text) is None
+
+        search = self.keyword_pattern.search
+        match = search(text)
+        while match is not None:
+            keyword = match.group()
+            end = match.end()
+            match = search(text, end - len(keyword) + 1)
+            if keyword in self.type_keywords:
+                seen_types.add(keyword)
+            field = self.labels.get(keyword)
+            if field is None:
+                continue
+
+            if field == 'LOCATION_NAME':
+                if quoted_name is not None or (quotes_exhausted and plain_name_pos is not None):
+                    continue
+                pos = _skip_separator(text, end)
+                if pos >= len(text):
+                    continue
+                if text[pos] in '"\'' and not quotes_exhausted:
+                    closing = _QUOTE.search(text, pos + 1)
+                    if closing is None:
+                        quotes_exhausted = True
+                    elif closing.start() > pos + 1:
+                        quoted_name = (pos + 1, closing.start())
+                        continue
+                if plain_name_pos is None and _WORDS.match(text, pos):
+                    plain_name_pos = pos
+            elif field not in found:
+                span = FIELD_MATCHERS[field](text, end)
+                if span is not None:
+                    found[field] = text[span[0]:span[1]]
+                    if spans is not None:
+                        spans[field] = span
+
+        name_span = quoted_name
+        if name_span is None and plain_name_pos is not None:
+            name_span = _WORDS.match(text, plain_name_pos).span()
+        if name_span is not None:
+            found['LOCATION_NAME'] = text[name_span[0]:name_span[1]]
+            if spans is not None:
+                spans['LOCATION_NAME'] = name_span
+
+        for keyword in self.type_keywords:
+            if keyword in seen_types:
+                found['LOCATION_TYPE'] = keyword
+                break
+        return found
+
+    def parse(self, user_input):
+        """Return the location fields mentioned in the utterance, normalised for LOC"""
+        return self.normalize(self.scan(user_input.lower()))
+
+    def normalize(self, raw):
+        """Raw values from scan() as LOC field values"""
+        fields = {}
+        for field in self.fields:
+            value = raw.get(field)
+            if value is None:
+                continue
+            if field == 'LOCATION_NAME':
+                value = value.title()
+            elif field in ('SITE_CODE', 'ZONE'):
+                value = value.upper()
+            elif field == 'AISLE':
+                value = value.zfill(2)  # Pad with leading zero
+            elif field == 'LOCATION_TYPE':
+                value = self.type_keywords[value]
+            fields[field] = value
+        return fields
+
+# What each field's matcher accepts as a value, as a template slot
+_SLOT_PATTERNS = {
+    'LOCATION_ID': r'\d+',
+    'AISLE': r'\d{1,2}',
+    'ZONE': r'[a-zA-Z]',
+    'SITE_CODE': r'[a-zA-Z0-9]+',
+    'QUOTED_NAME': r'[^"\']+',
+    'LOCATION_NAME': _WORDS.pattern
+}
+# A single character that could extend each slot's value
+_SLOT_CHARS = {
+    'LOCATION_ID': re.compile(r'\d'),
+    'AISLE': re.compile(r'\d'),
+    'ZONE': re.compile(r'[a-zA-Z]'),
+    'SITE_CODE': re.compile(r'[a-zA-Z0-9]'),
+    'QUOTED_NAME': re.compile(r'[^"\']'),
+    'LOCATION_NAME': re.compile(r'\w')
+}
+# Slots whose letters could form a keyword together with the text around them
+_LETTER_SLOTS = frozenset(('ZONE', 'SITE_CODE', 'QUOTED_NAME', 'LOCATION_NAME'))
+
+class UtteranceTemplate:
+    """A parsed utterance with its field values cut out as slots
+
+    The fixed text between the slots is matched literally, so another
+    utterance that fits the template has the same labels and type keywords in
+    the same places, and scan() would take its values from the same slots.
+    build() refuses utterances where that does not hold (a value touching a
+    keyword or a character that would extend it), and fill() refuses values
+    that contain a keyword; both leave those utterances to the full scan.
+    """
+    __slots__ = ('pattern', 'prefix', 'slots', 'raw')
+
+    def __init__(self, pattern, prefix, slots, raw):
+        self.pattern = pattern
+        self.prefix = prefix
+        self.slots = slots
+        self.raw = raw
+
+    @classmethod
+    def build(cls, parser, text, raw, spans):
+        """Template for `text` from its scan() result and spans, or None"""
+        if not spans:
+            return None
+        keyword_spans = []
+        match = parser.keyword_pattern.search(text)
+        while match is not None:
+            keyword_spans.append(match.span())
+            match = parser.keyword_pattern.search(text, match.start() + 1)
+
+        pieces = []
+        slots = []
+        last = 0
+        for field, (start, end) in sorted(spans.items(), key=lambda item: item[1]):
+            if start <= last and slots:
+                return None
+            if any(start < keyword_end and keyword_start < end for keyword_start, keyword_end in keyword_spans):
+                return None
+            slot = field
+            if field == 'LOCATION_NAME' and text[start - 1:start] in ('"', "'"):
+                slot = 'QUOTED_NAME'
+            for neighbour in (text[start - 1:start] if start else '', text[end:end + 1]):
+                if neighbour and (_SLOT_CHARS[slot].match(neighbour)
+                                  or (slot in _LETTER_SLOTS and neighbour in _ASCII_LETTERS)):
+                    return None
+            pieces.append(re.escape(text[last:start]))
+            pieces.append(f"({_SLOT_PATTERNS[slot]})")
+            slots.append(slot)
+            last = end
+        pieces.append(re.escape(text[last:]))
+        prefix = text[:min(start for start, _ in spans.values())]
+        return cls(re.compile(''.join(pieces)), prefix, tuple(slots), raw)
+
+    def fill(self, parser, text):
+        """scan() result for `text` if it fits the template, else None"""
+        match = self.pattern.fullmatch(text)
+        if match is None:
+            return None
+        raw = dict(self.raw)
+        for slot, value in zip(self.slots, match.groups()):
+            if slot in _LETTER_SLOTS and parser.keyword_pattern.search(value):
+                return None
+            if slot == 'SITE_CODE' and value.startswith('code'):
+                # "site code" followed by a value would be read differently
+                return None
+            raw['LOCATION_NAME' if slot == 'QUOTED_NAME' else slot] = value
+        return raw
+
+class ParseCache:
+    """Memoized UtteranceParser.parse() for repeated and templated utterances
+
+    Scanners and macros send the same utterances, or the same skeleton with
+    different values, over and over. parse() only depends on the lowercased
+    utterance, so an exact repeat is answered from a bounded LRU of results.
+    Otherwise the utterance is tried against the UtteranceTemplates (an LRU
+    too) whose fixed text before the first slot it starts with, and a fitting
+    template only re-reads the values. Either way the result equals the
+    uncached parse; anything a template cannot vouch for goes through the
+    full scan.
+    """
+    def __init__(self, parser, max_utterances=10000, max_templates=1000, max_per_prefix=16, max_length=500):
+        self.parser = parser
+        self.max_utterances = max_utterances
+        self.max_templates = max_templates
+        self.max_per_prefix = max_per_prefix
+        # Longer utterances are free text rather than macros; caching them would only cost memory
+        self.max_length = max_length
+        self.utterances = OrderedDict()
+        # Template pattern -> template in LRU order, and the same templates by prefix, newest first
+        self.templates = OrderedDict()
+        self.prefixes = {}
+        self.prefix_lengths = {}
+        self.lock = threading.Lock()
+        self.exact_hits = 0
+        self.template_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evicted_utterances = 0
+        self.evicted_templates = 0
+
+    def parse(self, user_input):
+        """Same as UtteranceParser.parse(user_input)"""
+        text = user_input.lower()
+        if len(text) > self.max_length:
+            with self.lock:
+                self.bypassed += 1
+            return self.parser.normalize(self.parser.scan(text))
+        with self.lock:
+            fields = self.utterances.get(text)
+            if fields is not None:
+                self.utterances.move_to_end(text)
+                self.exact_hits += 1
+                return dict(fields)
+            raw = self._fill_from_template(text)
+            if raw is not None:
+                self.template_hits += 1
+
+        missed = raw is None
+        template = None
+        if missed:
+            spans = {}
+            raw = self.parser.scan(text, spans)
+            template = UtteranceTemplate.build(self.parser, text, raw, spans)
+        fields = self.parser.normalize(raw)
+
+        with self.lock:
+            if template is not None:
+                self._add_template(template)
+            if missed:
+                self.misses += 1
+            self.utterances[text] = fields
+            if len(self.utterances) > self.max_utterances:
+                self.utterances.popitem(last=False)
+                self.evicted_utterances += 1
+        return dict(fields)
+
+    def _fill_from_template(self, text):
+        for length in self.prefix_lengths:
+            for template in self.prefixes.get(text[:length], ()):
+                raw = template.fill(self.parser, text)
+                if raw is not None:
+                    self.templates.move_to_end(template.pattern.pattern)
+                    return raw
+        return None
+
+    def _add_template(self, template):
+        key = template.pattern.pattern
+        if key in self.templates:
+            self.templates.move_to_end(key)
+            return
+        self.templates[key] = template
+        bucket = self.prefixes.setdefault(template.prefix, [])
+        bucket.insert(0, template)
+        length = len(template.prefix)
+        self.prefix_lengths[length] = self.prefix_lengths.get(length, 0) + 1
+        if len(bucket) > self.max_per_prefix:
+            self._drop_template(bucket[-1])
+        if len(self.templates) > self.max_templates:
+            self._drop_template(next(iter(self.templates.values())))
+
+    def _drop_template(self, template):
+        del self.templates[template.pattern.pattern]
+        bucket = self.prefixes[template.prefix]
+        bucket.remove(template)
+        if not bucket:
+            del self.prefixes[template.prefix]
+        length = len(template.prefix)
+        self.prefix_lengths[length] -= 1
+        if not self.prefix_lengths[length]:
+            del self.prefix_lengths[length]
+        self.evicted_templates += 1
+
+    def clear(self):
+        with self.lock:
+            self.utterances.clear()
+            self.templates.clear()
+            self.prefixes.clear()
+            self.prefix_lengths.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.exact_hits + self.template_hits + self.misses + self.bypassed
+            return {
+                'lookups': lookups,
+                'exact_hits': self.exact_hits,
+                'template_hits': self.template_hits,
+                'misses': self.misses,
+                'bypassed': self.bypassed,
+                'hit_rate': round((self.exact_hits + self.template_hits) / lookups, 4) if lookups else 0.0,
+                'utterances': len(self.utterances),
+                'templates': len(self.templates),
+                'evicted_utterances': self.evicted_utterances,
+                'evicted_templates': self.evicted_templates
+            }
+
+    def report(self):
+        """One line for the console assistants' --profile output"""
+        stats = self.stats()
+        return (f"Parse cache: {stats['lookups']:,} lookups, {stats['hit_rate']:.1%} hits "
+                f"({stats['exact_hits']:,} exact, {stats['template_hits']:,} template), "
+                f"{stats['utterances']:,} utterances and {stats['templates']:,} templates cached")
+
+# Parser for assistants where the operator supplies LOCATION_ID and SITE_CODE
+LOCATION_ID_PARSER = UtteranceParser(
+    ['LOCATION_ID', 'LOCATION_NAME', 'SITE_CODE', 'LOCATION_TYPE'], BASIC_TYPE_KEYWORDS)
+
+# Parser for the auto assistant, which derives LOCATION_ID and SITE_CODE from zone/aisle
+ZONE_AISLE_PARSER = UtteranceParser(
+    ['LOCATION_NAME', 'ZONE', 'AISLE', 'LOCATION_TYPE'], AUTO_TYPE_KEYWORDS)
+
+LOCATION_ID_PARSE_CACHE = ParseCache(LOCATION_ID_PARSER)
+ZONE_AISLE_PARSE_CACHE = ParseCache(ZONE_AISLE_PARSER)
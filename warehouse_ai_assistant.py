@@ -1,72 +1,60 @@
-import cx_Oracle
-import getpass
+import argparse
 from datetime import datetime
-import re
 import json
+from connection_prewarm import ConnectionPrewarm
+from location_id_cache import CachedLocationStore
+from location_name_index import TrigramNameIndex, find_query, format_matches
+from location_store import OracleLocationStore, open_store
+from metrics import METRICS, timed
+import sql_trace
+from utterance_parser import LOCATION_ID_PARSE_CACHE
+from write_behind import WriteBehindQueue
 
 class WarehouseAIAssistant:
-    def __init__(self):
+    def __init__(self, store=None, id_cache=False, write_behind=None):
         self.conn = None
+        self.prewarm = None
+        self.pending_connection = None
+        self.use_id_cache = id_cache
+        self.store = CachedLocationStore(store) if store is not None and id_cache else store
+        self.write_behind_journal = write_behind
+        # Offline stores are thread-safe, so the writer thread can share them
+        self.insert_queue = WriteBehindQueue(self.store, write_behind) if self.store is not None and write_behind else None
+        self.name_search = TrigramNameIndex(self.store) if self.store is not None else None
         self.current_location = {}
         self.conversation_state = "greeting"
         self.required_fields = ['LOCATION_ID', 'LOCATION_NAME', 'SITE_CODE', 'LOCATION_TYPE']
         
     def connect_database(self):
-        """Establish connection to Oracle database"""
+        """Start connecting to Oracle; the session finishes opening in the background"""
         try:
             print("🤖 AI Assistant: Hello! I'm your Warehouse Location Management Assistant.")
             print("Let me connect to the database first...")
             
-            username = input("Enter Oracle username: ")
-            password = getpass.getpass("Enter Oracle password: ")
-            dsn = input("Enter Oracle DSN (e.g., host:port/service): ")
+            self.prewarm = ConnectionPrewarm()
+            self.pending_connection, credentials = self.prewarm.prompt_and_connect()
             
-            self.conn = cx_Oracle.connect(username, password, dsn)
-            print("✅ Database connected successfully!")
+            self.conn = sql_trace.trace_connection(self.pending_connection)
+            self.store = OracleLocationStore(self.conn)
+            if self.use_id_cache:
+                self.store = CachedLocationStore(self.store)
+            self.name_search = TrigramNameIndex(self.store)
+            if self.write_behind_journal:
+                # The background writer gets its own connection
+                writer_store = OracleLocationStore(self.prewarm.connect(*credentials, phase='writer_connect'))
+                self.insert_queue = WriteBehindQueue(writer_store, self.write_behind_journal)
+            print("🔌 Connecting in the background; you can start right away.")
             return True
         except Exception as e:
             print(f"❌ Database connection failed: {e}")
             return False
     
+    @timed('extract')
     def extract_location_info(self, user_input):
         """Extract location information from natural language input"""
-        user_input = user_input.lower()
-        
-        # Extract LOCATION_ID (numbers)
-        location_id_match = re.search(r'location\s*(?:id|#)?\s*[:\-]?\s*(\d+)', user_input)
-        if location_id_match:
-            self.current_location['LOCATION_ID'] = location_id_match.group(1)
-        
-        # Extract LOCATION_NAME (quoted text or after "name")
-        name_match = re.search(r'name\s*[:\-]?\s*["\']([^"\']+)["\']', user_input)
-        if not name_match:
-            name_match = re.search(r'name\s*[:\-]?\s*(\w+(?:\s+\w+)*)', user_input)
-        if name_match:
-            self.current_location['LOCATION_NAME'] = name_match.group(1).title()
-        
-        # Extract SITE_CODE (alphanumeric codes)
-        site_match = re.search(r'site\s*(?:code)?\s*[:\-]?\s*([a-zA-Z0-9]+)', user_input)
-        if site_match:
-            self.current_location['SITE_CODE'] = site_match.group(1).upper()
-        
-        # Extract LOCATION_TYPE
-        type_keywords = {
-            'warehouse': 'Warehouse',
-            'storage': 'Storage',
-            'shelf': 'Shelf',
-            'rack': 'Rack',
-            'zone': 'Zone',
-            'area': 'Area',
-            'section': 'Section',
-            'room': 'Room',
-            'floor': 'Floor'
-        }
-        
-        for keyword, location_type in type_keywords.items():
-            if keyword in user_input:
-                self.current_location['LOCATION_TYPE'] = location_type
-                break
+        self.current_location.update(LOCATION_ID_PARSE_CACHE.parse(user_input))
     
+    @timed('validate_fields')
     def validate_fields(self):
         """Validate all required fields are present"""
         missing_fields = []
@@ -78,36 +66,66 @@ class WarehouseAIAssistant:
             return False, f"Missing required information: {', '.join(missing_fields)}"
         return True, "All fields validated successfully"
     
+    @timed('check_duplicate')
     def check_duplicate(self, location_id):
         """Check if LOCATION_ID already exists"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT 1 FROM LOC WHERE LOCATION_ID = :id", id=location_id)
-            exists = cursor.fetchone() is not None
-            cursor.close()
-            return exists
+            if self.insert_queue and self.insert_queue.is_pending(location_id):
+                return True
+            return self.store.check_duplicate(location_id)
         except Exception as e:
             print(f"❌ Error checking duplicates: {e}")
             return False
     
+    @timed('insert_location')
     def insert_location(self):
         """Insert new location into database"""
         try:
             self.current_location['CREATED_BY'] = 'AI_Assistant'
             self.current_location['CREATED_DATE'] = datetime.now()
             
-            cursor = self.conn.cursor()
-            sql = """
-                INSERT INTO LOC (LOCATION_ID, LOCATION_NAME, SITE_CODE, LOCATION_TYPE, CREATED_BY, CREATED_DATE)
-                VALUES (:LOCATION_ID, :LOCATION_NAME, :SITE_CODE, :LOCATION_TYPE, :CREATED_BY, :CREATED_DATE)
-            """
-            cursor.execute(sql, self.current_location)
-            self.conn.commit()
-            cursor.close()
+            if self.insert_queue:
+                ticket = self.insert_queue.submit(self.current_location)
+                self.name_search.add(self.current_location['LOCATION_ID'], self.current_location['LOCATION_NAME'])
+                return True, f"Location queued as ticket {ticket}; it will be committed in the background."
+            
+            self.store.insert_location(self.current_location)
+            self.name_search.add(self.current_location['LOCATION_ID'], self.current_location['LOCATION_NAME'])
             return True, "Location created successfully!"
         except Exception as e:
             return False, f"Database error: {e}"
     
+    def ticket_status(self, ticket):
+        """Describe a write-behind ticket for the 'status <ticket>' command"""
+        status = self.insert_queue.status(ticket)
+        if status is None:
+            return f"🤖 AI Assistant: I don't know ticket {ticket}."
+        if status['status'] == 'done':
+            return f"✅ Ticket {ticket}: the location has been committed to the database."
+        if status['status'] == 'failed':
+            return f"❌ Ticket {ticket}: the insert failed ({status['error']})."
+        return f"⏳ Ticket {ticket}: still queued."
+    
+    @timed('find_locations')
+    def find_locations(self, query):
+        """Answer 'find location <name>' from the trigram index, best matches first"""
+        matches = self.name_search.search(query)
+        if not matches:
+            return f"🤖 AI Assistant: No location names are similar to '{query}'."
+        lines = "\n".join(f"   • {line}" for line in format_matches(matches))
+        return f"🔍 Locations matching '{query}':\n{lines}"
+    
+    @timed('near_duplicates')
+    def near_duplicate_warning(self):
+        """Warn about similar existing names before the operator confirms"""
+        if not self.name_search:
+            return ""
+        matches = self.name_search.near_duplicates(self.current_location['LOCATION_NAME'])
+        if not matches:
+            return ""
+        lines = "".join(f"   • {line}\n" for line in format_matches(matches))
+        return f"⚠️ Similar location names already exist:\n{lines}"
+    
     def get_location_summary(self):
         """Generate a summary of the location details"""
         summary = "📋 Location Summary:\n"
@@ -118,15 +136,27 @@ class WarehouseAIAssistant:
     
     def process_user_input(self, user_input):
         """Process user input and provide appropriate response"""
+        with METRICS.timer(f"state.{self.conversation_state}"):
+            return self.handle_user_input(user_input)
+    
+    def handle_user_input(self, user_input):
+        """Advance the conversation by one utterance"""
         user_input = user_input.strip()
         
+        if self.insert_queue and user_input.lower().startswith('status '):
+            return self.ticket_status(user_input.split(None, 1)[1])
+        
+        query = find_query(user_input)
+        if query is not None and self.name_search:
+            return self.find_locations(query)
+        
         # Handle conversation flow
         if self.conversation_state == "greeting":
             if any(word in user_input.lower() for word in ['create', 'add', 'new', 'location']):
                 self.conversation_state = "collecting_info"
                 return "🤖 AI Assistant: Great! I'll help you create a new storage location. Please provide the location details. You can say something like:\n'Create location ID 101, name \"Main Storage Area\", site code WH1, type warehouse'"
             else:
-                return "🤖 AI Assistant: I can help you create new storage locations in the warehouse. Say 'create location' or 'add new location' to get started!"
+                return "🤖 AI Assistant: I can help you create new storage locations in the warehouse. Say 'create location' or 'add new location' to get started, or 'find location <name>' to look one up!"
         
         elif self.conversation_state == "collecting_info":
             # Extract information from user input
@@ -145,7 +175,8 @@ class WarehouseAIAssistant:
                 # Show summary and ask for approval
                 self.conversation_state = "approval"
                 summary = self.get_location_summary()
-                return f"{summary}\n🤖 AI Assistant: Does this look correct? Type 'yes' to create the location or 'no' to start over."
+                warning = self.near_duplicate_warning()
+                return f"{summary}\n{warning}🤖 AI Assistant: Does this look correct? Type 'yes' to create the location or 'no' to start over."
             else:
                 return f"🤖 AI Assistant: {message}\nPlease provide the missing information."
         
@@ -156,6 +187,8 @@ class WarehouseAIAssistant:
                 if success:
                     self.conversation_state = "greeting"
                     self.current_location = {}
+                    if self.insert_queue:
+                        return f"✅ {message}\n🤖 AI Assistant: Say 'status <ticket>' to check on it. Is there anything else I can help you with?"
                     return f"✅ {message}\n🤖 AI Assistant: The location has been added to the database. Is there anything else I can help you with?"
                 else:
                     self.conversation_state = "greeting"
@@ -171,13 +204,24 @@ class WarehouseAIAssistant:
         # Fallback
         return "🤖 AI Assistant: I didn't understand that. Say 'create location' to add a new storage location."
     
+    def connection_failed(self):
+        """Report a background connect that failed; nothing works without the session"""
+        if self.pending_connection is not None and self.pending_connection.failed:
+            print(f"❌ Database connection failed: {self.pending_connection.error}")
+            return True
+        return False
+    
     def run(self):
         """Main conversation loop"""
-        if not self.connect_database():
+        if self.store is None and not self.connect_database():
             return
+        if self.insert_queue and self.insert_queue.replayed:
+            print(f"🔁 Replaying {self.insert_queue.replayed} queued location(s) from {self.write_behind_journal}")
         
         print("\n🤖 AI Assistant: I'm ready to help you manage warehouse locations!")
         print("Type 'quit' to exit the assistant.\n")
+        if self.prewarm:
+            self.prewarm.mark_ready()
         
         while True:
             try:
@@ -187,7 +231,12 @@ class WarehouseAIAssistant:
                     print("🤖 AI Assistant: Goodbye! Have a great day!")
                     break
                 
+                if self.connection_failed():
+                    return
                 response = self.process_user_input(user_input)
+                # A reply produced while the session failed to open is misleading
+                if self.connection_failed():
+                    return
                 print(response + "\n")
                 
             except KeyboardInterrupt:
@@ -196,13 +245,43 @@ class WarehouseAIAssistant:
             except Exception as e:
                 print(f"❌ Error: {e}")
         
-        if self.conn:
-            self.conn.close()
+        if sql_trace.TRACER:
+            print("\n🔎 SQL trace (slowest first):")
+            print(sql_trace.trace_report(self.conn or getattr(self.store, 'conn', None)))
+        if self.insert_queue:
+            # Commit whatever is still queued before exiting
+            self.insert_queue.close()
+            if self.insert_queue.store is not self.store:
+                self.insert_queue.store.close()
+        if self.store:
+            self.store.close()
+        if self.prewarm:
+            print(self.prewarm.report())
 
 def main():
     """Main function to start the AI assistant"""
-    assistant = WarehouseAIAssistant()
+    parser = argparse.ArgumentParser(description="Warehouse AI Assistant")
+    parser.add_argument('--store', default='oracle',
+                        help="Storage backend: oracle (prompts for credentials), memory or sqlite:<path>")
+    parser.add_argument('--id-cache', action='store_true',
+                        help="Answer definite 'ID not present' from a process-local filter instead of the database")
+    parser.add_argument('--write-behind', metavar='JOURNAL',
+                        help="Confirm instantly with a ticket; a background writer commits in batches, "
+                             "journaling to JOURNAL and replaying it on restart")
+    parser.add_argument('--profile', action='store_true', help="Print a per-stage latency breakdown on exit")
+    parser.add_argument('--sql-trace', metavar='LOG',
+                        help="Trace every SQL statement to the JSONL query LOG and print a summary with plans on exit")
+    args = parser.parse_args()
+    if args.sql_trace:
+        sql_trace.enable_tracing(args.sql_trace)
+    
+    store = None if args.store == 'oracle' else open_store(args.store)
+    assistant = WarehouseAIAssistant(store=store, id_cache=args.id_cache, write_behind=args.write_behind)
     assistant.run()
+    if args.profile:
+        print("\n📊 Per-stage latency:")
+        print(METRICS.report())
+        print(LOCATION_ID_PARSE_CACHE.report())
 
 if __name__ == "__main__":
     main() 
@@ -1,36 +1,81 @@
-import cx_Oracle
-import getpass
+import argparse
 from datetime import datetime
 import re
 import json
+from batch_validation import VALID_LOCATION_TYPES, BatchValidator
+from connection_prewarm import ConnectionPrewarm
+from location_id_allocator import LocationIdAllocator, format_location_id
+from location_id_cache import CachedLocationStore
+from location_name_index import LocationNameIndex, TrigramNameIndex, find_query, format_matches
+from location_store import DuplicateLocationNameError, OracleLocationStore, open_store
+from metrics import METRICS, timed
+import sql_trace
+from occupancy_index import OccupancyIndex
+from site_shards import site_code_for_zone
+from utterance_parser import ZONE_AISLE_PARSE_CACHE
+from write_behind import WriteBehindQueue
 
 class WarehouseAIAssistant:
-    def __init__(self):
+    def __init__(self, use_id_counter=False, id_block_size=1, reuse_gaps=False, store=None, id_cache=False,
+                 write_behind=None):
         self.conn = None
+        self.prewarm = None
+        self.pending_connection = None
+        self.use_id_cache = id_cache
+        self.store = CachedLocationStore(store) if store is not None and id_cache else store
+        self.name_index = LocationNameIndex(self.store) if self.store is not None else None
+        self.name_search = TrigramNameIndex(self.store) if self.store is not None else None
+        self.write_behind_journal = write_behind
+        # Offline stores are thread-safe, so the writer thread can share them
+        self.insert_queue = WriteBehindQueue(self.store, write_behind) if self.store is not None and write_behind else None
+        self.use_id_counter = use_id_counter
+        self.id_block_size = id_block_size
+        self.id_allocator = None
+        self.reuse_gaps = reuse_gaps
+        self.occupancy_index = None
         self.current_location = {}
         self.conversation_state = "greeting"
         self.required_fields = ['LOCATION_NAME', 'ZONE', 'AISLE', 'LOCATION_TYPE']
         self.auto_generated_fields = ['LOCATION_ID', 'SITE_CODE']
         self.validation_errors = []
+        self.batch_validator = None
+        self.conversation_start_round_trips = 0
         
     def connect_database(self):
-        """Establish connection to Oracle database"""
+        """Start connecting to Oracle; the session finishes opening in the background
+        
+        The driver loads while the credentials are typed, and the first
+        utterance is parsed while the session authenticates.
+        """
         try:
             print("🤖 AI Assistant: Hello! I'm your Warehouse Location Management Assistant.")
             print("I can automatically generate location IDs based on zone and aisle information.")
             print("Let me connect to the database first...")
             
-            username = input("Enter Oracle username: ")
-            password = getpass.getpass("Enter Oracle password: ")
-            dsn = input("Enter Oracle DSN (e.g., host:port/service): ")
+            self.prewarm = ConnectionPrewarm()
+            self.pending_connection, credentials = self.prewarm.prompt_and_connect()
             
-            self.conn = cx_Oracle.connect(username, password, dsn)
-            print("✅ Database connected successfully!")
+            self.conn = sql_trace.trace_connection(self.pending_connection)
+            self.store = OracleLocationStore(self.conn)
+            if self.use_id_cache:
+                self.store = CachedLocationStore(self.store)
+            self.name_index = LocationNameIndex(self.store)
+            self.name_search = TrigramNameIndex(self.store)
+            if self.write_behind_journal:
+                # The background writer gets its own connection
+                writer_store = OracleLocationStore(self.prewarm.connect(*credentials, phase='writer_connect'))
+                self.insert_queue = WriteBehindQueue(writer_store, self.write_behind_journal)
+            if self.use_id_counter:
+                self.id_allocator = LocationIdAllocator(self.conn, self.id_block_size)
+            if self.reuse_gaps:
+                self.occupancy_index = OccupancyIndex(self.conn)
+            print("🔌 Connecting in the background; you can start right away.")
             return True
         except Exception as e:
             print(f"❌ Database connection failed: {e}")
             return False
     
+    @timed('validate_zone')
     def validate_zone(self, zone):
         """Validate zone format and range"""
         if not zone:
@@ -45,6 +90,7 @@ class WarehouseAIAssistant:
         
         return True, "Zone is valid"
     
+    @timed('validate_aisle')
     def validate_aisle(self, aisle):
         """Validate aisle format and range"""
         if not aisle:
@@ -59,6 +105,7 @@ class WarehouseAIAssistant:
         
         return True, "Aisle is valid"
     
+    @timed('validate_location_name')
     def validate_location_name(self, name):
         """Validate location name"""
         if not name:
@@ -76,22 +123,18 @@ class WarehouseAIAssistant:
         
         return True, "Location name is valid"
     
+    @timed('validate_location_type')
     def validate_location_type(self, location_type):
         """Validate location type"""
         if not location_type:
             return False, "Location type is required"
         
-        valid_types = [
-            'Warehouse', 'Storage', 'Shelf', 'Rack', 'Zone', 
-            'Area', 'Section', 'Room', 'Floor', 'Bay', 'Slot'
-        ]
-        
-        if location_type not in valid_types:
-            return False, f"Location type must be one of: {', '.join(valid_types)}"
+        if location_type not in VALID_LOCATION_TYPES:
+            return False, f"Location type must be one of: {', '.join(VALID_LOCATION_TYPES)}"
         
         return True, "Location type is valid"
     
-    def comprehensive_validation(self):
+    def comprehensive_validation(self, check_names=True):
         """Perform comprehensive validation of all fields"""
         self.validation_errors = []
         is_valid = True
@@ -116,7 +159,7 @@ class WarehouseAIAssistant:
                 is_valid = False
         
         # Additional business logic validations
-        if is_valid:
+        if is_valid and check_names:
             # Check for duplicate location names in the same zone/aisle
             duplicate_check = self.check_duplicate_location_name()
             if duplicate_check:
@@ -125,23 +168,23 @@ class WarehouseAIAssistant:
         
         return is_valid, self.validation_errors
     
+    def validate_batch(self, locations, check_names=True):
+        """comprehensive_validation for many locations at once; returns a BatchValidationResult
+        
+        Same rules and messages, evaluated column-wise (batch_validation.py).
+        """
+        name_exists = self.name_index.contains if check_names and self.name_index else None
+        if self.batch_validator is None or self.batch_validator.name_exists != name_exists:
+            self.batch_validator = BatchValidator(name_exists)
+        return self.batch_validator.validate(locations)
+    
+    @timed('check_duplicate_location_name')
     def check_duplicate_location_name(self):
         """Check if location name already exists in the same zone/aisle"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT LOCATION_NAME 
-                FROM LOC 
-                WHERE LOCATION_NAME = :name 
-                AND LOCATION_ID LIKE :pattern
-            """, {
-                'name': self.current_location['LOCATION_NAME'],
-                'pattern': f"{self.current_location['ZONE']}{self.current_location['AISLE']}%"
-            })
-            
-            existing = cursor.fetchone()
-            cursor.close()
-            
+            existing = self.name_index.contains(self.current_location['LOCATION_NAME'],
+                                                self.current_location['ZONE'],
+                                                self.current_location['AISLE'])
             if existing:
                 return f"Location name '{self.current_location['LOCATION_NAME']}' already exists in Zone {self.current_location['ZONE']}, Aisle {self.current_location['AISLE']}"
             
@@ -151,90 +194,47 @@ class WarehouseAIAssistant:
             print(f"❌ Error checking duplicate location name: {e}")
             return None
     
+    @timed('get_next_location_id')
     def get_next_location_id(self, zone, aisle):
         """Generate the next available location ID based on zone and aisle"""
         try:
-            cursor = self.conn.cursor()
-            
-            # Search for existing locations with the same zone and aisle pattern
-            pattern = f"{zone}{aisle}%"
-            cursor.execute("""
-                SELECT LOCATION_ID 
-                FROM LOC 
-                WHERE LOCATION_ID LIKE :pattern 
-                ORDER BY LOCATION_ID DESC
-            """, pattern=pattern)
+            # Counter-backed allocation: atomic, O(1), no scan of the aisle's IDs
+            if self.id_allocator:
+                return self.id_allocator.allocate(zone, aisle)
             
-            existing_ids = cursor.fetchall()
-            cursor.close()
-            
-            if existing_ids:
-                # Get the highest existing ID and increment
-                last_id = existing_ids[0][0]
-                # Extract the numeric part and increment
-                numeric_part = int(last_id[len(zone) + len(aisle):])
-                next_number = numeric_part + 1
+            # In-memory occupancy: reuse the lowest freed number in the aisle
+            if self.occupancy_index:
+                location_id = self.occupancy_index.first_gap_id(zone, aisle)
             else:
-                # No existing locations for this zone/aisle, start with 001
-                next_number = 1
+                # Highest existing ID in the zone/aisle + 1 (001 for an empty aisle)
+                location_id = self.store.get_next_location_id(zone, aisle)
             
-            # Format: ZONE + AISLE + 3-digit number (e.g., A01A001, B02B001)
-            location_id = f"{zone}{aisle}{next_number:03d}"
+            # Skip IDs still waiting in the write-behind queue
+            if self.insert_queue:
+                number = int(location_id[len(zone) + len(aisle):])
+                while self.insert_queue.is_pending(location_id):
+                    number += 1
+                    location_id = format_location_id(zone, aisle, number)
             return location_id
             
         except Exception as e:
             print(f"❌ Error generating location ID: {e}")
             return None
     
+    def release_location_id(self):
+        """Hand a counter-allocated LOCATION_ID that was not inserted back for reuse"""
+        location_id = self.current_location.get('LOCATION_ID')
+        if self.id_allocator and location_id:
+            self.id_allocator.release(self.current_location['ZONE'], self.current_location['AISLE'], location_id)
+    
     def generate_site_code(self, zone):
         """Generate site code based on zone"""
-        # Simple mapping: Zone A = WH1, Zone B = WH2, etc.
-        zone_mapping = {
-            'A': 'WH1', 'B': 'WH2', 'C': 'WH3', 'D': 'WH4', 'E': 'WH5',
-            'F': 'WH6', 'G': 'WH7', 'H': 'WH8', 'I': 'WH9', 'J': 'WH10'
-        }
-        return zone_mapping.get(zone.upper(), 'WH0')
+        return site_code_for_zone(zone)
     
+    @timed('extract')
     def extract_location_info(self, user_input):
         """Extract location information from natural language input"""
-        user_input = user_input.lower()
-        
-        # Extract LOCATION_NAME (quoted text or after "name")
-        name_match = re.search(r'name\s*[:\-]?\s*["\']([^"\']+)["\']', user_input)
-        if not name_match:
-            name_match = re.search(r'name\s*[:\-]?\s*(\w+(?:\s+\w+)*)', user_input)
-        if name_match:
-            self.current_location['LOCATION_NAME'] = name_match.group(1).title()
-        
-        # Extract ZONE (single letter, usually A-Z)
-        zone_match = re.search(r'zone\s*[:\-]?\s*([a-zA-Z])', user_input)
-        if zone_match:
-            self.current_location['ZONE'] = zone_match.group(1).upper()
-        
-        # Extract AISLE (numbers, usually 01-99)
-        aisle_match = re.search(r'aisle\s*[:\-]?\s*(\d{1,2})', user_input)
-        if aisle_match:
-            self.current_location['AISLE'] = aisle_match.group(1).zfill(2)  # Pad with leading zero
-        
-        # Extract LOCATION_TYPE
-        type_keywords = {
-            'warehouse': 'Warehouse',
-            'storage': 'Storage',
-            'shelf': 'Shelf',
-            'rack': 'Rack',
-            'zone': 'Zone',
-            'area': 'Area',
-            'section': 'Section',
-            'room': 'Room',
-            'floor': 'Floor',
-            'bay': 'Bay',
-            'slot': 'Slot'
-        }
-        
-        for keyword, location_type in type_keywords.items():
-            if keyword in user_input:
-                self.current_location['LOCATION_TYPE'] = location_type
-                break
+        self.current_location.update(ZONE_AISLE_PARSE_CACHE.parse(user_input))
     
     def validate_fields(self):
         """Validate all required fields are present"""
@@ -273,46 +273,115 @@ class WarehouseAIAssistant:
     def check_duplicate(self, location_id):
         """Check if LOCATION_ID already exists"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT 1 FROM LOC WHERE LOCATION_ID = :id", id=location_id)
-            exists = cursor.fetchone() is not None
-            cursor.close()
-            return exists
+            return self.store.check_duplicate(location_id)
         except Exception as e:
             print(f"❌ Error checking duplicates: {e}")
             return False
     
+    @timed('insert_location')
     def insert_location(self):
         """Insert new location into database with final validation"""
         try:
-            # Final validation before insertion
-            is_valid, errors = self.comprehensive_validation()
+            if self.insert_queue:
+                return self.queue_location()
+            
+            # Final field validation before insertion (no database access)
+            is_valid, errors = self.comprehensive_validation(check_names=False)
             if not is_valid:
                 return False, f"Validation failed:\n" + "\n".join(errors)
             
-            # Check for duplicate location ID
-            if self.check_duplicate(self.current_location['LOCATION_ID']):
-                return False, "Generated location ID already exists. Please try a different zone or aisle combination."
-            
             # Add metadata
             self.current_location['CREATED_BY'] = 'AI_Assistant'
             self.current_location['CREATED_DATE'] = datetime.now()
             
-            # Insert into database
-            cursor = self.conn.cursor()
-            sql = """
-                INSERT INTO LOC (LOCATION_ID, LOCATION_NAME, SITE_CODE, LOCATION_TYPE, CREATED_BY, CREATED_DATE)
-                VALUES (:LOCATION_ID, :LOCATION_NAME, :SITE_CODE, :LOCATION_TYPE, :CREATED_BY, :CREATED_DATE)
-            """
-            cursor.execute(sql, self.current_location)
-            self.conn.commit()
-            cursor.close()
+            # Name check, insert and commit in one atomic store call
+            proposed_id = self.current_location['LOCATION_ID']
+            try:
+                row = self.store.create_location(self.current_location, self.current_location['ZONE'],
+                                                 self.current_location['AISLE'])
+            except DuplicateLocationNameError as e:
+                # Inserted by another writer since the aisle was loaded
+                self.name_index.add(self.current_location['LOCATION_NAME'], self.current_location['ZONE'],
+                                    self.current_location['AISLE'])
+                return False, f"Validation failed:\n• Duplicate: {e}"
+            self.current_location['LOCATION_ID'] = row['LOCATION_ID']
+            self.name_index.add(row['LOCATION_NAME'], self.current_location['ZONE'], self.current_location['AISLE'])
+            self.name_search.add(row['LOCATION_ID'], row['LOCATION_NAME'])
+            
+            if self.occupancy_index:
+                self.occupancy_index.mark_used(self.current_location['ZONE'], self.current_location['AISLE'],
+                                               row['LOCATION_ID'])
             
+            if row['LOCATION_ID'] != proposed_id:
+                return True, f"Location created successfully as {row['LOCATION_ID']} ({proposed_id} was taken meanwhile)!"
             return True, "Location created successfully!"
             
         except Exception as e:
             return False, f"Database error: {e}"
     
+    def queue_location(self):
+        """Journal the location for the background writer and return its ticket"""
+        # The background writer commits through create_locations(), which re-checks
+        # the name and may move the location to the next free LOCATION_ID
+        is_valid, errors = self.comprehensive_validation()
+        if not is_valid:
+            return False, f"Validation failed:\n" + "\n".join(errors)
+        
+        self.current_location['CREATED_BY'] = 'AI_Assistant'
+        self.current_location['CREATED_DATE'] = datetime.now()
+        zone, aisle = self.current_location['ZONE'], self.current_location['AISLE']
+        ticket = self.insert_queue.submit(self.current_location, zone, aisle)
+        
+        self.name_index.add(self.current_location['LOCATION_NAME'], zone, aisle)
+        self.name_search.add(self.current_location['LOCATION_ID'], self.current_location['LOCATION_NAME'])
+        if self.occupancy_index:
+            self.occupancy_index.mark_used(zone, aisle, self.current_location['LOCATION_ID'])
+        return True, (f"Location {self.current_location['LOCATION_ID']} queued as ticket {ticket} "
+                      f"(the ID is provisional until it is committed).")
+    
+    def ticket_status(self, ticket):
+        """Describe a write-behind ticket for the 'status <ticket>' command"""
+        status = self.insert_queue.status(ticket)
+        if status is None:
+            return f"🤖 AI Assistant: I don't know ticket {ticket}."
+        if status['status'] == 'done':
+            if 'location_id' in status:
+                return f"✅ Ticket {ticket}: the location has been committed to the database as {status['location_id']}."
+            return f"✅ Ticket {ticket}: the location has been committed to the database."
+        if status['status'] == 'failed':
+            return f"❌ Ticket {ticket}: the insert failed ({status['error']})."
+        return f"⏳ Ticket {ticket}: still queued."
+    
+    @timed('find_locations')
+    def find_locations(self, query):
+        """Answer 'find location <name>' from the trigram index, best matches first"""
+        matches = self.name_search.search(query)
+        if not matches:
+            return f"🤖 AI Assistant: No location names are similar to '{query}'."
+        lines = "\n".join(f"   • {line}" for line in format_matches(matches))
+        return f"🔍 Locations matching '{query}':\n{lines}"
+    
+    @timed('near_duplicates')
+    def near_duplicate_warning(self):
+        """Warn about similar names already in the aisle before the operator confirms"""
+        if not self.name_search:
+            return ""
+        prefix = f"{self.current_location['ZONE']}{self.current_location['AISLE']}"
+        matches = self.name_search.near_duplicates(self.current_location['LOCATION_NAME'], prefix)
+        if not matches:
+            return ""
+        lines = "".join(f"   • {line}\n" for line in format_matches(matches))
+        return f"⚠️ Similar names already in zone {self.current_location['ZONE']}, aisle {self.current_location['AISLE']}:\n{lines}"
+    
+    def db_round_trips(self):
+        """Database round trips made so far by the store and the ID helpers"""
+        trips = self.store.round_trips if self.store else 0
+        if self.id_allocator:
+            trips += self.id_allocator.round_trips
+        if self.occupancy_index:
+            trips += self.occupancy_index.round_trips
+        return trips
+    
     def get_location_summary(self):
         """Generate a summary of the location details"""
         summary = "📋 Location Summary:\n"
@@ -342,15 +411,28 @@ class WarehouseAIAssistant:
     
     def process_user_input(self, user_input):
         """Process user input and provide appropriate response"""
+        with METRICS.timer(f"state.{self.conversation_state}"):
+            return self.handle_user_input(user_input)
+    
+    def handle_user_input(self, user_input):
+        """Advance the conversation by one utterance"""
         user_input = user_input.strip()
         
+        if self.insert_queue and user_input.lower().startswith('status '):
+            return self.ticket_status(user_input.split(None, 1)[1])
+        
+        query = find_query(user_input)
+        if query is not None and self.name_search:
+            return self.find_locations(query)
+        
         # Handle conversation flow
         if self.conversation_state == "greeting":
             if any(word in user_input.lower() for word in ['create', 'add', 'new', 'location']):
                 self.conversation_state = "collecting_info"
+                self.conversation_start_round_trips = self.db_round_trips()
                 return "🤖 AI Assistant: Great! I'll help you create a new storage location. I'll automatically generate the location ID and site code based on your zone and aisle information.\n\nPlease provide:\n• Location name (3-100 characters)\n• Zone (A-Z)\n• Aisle number (01-99)\n• Location type (Warehouse, Storage, Shelf, Rack, Zone, Area, Section, Room, Floor, Bay, Slot)\n\nYou can say something like:\n'Create location name \"Main Storage Area\", zone A, aisle 01, type warehouse'"
             else:
-                return "🤖 AI Assistant: I can help you create new storage locations in the warehouse. I'll automatically generate location IDs for you! Say 'create location' or 'add new location' to get started!"
+                return "🤖 AI Assistant: I can help you create new storage locations in the warehouse. I'll automatically generate location IDs for you! Say 'create location' or 'add new location' to get started, or 'find location <name>' to look one up!"
         
         elif self.conversation_state == "collecting_info":
             # Extract information from user input
@@ -368,7 +450,8 @@ class WarehouseAIAssistant:
                     self.conversation_state = "approval"
                     summary = self.get_location_summary()
                     validation_summary = self.get_validation_summary()
-                    return f"{summary}\n{validation_summary}\n🤖 AI Assistant: Does this look correct? Type 'yes' to create the location or 'no' to start over."
+                    warning = self.near_duplicate_warning()
+                    return f"{summary}\n{validation_summary}\n{warning}🤖 AI Assistant: Does this look correct? Type 'yes' to create the location or 'no' to start over."
                 else:
                     return f"🤖 AI Assistant: {auto_message}\nPlease provide valid zone and aisle information."
             else:
@@ -383,12 +466,17 @@ class WarehouseAIAssistant:
                 if success:
                     self.conversation_state = "greeting"
                     self.current_location = {}
-                    return f"✅ {message}\n🤖 AI Assistant: The location has been added to the database. Is there anything else I can help you with?"
+                    round_trips = self.db_round_trips() - self.conversation_start_round_trips
+                    if self.insert_queue:
+                        return f"✅ {message}\n📊 Database round trips for this location: {round_trips}\n🤖 AI Assistant: It will be committed in the background; say 'status <ticket>' for the outcome and the final LOCATION_ID. Is there anything else I can help you with?"
+                    return f"✅ {message}\n📊 Database round trips for this location: {round_trips}\n🤖 AI Assistant: The location has been added to the database. Is there anything else I can help you with?"
                 else:
+                    self.release_location_id()
                     self.conversation_state = "greeting"
                     self.current_location = {}
                     return f"❌ {message}\n🤖 AI Assistant: Let's try again. Say 'create location' to start over."
             elif user_input.lower() in ['no', 'n', 'cancel', 'abort']:
+                self.release_location_id()
                 self.conversation_state = "greeting"
                 self.current_location = {}
                 return "🤖 AI Assistant: Location creation cancelled. Say 'create location' if you want to try again."
@@ -398,14 +486,25 @@ class WarehouseAIAssistant:
         # Fallback
         return "🤖 AI Assistant: I didn't understand that. Say 'create location' to add a new storage location."
     
+    def connection_failed(self):
+        """Report a background connect that failed; nothing works without the session"""
+        if self.pending_connection is not None and self.pending_connection.failed:
+            print(f"❌ Database connection failed: {self.pending_connection.error}")
+            return True
+        return False
+    
     def run(self):
         """Main conversation loop"""
-        if not self.connect_database():
+        if self.store is None and not self.connect_database():
             return
+        if self.insert_queue and self.insert_queue.replayed:
+            print(f"🔁 Replaying {self.insert_queue.replayed} queued location(s) from {self.write_behind_journal}")
         
         print("\n🤖 AI Assistant: I'm ready to help you manage warehouse locations!")
         print("I'll automatically generate location IDs based on zone and aisle information.")
         print("Type 'quit' to exit the assistant.\n")
+        if self.prewarm:
+            self.prewarm.mark_ready()
         
         while True:
             try:
@@ -415,7 +514,12 @@ class WarehouseAIAssistant:
                     print("🤖 AI Assistant: Goodbye! Have a great day!")
                     break
                 
+                if self.connection_failed():
+                    return
                 response = self.process_user_input(user_input)
+                # A reply produced while the session failed to open is misleading
+                if self.connection_failed():
+                    return
                 print(response + "\n")
                 
             except KeyboardInterrupt:
@@ -424,13 +528,54 @@ class WarehouseAIAssistant:
             except Exception as e:
                 print(f"❌ Error: {e}")
         
-        if self.conn:
-            self.conn.close()
+        if sql_trace.TRACER:
+            print("\n🔎 SQL trace (slowest first):")
+            print(sql_trace.trace_report(self.conn or getattr(self.store, 'conn', None)))
+        if self.insert_queue:
+            # Commit whatever is still queued before exiting
+            self.insert_queue.close()
+            if self.insert_queue.store is not self.store:
+                self.insert_queue.store.close()
+        if self.store:
+            self.store.close()
+        if self.prewarm:
+            print(self.prewarm.report())
 
 def main():
     """Main function to start the AI assistant"""
-    assistant = WarehouseAIAssistant()
+    parser = argparse.ArgumentParser(description="Warehouse AI Assistant with auto-generated location IDs")
+    id_strategy = parser.add_mutually_exclusive_group()
+    id_strategy.add_argument('--id-counter', action='store_true',
+                             help="Allocate location IDs from the LOC_ID_COUNTER table instead of scanning LOC")
+    id_strategy.add_argument('--reuse-gaps', action='store_true',
+                             help="Pick the lowest free number per aisle from an in-memory occupancy index")
+    parser.add_argument('--id-block-size', type=int, default=1,
+                        help="Location IDs leased per counter round trip (with --id-counter)")
+    parser.add_argument('--store', default='oracle',
+                        help="Storage backend: oracle (prompts for credentials), memory or sqlite:<path>")
+    parser.add_argument('--id-cache', action='store_true',
+                        help="Answer definite 'ID not present' from a process-local filter instead of the database")
+    parser.add_argument('--write-behind', metavar='JOURNAL',
+                        help="Confirm instantly with a ticket; a background writer commits in batches, "
+                             "journaling to JOURNAL and replaying it on restart")
+    parser.add_argument('--profile', action='store_true', help="Print a per-stage latency breakdown on exit")
+    parser.add_argument('--sql-trace', metavar='LOG',
+                        help="Trace every SQL statement to the JSONL query LOG and print a summary with plans on exit")
+    args = parser.parse_args()
+    if args.sql_trace:
+        sql_trace.enable_tracing(args.sql_trace)
+    if args.store != 'oracle' and (args.id_counter or args.reuse_gaps):
+        parser.error("--id-counter and --reuse-gaps need the oracle store")
+    
+    store = None if args.store == 'oracle' else open_store(args.store)
+    assistant = WarehouseAIAssistant(use_id_counter=args.id_counter, id_block_size=args.id_block_size,
+                                     reuse_gaps=args.reuse_gaps, store=store, id_cache=args.id_cache,
+                                     write_behind=args.write_behind)
     assistant.run()
+    if args.profile:
+        print("\n📊 Per-stage latency:")
+        print(METRICS.report())
+        print(ZONE_AISLE_PARSE_CACHE.report())
 
 if __name__ == "__main__":
     main() 
@@ -1,57 +1,158 @@
-from flask import Flask, render_template, request, jsonify, session
-import cx_Oracle
+from flask import Flask, Response, render_template, request, jsonify, session, url_for
+from contextlib import contextmanager
 from datetime import datetime
-import re
 import os
+import threading
+import time
+from loc_export import (EXPORT_FORMATS, EXPORT_PAGE_SIZE, MAX_PAGE_SIZE, csv_chunks, export_chunks,
+                        location_dicts, location_pages, ndjson_chunks)
+from location_id_cache import CachedLocationStore
+from location_name_index import TrigramNameIndex, find_query, format_matches
+from location_store import OracleLocationStore, open_store
+from metrics import METRICS, timed
+import sql_trace
+from session_store import ConversationStore, connect_store
+from statement_cache import STMT_CACHE_SIZE, set_statement_cache_size
+from utterance_parser import LOCATION_ID_PARSE_CACHE
+from write_behind import WriteBehindQueue
 
 app = Flask(__name__)
 app.secret_key = 'warehouse_ai_secret_key'
 
+class PoolStats:
+    """Track how long requests wait to borrow a pooled connection"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.acquires = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        
+    def record_acquire(self, wait):
+        """Record one pool.acquire() and the time spent waiting for it"""
+        with self.lock:
+            self.acquires += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+    
+    def snapshot(self, pool):
+        """Return pool sizing and acquire wait figures for tuning"""
+        with self.lock:
+            avg_wait = self.total_wait / self.acquires if self.acquires else 0.0
+            return {
+                'min': pool.min,
+                'max': pool.max,
+                'increment': pool.increment,
+                'opened': pool.opened,
+                'busy': pool.busy,
+                'acquires': self.acquires,
+                'avg_acquire_wait_ms': round(avg_wait * 1000, 3),
+                'max_acquire_wait_ms': round(self.max_wait * 1000, 3)
+            }
+
+def create_pool():
+    """Create the Oracle session pool once at startup (production mode)
+    
+    Production mode is enabled by setting ORACLE_DSN, ORACLE_USER and ORACLE_PASSWORD.
+    Pool sizing comes from ORACLE_POOL_MIN, ORACLE_POOL_MAX and ORACLE_POOL_INCREMENT,
+    each session's statement cache from ORACLE_STMT_CACHE_SIZE.
+    Without ORACLE_DSN the /chat endpoint keeps its demo behaviour.
+    """
+    dsn = os.environ.get('ORACLE_DSN')
+    if not dsn:
+        return None
+    # Demo and offline runs never load the Oracle client
+    import cx_Oracle
+    pool = cx_Oracle.SessionPool(
+        user=os.environ.get('ORACLE_USER'),
+        password=os.environ.get('ORACLE_PASSWORD'),
+        dsn=dsn,
+        min=int(os.environ.get('ORACLE_POOL_MIN', 2)),
+        max=int(os.environ.get('ORACLE_POOL_MAX', 10)),
+        increment=int(os.environ.get('ORACLE_POOL_INCREMENT', 1)),
+        threaded=True,
+        getmode=cx_Oracle.SPOOL_ATTRVAL_WAIT
+    )
+    # Pooled connections are new objects on every acquire, so statements are
+    # reused through each session's cache rather than long-lived cursors
+    set_statement_cache_size(pool, int(os.environ.get('ORACLE_STMT_CACHE_SIZE', STMT_CACHE_SIZE)))
+    return pool
+
+db_pool = create_pool()
+pool_stats = PoolStats()
+
+@contextmanager
+def pooled_connection():
+    """Borrow a pooled connection only for the duration of the SQL that needs it"""
+    start = time.perf_counter()
+    conn = db_pool.acquire()
+    pool_stats.record_acquire(time.perf_counter() - start)
+    try:
+        yield sql_trace.trace_connection(conn)
+    finally:
+        db_pool.release(conn)
+
+def create_store():
+    """Pick the LOC storage backend for /chat
+    
+    The Oracle pool when ORACLE_DSN is set, otherwise WAREHOUSE_STORE
+    (memory or sqlite:<path>) for offline runs, otherwise demo mode (None).
+    WAREHOUSE_ID_CACHE=1 puts the process-local LOCATION_ID cache in front
+    of duplicate checks.
+    """
+    if db_pool is not None:
+        store = OracleLocationStore(connect=pooled_connection)
+    else:
+        spec = os.environ.get('WAREHOUSE_STORE')
+        store = open_store(spec) if spec else None
+    if store is not None and os.environ.get('WAREHOUSE_ID_CACHE') == '1':
+        store = CachedLocationStore(store,
+                                    max_bytes=int(os.environ.get('WAREHOUSE_ID_CACHE_MAX_BYTES', 8 * 1024 * 1024)),
+                                    refresh_interval=float(os.environ.get('WAREHOUSE_ID_CACHE_REFRESH', 5)),
+                                    rebuild_interval=float(os.environ.get('WAREHOUSE_ID_CACHE_REBUILD', 300)))
+    return store
+
+location_store = create_store()
+
+# Fuzzy LOCATION_NAME lookup; loaded from the store on the first search
+name_search = TrigramNameIndex(location_store) if location_store is not None else None
+
+def create_insert_queue():
+    """WAREHOUSE_WRITE_BEHIND=<journal path> confirms with a ticket and commits in the background"""
+    journal = os.environ.get('WAREHOUSE_WRITE_BEHIND')
+    if journal and location_store is not None:
+        return WriteBehindQueue(location_store, journal,
+                                batch_size=int(os.environ.get('WAREHOUSE_WRITE_BEHIND_BATCH', 100)))
+    return None
+
+insert_queue = create_insert_queue()
+
+def create_conversation_store():
+    """Server-side conversation state; only a short opaque ID goes in the cookie
+    
+    WAREHOUSE_SESSION_STORE=<host:port or socket path> shares one store across
+    worker processes (start it with `python session_store.py serve`); otherwise
+    conversations live in this process.
+    """
+    address = os.environ.get('WAREHOUSE_SESSION_STORE')
+    if address:
+        authkey = os.environ.get('WAREHOUSE_SESSION_AUTHKEY', 'warehouse_ai_sessions').encode()
+        return connect_store(address, authkey)
+    return ConversationStore(ttl=int(os.environ.get('WAREHOUSE_SESSION_TTL', 1800)),
+                             max_conversations=int(os.environ.get('WAREHOUSE_SESSION_MAX', 100000)))
+
+conversation_store = create_conversation_store()
+
 class WebWarehouseAI:
     def __init__(self):
         self.required_fields = ['LOCATION_ID', 'LOCATION_NAME', 'SITE_CODE', 'LOCATION_TYPE']
         
+    @timed('extract')
     def extract_location_info(self, user_input, current_location):
         """Extract location information from natural language input"""
-        user_input = user_input.lower()
-        
-        # Extract LOCATION_ID (numbers)
-        location_id_match = re.search(r'location\s*(?:id|#)?\s*[:\-]?\s*(\d+)', user_input)
-        if location_id_match:
-            current_location['LOCATION_ID'] = location_id_match.group(1)
-        
-        # Extract LOCATION_NAME (quoted text or after "name")
-        name_match = re.search(r'name\s*[:\-]?\s*["\']([^"\']+)["\']', user_input)
-        if not name_match:
-            name_match = re.search(r'name\s*[:\-]?\s*(\w+(?:\s+\w+)*)', user_input)
-        if name_match:
-            current_location['LOCATION_NAME'] = name_match.group(1).title()
-        
-        # Extract SITE_CODE (alphanumeric codes)
-        site_match = re.search(r'site\s*(?:code)?\s*[:\-]?\s*([a-zA-Z0-9]+)', user_input)
-        if site_match:
-            current_location['SITE_CODE'] = site_match.group(1).upper()
-        
-        # Extract LOCATION_TYPE
-        type_keywords = {
-            'warehouse': 'Warehouse',
-            'storage': 'Storage',
-            'shelf': 'Shelf',
-            'rack': 'Rack',
-            'zone': 'Zone',
-            'area': 'Area',
-            'section': 'Section',
-            'room': 'Room',
-            'floor': 'Floor'
-        }
-        
-        for keyword, location_type in type_keywords.items():
-            if keyword in user_input:
-                current_location['LOCATION_TYPE'] = location_type
-                break
-        
+        current_location.update(LOCATION_ID_PARSE_CACHE.parse(user_input))
         return current_location
     
+    @timed('validate_fields')
     def validate_fields(self, current_location):
         """Validate all required fields are present"""
         missing_fields = []
@@ -63,36 +164,45 @@ class WebWarehouseAI:
             return False, f"Missing required information: {', '.join(missing_fields)}"
         return True, "All fields validated successfully"
     
-    def check_duplicate(self, conn, location_id):
+    @timed('check_duplicate')
+    def check_duplicate(self, store, location_id):
         """Check if LOCATION_ID already exists"""
         try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1 FROM LOC WHERE LOCATION_ID = :id", id=location_id)
-            exists = cursor.fetchone() is not None
-            cursor.close()
-            return exists
+            if insert_queue is not None and insert_queue.is_pending(location_id):
+                return True
+            return store.check_duplicate(location_id)
         except Exception as e:
             print(f"Error checking duplicates: {e}")
             return False
     
-    def insert_location(self, conn, current_location):
+    @timed('insert_location')
+    def insert_location(self, store, current_location):
         """Insert new location into database"""
         try:
             current_location['CREATED_BY'] = 'Web_AI_Assistant'
             current_location['CREATED_DATE'] = datetime.now()
             
-            cursor = conn.cursor()
-            sql = """
-                INSERT INTO LOC (LOCATION_ID, LOCATION_NAME, SITE_CODE, LOCATION_TYPE, CREATED_BY, CREATED_DATE)
-                VALUES (:LOCATION_ID, :LOCATION_NAME, :SITE_CODE, :LOCATION_TYPE, :CREATED_BY, :CREATED_DATE)
-            """
-            cursor.execute(sql, current_location)
-            conn.commit()
-            cursor.close()
+            if insert_queue is not None:
+                ticket = insert_queue.submit(current_location)
+                name_search.add(current_location['LOCATION_ID'], current_location['LOCATION_NAME'])
+                return True, f"Location queued as ticket {ticket}; check GET /tickets/{ticket} for the outcome."
+            
+            store.insert_location(current_location)
+            name_search.add(current_location['LOCATION_ID'], current_location['LOCATION_NAME'])
             return True, "Location created successfully!"
         except Exception as e:
             return False, f"Database error: {e}"
     
+    @timed('find_locations')
+    def find_locations(self, store, query):
+        """Best LOCATION_NAME matches for 'find location <name>'"""
+        return name_search.search(query)
+    
+    @timed('near_duplicates')
+    def near_duplicates(self, store, name):
+        """Similar existing names, shown before the operator confirms"""
+        return name_search.near_duplicates(name)
+    
     def get_location_summary(self, current_location):
         """Generate a summary of the location details"""
         summary = "📋 Location Summary:<br>"
@@ -112,79 +222,277 @@ def index():
 @app.route('/chat', methods=['POST'])
 def chat():
     """Handle chat messages"""
-    if 'conversation_state' not in session:
-        session['conversation_state'] = 'greeting'
-        session['current_location'] = {}
+    sid = session.get('sid')
+    conversation = conversation_store.load(sid) if sid else None
+    if conversation is None:
+        sid, conversation = conversation_store.create()
+        session['sid'] = sid
     
     user_message = request.json.get('message', '').strip()
-    conversation_state = session['conversation_state']
-    current_location = session['current_location']
+    with METRICS.timer(f"state.{conversation.state}"):
+        response = handle_conversation(conversation, user_message)
+    conversation_store.save(sid, conversation)
+    return response
+
+def handle_conversation(conversation, user_message):
+    """Advance one conversation by a message and build the JSON reply"""
+    steps = conversation_steps(conversation, user_message)
+    try:
+        method, argument = next(steps)
+        while True:
+            method, argument = steps.send(getattr(ai_assistant, method)(location_store, argument))
+    except StopIteration as done:
+        return jsonify(done.value)
+
+def conversation_steps(conversation, user_message):
+    """The /chat flow without I/O: a generator that returns the reply dict
+    
+    Each store call is yielded as (WebWarehouseAI method name, argument) and
+    the caller sends back its result, so the sync route and the asyncio
+    server (async_web_assistant.py) run the same flow, blocking or not.
+    """
+    conversation_state = conversation.state
+    current_location = conversation.location()
+    
+    query = find_query(user_message)
+    if query is not None and location_store is not None:
+        matches = yield 'find_locations', query
+        if not matches:
+            reply = f"🤖 AI Assistant: No location names are similar to '{query}'."
+        else:
+            reply = f"🔍 Locations matching '{query}':<br>" + "<br>".join(f"   • {line}" for line in format_matches(matches))
+        return {'reply': reply, 'state': conversation_state}
     
     # Handle conversation flow
     if conversation_state == "greeting":
         if any(word in user_message.lower() for word in ['create', 'add', 'new', 'location']):
-            session['conversation_state'] = "collecting_info"
-            return jsonify({
+            conversation.state = "collecting_info"
+            return {
                 'reply': "🤖 AI Assistant: Great! I'll help you create a new storage location. Please provide the location details. You can say something like:<br>'Create location ID 101, name \"Main Storage Area\", site code WH1, type warehouse'",
                 'state': 'collecting_info'
-            })
+            }
         else:
-            return jsonify({
-                'reply': "🤖 AI Assistant: I can help you create new storage locations in the warehouse. Say 'create location' or 'add new location' to get started!",
+            return {
+                'reply': "🤖 AI Assistant: I can help you create new storage locations in the warehouse. Say 'create location' or 'add new location' to get started, or 'find location <name>' to look one up!",
                 'state': 'greeting'
-            })
+            }
     
     elif conversation_state == "collecting_info":
         # Extract information from user input
         current_location = ai_assistant.extract_location_info(user_message, current_location)
-        session['current_location'] = current_location
+        conversation.set_location(current_location)
         
         # Check if we have all required information
         is_valid, message = ai_assistant.validate_fields(current_location)
         
         if is_valid:
-            # For demo purposes, we'll skip duplicate check and go straight to approval
-            # In production, you'd check duplicates here
-            session['conversation_state'] = "approval"
+            warning = ""
+            # With a store configured, check duplicates before asking for approval
+            if location_store is not None:
+                if (yield 'check_duplicate', current_location['LOCATION_ID']):
+                    conversation.state = "greeting"
+                    conversation.set_location({})
+                    return {
+                        'reply': "❌ Location ID already exists. Please use a different ID.",
+                        'state': 'greeting'
+                    }
+                similar = yield 'near_duplicates', current_location['LOCATION_NAME']
+                if similar:
+                    warning = "⚠️ Similar location names already exist:<br>" + "".join(
+                        f"   • {line}<br>" for line in format_matches(similar))
+            
+            conversation.state = "approval"
             summary = ai_assistant.get_location_summary(current_location)
-            return jsonify({
-                'reply': f"{summary}<br>🤖 AI Assistant: Does this look correct? Type 'yes' to create the location or 'no' to start over.",
+            return {
+                'reply': f"{summary}<br>{warning}🤖 AI Assistant: Does this look correct? Type 'yes' to create the location or 'no' to start over.",
                 'state': 'approval'
-            })
+            }
         else:
-            return jsonify({
+            return {
                 'reply': f"🤖 AI Assistant: {message}<br>Please provide the missing information.",
                 'state': 'collecting_info'
-            })
+            }
     
     elif conversation_state == "approval":
         if user_message.lower() in ['yes', 'y', 'confirm', 'create']:
-            # For demo purposes, we'll simulate success
-            # In production, you'd insert into database here
-            session['conversation_state'] = "greeting"
-            session['current_location'] = {}
-            return jsonify({
+            conversation.state = "greeting"
+            conversation.set_location({})
+            
+            if location_store is not None:
+                # Copy so the metadata never lands in the conversation
+                success, message = yield 'insert_location', dict(current_location)
+                if not success:
+                    return {
+                        'reply': f"❌ {message}<br>🤖 AI Assistant: Let's try again. Say 'create location' to start over.",
+                        'state': 'greeting'
+                    }
+                if insert_queue is not None:
+                    return {
+                        'reply': f"✅ {message}<br>🤖 AI Assistant: Is there anything else I can help you with?",
+                        'state': 'greeting'
+                    }
+            # Demo mode (no store configured) simulates success
+            return {
                 'reply': "✅ Location created successfully!<br>🤖 AI Assistant: The location has been added to the database. Is there anything else I can help you with?",
                 'state': 'greeting'
-            })
+            }
         elif user_message.lower() in ['no', 'n', 'cancel', 'abort']:
-            session['conversation_state'] = "greeting"
-            session['current_location'] = {}
-            return jsonify({
+            conversation.state = "greeting"
+            conversation.set_location({})
+            return {
                 'reply': "🤖 AI Assistant: Location creation cancelled. Say 'create location' if you want to try again.",
                 'state': 'greeting'
-            })
+            }
         else:
-            return jsonify({
+            return {
                 'reply': "🤖 AI Assistant: Please type 'yes' to confirm or 'no' to cancel.",
                 'state': 'approval'
-            })
+            }
     
     # Fallback
-    return jsonify({
+    return {
         'reply': "🤖 AI Assistant: I didn't understand that. Say 'create location' to add a new storage location.",
         'state': 'greeting'
-    })
+    }
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint: per-stage latency histograms and error counters"""
+    return Response(METRICS.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/sql/stats')
+def sql_stats():
+    """Per-statement SQL trace (WAREHOUSE_SQL_TRACE=<query log>); ?sort=rows, ?plans=N for the slowest"""
+    if sql_trace.TRACER is None:
+        return jsonify({'enabled': False})
+    sort_by = request.args.get('sort', 'total_ms')
+    if sort_by not in sql_trace.SORT_KEYS:
+        return jsonify({'error': f"sort must be one of {', '.join(sql_trace.SORT_KEYS)}"}), 400
+    statements = sql_trace.TRACER.summaries(sort_by)
+    plans = {}
+    top = request.args.get('plans', type=int)
+    if top:
+        if db_pool is not None:
+            with pooled_connection() as conn:
+                plans = sql_trace.TRACER.capture_plans(sql_trace.untraced(conn), top)
+        elif isinstance(getattr(location_store, 'conn', None), sql_trace.TracingConnection):
+            plans = sql_trace.TRACER.capture_plans(sql_trace.untraced(location_store.conn), top)
+    return jsonify({'enabled': True, 'statements': statements, 'plans': plans})
+
+@app.route('/sessions/stats')
+def session_status():
+    """Expose conversation count, evictions and memory per idle conversation"""
+    return jsonify(conversation_store.stats())
+
+@app.route('/id-cache/stats')
+def id_cache_status():
+    """Expose LOCATION_ID cache hit/miss counters and memory use"""
+    if not isinstance(location_store, CachedLocationStore):
+        return jsonify({'enabled': False})
+    return jsonify(dict(location_store.id_cache.stats(), enabled=True))
+
+@app.route('/id-cache/invalidate', methods=['POST'])
+def id_cache_invalidate():
+    """Force a full reload, e.g. after a bulk load by another writer"""
+    if isinstance(location_store, CachedLocationStore):
+        location_store.id_cache.invalidate()
+    return jsonify({'invalidated': isinstance(location_store, CachedLocationStore)})
+
+@app.route('/name-search/stats')
+def name_search_status():
+    """Expose the trigram name index size (loaded on the first search)"""
+    if name_search is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(name_search.stats(), enabled=True))
+
+@app.route('/name-search/invalidate', methods=['POST'])
+def name_search_invalidate():
+    """Rebuild the name index on next use, e.g. after a bulk import by another process"""
+    if name_search is not None:
+        name_search.invalidate()
+    return jsonify({'invalidated': name_search is not None})
+
+@app.route('/parse-cache/stats')
+def parse_cache_status():
+    """Expose exact and template hit rates of the utterance parse cache"""
+    return jsonify(LOCATION_ID_PARSE_CACHE.stats())
+
+@app.route('/tickets/<ticket>')
+def ticket_status(ticket):
+    """Outcome of a write-behind insert: queued, done or failed"""
+    status = insert_queue.status(ticket) if insert_queue is not None else None
+    if status is None:
+        return jsonify({'ticket': ticket, 'status': 'unknown'}), 404
+    return jsonify(dict(status, ticket=ticket))
+
+@app.route('/write-behind/stats')
+def write_behind_status():
+    """Expose queue depth, batch sizes and replayed journal entries"""
+    if insert_queue is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(insert_queue.stats(), enabled=True))
+
+def location_filters():
+    """zone, aisle, site and type query arguments as list_locations filters"""
+    return {
+        'zone': request.args.get('zone'),
+        'aisle': request.args.get('aisle'),
+        'site_code': request.args.get('site'),
+        'location_type': request.args.get('type')
+    }
+
+@app.route('/locations')
+def list_locations():
+    """One keyset page of LOC: ?zone=&aisle=&site=&type=&after=<LOCATION_ID>&limit=&format=json|csv|ndjson
+    
+    The Link header (and next_after in JSON) carries the next page's cursor.
+    Pages have an ETag, so a client re-polling an unchanged page gets a 304.
+    """
+    if location_store is None:
+        return jsonify({'error': "No LOC store is configured (demo mode)"}), 404
+    export_format = request.args.get('format', 'json')
+    if export_format != 'json' and export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be json, {' or '.join(EXPORT_FORMATS)}"}), 400
+    limit = max(1, min(request.args.get('limit', 500, type=int), MAX_PAGE_SIZE))
+    filters = location_filters()
+    page = location_store.list_locations(request.args.get('after'), limit, **filters)
+    next_after = page[-1][0] if len(page) == limit else None
+    
+    if export_format == 'json':
+        response = jsonify({'locations': location_dicts(page), 'next_after': next_after})
+    else:
+        chunks = csv_chunks([page]) if export_format == 'csv' else ndjson_chunks([page])
+        response = Response(''.join(chunks), mimetype=EXPORT_FORMATS[export_format])
+    if next_after is not None:
+        next_args = dict(request.args, after=next_after)
+        response.headers['Link'] = f'<{url_for("list_locations", **next_args)}>; rel="next"'
+    response.add_etag()
+    return response.make_conditional(request)
+
+@app.route('/locations/export')
+def export_locations():
+    """Stream the whole filtered LOC table as CSV or NDJSON (?format=, same filters as /locations)
+    
+    Rows are read a keyset page at a time and written as they are read, so
+    memory stays flat however large LOC is; with the Oracle pool a session is
+    borrowed per page, not for the whole download.
+    """
+    if location_store is None:
+        return jsonify({'error': "No LOC store is configured (demo mode)"}), 404
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be {' or '.join(EXPORT_FORMATS)}"}), 400
+    page_size = max(1, min(request.args.get('page_size', EXPORT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+    chunks = export_chunks(location_pages(location_store, page_size, **location_filters()), export_format)
+    return Response(chunks, mimetype=EXPORT_FORMATS[export_format],
+                    headers={'Content-Disposition': f'attachment; filename="locations.{export_format}"'})
+
+@app.route('/pool/stats')
+def pool_status():
+    """Expose pool size, busy count and acquire wait for tuning"""
+    if db_pool is None:
+        return jsonify({'mode': 'demo'})
+    return jsonify(dict(pool_stats.snapshot(db_pool), mode='production'))
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000) 
@@ -0,0 +1,279 @@
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from location_store import loc_binds
+
+class InsertJournal:
+    """Append-only JSONL journal of queued inserts and their outcomes
+
+    Each confirmed location is fsync'ed here before its ticket is handed out,
+    so a crash between confirmation and commit loses nothing.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def append(self, *records):
+        for record in records:
+            self.file.write(json.dumps(record, default=str) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def read(self):
+        """Every record written so far; a torn last line from a crash is ignored"""
+        records = []
+        with open(self.path, encoding='utf-8') as journal_file:
+            for line in journal_file:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        return records
+
+    def rewrite(self, records):
+        """Atomically replace the journal with `records`"""
+        self.file.close()
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as temp_file:
+            for record in records:
+                temp_file.write(json.dumps(record, default=str) + '\n')
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, self.path)
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def truncate(self):
+        self.file.truncate(0)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+def _journal_location(row):
+    return dict(row, CREATED_DATE=row['CREATED_DATE'].isoformat() if row['CREATED_DATE'] else None)
+
+def _stored_location(entry):
+    created = entry['CREATED_DATE']
+    return dict(entry, CREATED_DATE=datetime.fromisoformat(created) if created else None)
+
+class WriteBehindQueue:
+    """Confirmed inserts go to a local journal and are committed in batches
+
+    submit() returns a ticket immediately; a background thread drains the
+    queue one batch at a time. Locations submitted with their zone/aisle
+    carry a provisional LOCATION_ID and go through the store's
+    create_locations(), which re-checks each name and moves a taken ID to the
+    next free number (one executemany and one commit per batch on Oracle);
+    the ticket reports the ID actually committed. Locations with a fixed ID
+    are array-inserted with one commit per batch. Entries still pending in
+    the journal are replayed when the queue is opened again.
+    """
+    def __init__(self, store, journal_path, batch_size=100, max_tickets=100000, retry_delay=5.0):
+        self.store = store
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.max_tickets = max_tickets
+        self.journal = InsertJournal(journal_path)
+        self.queue = queue.Queue()
+        self.statuses = OrderedDict()
+        self.lock = threading.Lock()
+        self.pending = 0
+        # LOCATION_IDs queued but not yet committed, so they are not handed out twice
+        self.pending_ids = set()
+        self.batches = 0
+        self.committed = 0
+        self.failed = 0
+        self.replayed = self.replay()
+        self.worker = threading.Thread(target=self.drain, name='write-behind', daemon=True)
+        self.worker.start()
+
+    def replay(self):
+        """Re-queue journal entries that never got an outcome; returns how many"""
+        submitted = OrderedDict()
+        for record in self.journal.read():
+            if record['op'] == 'submit':
+                submitted[record['ticket']] = record
+            else:
+                submitted.pop(record['ticket'], None)
+                self.set_status(record['ticket'], record['op'], record.get('error'), record.get('location_id'))
+        # Keep only the pending entries so the journal does not grow across restarts
+        self.journal.rewrite(submitted.values())
+        for ticket, record in submitted.items():
+            self.set_status(ticket, 'queued')
+            self.pending += 1
+            self.pending_ids.add(record['location']['LOCATION_ID'])
+            placement = (record['zone'], record['aisle']) if 'zone' in record else None
+            self.queue.put((ticket, _stored_location(record['location']), placement, True))
+        return len(submitted)
+
+    def set_status(self, ticket, status, error=None, location_id=None):
+        self.statuses[ticket] = {'status': status, 'error': error} if error else {'status': status}
+        if location_id:
+            self.statuses[ticket]['location_id'] = location_id
+        self.statuses.move_to_end(ticket)
+        while len(self.statuses) > self.max_tickets:
+            self.statuses.popitem(last=False)
+
+    def submit(self, location, zone=None, aisle=None):
+        """Journal one location for insertion and return its ticket ID
+
+        With `zone` and `aisle` the LOCATION_ID is provisional and may be
+        replaced by the next free number when the location is committed.
+        """
+        ticket = secrets.token_hex(6)
+        row = loc_binds(location)
+        record = {'op': 'submit', 'ticket': ticket, 'location': _journal_location(row)}
+        placement = None
+        if zone is not None and aisle is not None:
+            record.update(zone=zone, aisle=aisle)
+            placement = (zone, aisle)
+        with self.lock:
+            self.journal.append(record)
+            self.set_status(ticket, 'queued')
+            self.pending += 1
+            self.pending_ids.add(row['LOCATION_ID'])
+        self.queue.put((ticket, row, placement, False))
+        return ticket
+
+    def status(self, ticket):
+        """{'status': 'queued' | 'done' | 'failed', 'error': ..., 'location_id': ...}, or None for an unknown ticket
+
+        'location_id' is the committed LOCATION_ID of a done ticket submitted with its zone/aisle.
+        """
+        with self.lock:
+            status = self.statuses.get(ticket)
+            return dict(status) if status else None
+
+    def is_pending(self, location_id):
+        """True while a queued insert for this LOCATION_ID has no outcome yet"""
+        with self.lock:
+            return location_id in self.pending_ids
+
+    def next_batch(self, timeout=0.5):
+        """Block for the first entry, then take whatever else is already waiting"""
+        try:
+            batch = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def already_committed(self, row):
+        """A replayed entry may have been committed just before the crash"""
+        existing = self.store.fetch_inserted_record(row['LOCATION_ID'])
+        return existing is not None and existing['LOCATION_NAME'] == row['LOCATION_NAME']
+
+    def drain(self):
+        while True:
+            batch = self.next_batch()
+            stop = None in batch
+            if stop:
+                batch = batch[:batch.index(None)]
+            if batch:
+                self.write(batch)
+            if stop:
+                return
+
+    def write(self, batch):
+        inserts = [entry for entry in batch if entry[2] is None]
+        creates = [entry for entry in batch if entry[2] is not None]
+        outcomes, retry, reason = [], [], None
+        if inserts:
+            try:
+                outcomes.extend(self.insert(inserts))
+            except Exception as e:
+                retry, reason = inserts, e
+        if creates:
+            try:
+                outcomes.extend(self.create(creates))
+            except Exception as e:
+                retry, reason = retry + creates, e
+        written = [entry for entry in batch if entry not in retry]
+        if written:
+            self.record(written, outcomes)
+        if retry:
+            # The database is unreachable, not the rows bad: keep them journaled and retry
+            with self.lock:
+                for ticket, _, _, _ in retry:
+                    self.set_status(ticket, 'queued', f"retrying: {reason}")
+            time.sleep(self.retry_delay)
+            for entry in retry:
+                self.queue.put(entry)
+
+    def insert(self, entries):
+        """Array-insert locations with a fixed LOCATION_ID; one outcome per entry"""
+        errors = dict(self.store.insert_locations([row for _, row, _, _ in entries]))
+        outcomes = []
+        for offset, (ticket, row, _, replayed) in enumerate(entries):
+            error = errors.get(offset)
+            if error and replayed and self.already_committed(row):
+                error = None
+            if error:
+                outcomes.append({'op': 'failed', 'ticket': ticket, 'error': error})
+            else:
+                outcomes.append({'op': 'done', 'ticket': ticket})
+        return outcomes
+
+    def create(self, entries):
+        """Commit zone/aisle locations in one create_locations() call; outcomes carry the final LOCATION_ID"""
+        outcomes = {}
+        fresh = []
+        for ticket, row, (zone, aisle), replayed in entries:
+            if replayed:
+                # Committed before the crash, possibly under a moved LOCATION_ID
+                location_id = self.store.find_location_by_name(row['LOCATION_NAME'], zone, aisle)
+                if location_id is not None:
+                    outcomes[ticket] = {'op': 'done', 'ticket': ticket, 'location_id': location_id}
+                    continue
+            fresh.append((ticket, row, zone, aisle))
+        if fresh:
+            results = self.store.create_locations([(row, zone, aisle) for _, row, zone, aisle in fresh])
+            for (ticket, _, _, _), (created, error) in zip(fresh, results):
+                if error:
+                    outcomes[ticket] = {'op': 'failed', 'ticket': ticket, 'error': error}
+                else:
+                    outcomes[ticket] = {'op': 'done', 'ticket': ticket, 'location_id': created['LOCATION_ID']}
+        return [outcomes[ticket] for ticket, _, _, _ in entries]
+
+    def record(self, entries, outcomes):
+        failed = sum(1 for outcome in outcomes if outcome['op'] == 'failed')
+        with self.lock:
+            self.journal.append(*outcomes)
+            for outcome in outcomes:
+                self.set_status(outcome['ticket'], outcome['op'], outcome.get('error'), outcome.get('location_id'))
+            self.pending -= len(entries)
+            self.pending_ids.difference_update(row['LOCATION_ID'] for _, row, _, _ in entries)
+            self.batches += 1
+            self.failed += failed
+            self.committed += len(entries) - failed
+            if self.pending == 0:
+                # Everything has an outcome; keep the journal from growing forever
+                self.journal.truncate()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'pending': self.pending,
+                'committed': self.committed,
+                'failed': self.failed,
+                'batches': self.batches,
+                'replayed': self.replayed,
+                'avg_batch_size': round((self.committed + self.failed) / self.batches, 1) if self.batches else 0.0
+            }
+
+    def close(self):
+        """Flush what is queued, then stop the worker"""
+        self.queue.put(None)
+        self.worker.join()
+        self.journal.close()